@@ -1,4 +1,104 @@
+import os
 from typing import Final
 
 
-API_BASE_PATH: Final[str] = "/api"
\ No newline at end of file
+LOG_LEVEL: Final[str] = os.getenv("LOG_LEVEL", "INFO").upper()
+# "json" for one JSON object per line, "text" for human-readable lines
+LOG_FORMAT: Final[str] = os.getenv("LOG_FORMAT", "json")
+
+API_BASE_PATH: Final[str] = "/api"
+# API server processes started by app.server. One by default: os.cpu_count() reports
+# the cores of the host, not the CPU quota or affinity of the container
+API_WORKERS: Final[int] = int(os.getenv("API_WORKERS", "1"))
+API_PORT: Final[int] = int(os.getenv("API_PORT", "8000"))
+# Seconds given to in-flight requests on shutdown
+API_GRACEFUL_SHUTDOWN_TIMEOUT: Final[float] = float(os.getenv("API_GRACEFUL_SHUTDOWN_TIMEOUT", "30"))
+# API processes skip index creation by default to start faster, the download worker creates them
+API_CREATE_INDEXES: Final[bool] = os.getenv("API_CREATE_INDEXES", "false").lower() == "true"
+# Seconds the readiness probe waits for MongoDB to answer a ping
+HEALTH_CHECK_TIMEOUT: Final[float] = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2"))
+SSE_KEEPALIVE_INTERVAL: Final[float] = float(os.getenv("SSE_KEEPALIVE_INTERVAL", "15"))
+BULK_CHUNK_SIZE: Final[int] = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+# Finished download requests kept serialized in memory by each API process, 0 disables the cache
+RESPONSE_CACHE_SIZE: Final[int] = int(os.getenv("RESPONSE_CACHE_SIZE", "10000"))
+
+# MongoDB client, one pool per process shared by every request and background task
+MONGO_MAX_POOL_SIZE: Final[int] = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE: Final[int] = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS: Final[int] = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_CONNECT_TIMEOUT_MS: Final[int] = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS: Final[int] = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "10000"))
+# Write concern "w" value ("majority" or a number of nodes) and read concern level
+MONGO_WRITE_CONCERN: Final[str] = os.getenv("MONGO_WRITE_CONCERN", "majority")
+MONGO_READ_CONCERN: Final[str] = os.getenv("MONGO_READ_CONCERN", "local")
+
+# Download worker
+WORKER_CONCURRENCY: Final[int] = int(os.getenv("WORKER_CONCURRENCY", "4"))
+WORKER_QUEUE_SIZE: Final[int] = int(os.getenv("WORKER_QUEUE_SIZE", "16"))
+# Extra workers reserved for single-video requests
+WORKER_EXPRESS_CONCURRENCY: Final[int] = int(os.getenv("WORKER_EXPRESS_CONCURRENCY", "1"))
+# Max jobs of one tenant running at once on this worker, 0 for no limit.
+# Requests without a tenant all share the default tenant, so a cap also limits them as a whole.
+TENANT_MAX_CONCURRENCY: Final[int] = int(os.getenv("TENANT_MAX_CONCURRENCY", "0"))
+# Fair-share weights as "tenant:weight,..." pairs, unlisted tenants weigh 1
+TENANT_WEIGHTS: Final[dict[str, float]] = {
+    name.strip(): float(weight)
+    for name, weight in (
+        pair.split(":", 1) for pair in os.getenv("TENANT_WEIGHTS", "").split(",") if pair.strip()
+    )
+}
+WORKER_ID: Final[str | None] = os.getenv("WORKER_ID")
+# Port of the worker Prometheus listener, 0 disables it
+WORKER_METRICS_PORT: Final[int] = int(os.getenv("WORKER_METRICS_PORT", "9100"))
+METRICS_SAMPLE_INTERVAL: Final[float] = float(os.getenv("METRICS_SAMPLE_INTERVAL", "15"))
+STATS_RECONCILE_INTERVAL: Final[float] = float(os.getenv("STATS_RECONCILE_INTERVAL", "3600"))
+LEASE_SECONDS: Final[int] = int(os.getenv("LEASE_SECONDS", "60"))
+LEASE_HEARTBEAT_INTERVAL: Final[float] = float(os.getenv("LEASE_HEARTBEAT_INTERVAL", "20"))
+LEASE_REAPER_INTERVAL: Final[float] = float(os.getenv("LEASE_REAPER_INTERVAL", "30"))
+STREAM_CHECKPOINT_INTERVAL: Final[float] = float(os.getenv("STREAM_CHECKPOINT_INTERVAL", "5"))
+PLAYLIST_CONCURRENCY: Final[int] = int(os.getenv("PLAYLIST_CONCURRENCY", "4"))
+# Threads running blocking yt-dlp calls, by default enough for every job to download a full playlist fan-out
+EXTRACTOR_THREADS: Final[int] = int(os.getenv(
+    "EXTRACTOR_THREADS", str((WORKER_CONCURRENCY + WORKER_EXPRESS_CONCURRENCY) * max(1, PLAYLIST_CONCURRENCY))
+))
+PROGRESS_REPORT_INTERVAL: Final[float] = float(os.getenv("PROGRESS_REPORT_INTERVAL", "1"))
+DOWNLOAD_CHECKPOINT_INTERVAL: Final[float] = float(os.getenv("DOWNLOAD_CHECKPOINT_INTERVAL", "10"))
+# ffmpeg processes remuxing or transcoding downloaded files at once
+POSTPROCESS_CONCURRENCY: Final[int] = int(os.getenv("POSTPROCESS_CONCURRENCY", str(os.cpu_count() or 2)))
+
+# Extractor rate limiting, "mongo" shares the buckets across worker processes, "local" keeps them in-process
+RATE_LIMIT_BACKEND: Final[str] = os.getenv("RATE_LIMIT_BACKEND", "mongo")
+# Extractor calls per second, 0 disables the bucket
+RATE_LIMIT_GLOBAL_RPS: Final[float] = float(os.getenv("RATE_LIMIT_GLOBAL_RPS", "10"))
+RATE_LIMIT_DOMAIN_RPS: Final[float] = float(os.getenv("RATE_LIMIT_DOMAIN_RPS", "2"))
+RATE_LIMIT_BURST: Final[float] = float(os.getenv("RATE_LIMIT_BURST", "5"))
+RATE_LIMIT_MIN_RPS: Final[float] = float(os.getenv("RATE_LIMIT_MIN_RPS", "0.1"))
+# Calls per second regained every second after throttling
+RATE_LIMIT_RECOVERY_RPS: Final[float] = float(os.getenv("RATE_LIMIT_RECOVERY_RPS", "0.01"))
+RATE_LIMIT_COOLDOWN: Final[float] = float(os.getenv("RATE_LIMIT_COOLDOWN", "30"))
+# Throttled requests are retried after THROTTLE_RETRY_BASE_DELAY * 2^attempts seconds
+THROTTLE_RETRY_BASE_DELAY: Final[float] = float(os.getenv("THROTTLE_RETRY_BASE_DELAY", "60"))
+THROTTLE_RETRY_MAX_DELAY: Final[float] = float(os.getenv("THROTTLE_RETRY_MAX_DELAY", "3600"))
+THROTTLE_MAX_ATTEMPTS: Final[int] = int(os.getenv("THROTTLE_MAX_ATTEMPTS", "6"))
+RETRY_DISPATCH_INTERVAL: Final[float] = float(os.getenv("RETRY_DISPATCH_INTERVAL", "15"))
+
+# Object storage
+UPLOAD_TO_S3: Final[bool] = os.getenv("UPLOAD_TO_S3", "false").lower() == "true"
+
+# Media cache
+MEDIA_CACHE_BUDGET_GB: Final[float] = float(os.getenv("MEDIA_CACHE_BUDGET_GB", "100"))
+MEDIA_CACHE_TTL_HOURS: Final[float] = float(os.getenv("MEDIA_CACHE_TTL_HOURS", "168"))
+MEDIA_CACHE_EVICT_INTERVAL: Final[float] = float(os.getenv("MEDIA_CACHE_EVICT_INTERVAL", "600"))
+MEDIA_CACHE_POLL_INTERVAL: Final[float] = float(os.getenv("MEDIA_CACHE_POLL_INTERVAL", "2"))
+
+# Retention: soft-deleted requests are purged with their media after DELETED_RETENTION_DAYS,
+# finished requests are soft-deleted after COMPLETED/FAILED_RETENTION_DAYS, 0 keeps them forever
+DELETED_RETENTION_DAYS: Final[float] = float(os.getenv("DELETED_RETENTION_DAYS", "30"))
+COMPLETED_RETENTION_DAYS: Final[float] = float(os.getenv("COMPLETED_RETENTION_DAYS", "0"))
+FAILED_RETENTION_DAYS: Final[float] = float(os.getenv("FAILED_RETENTION_DAYS", "0"))
+RETENTION_INTERVAL: Final[float] = float(os.getenv("RETENTION_INTERVAL", "3600"))
+RETENTION_BATCH_SIZE: Final[int] = int(os.getenv("RETENTION_BATCH_SIZE", "500"))
+
+# Media info cache, kept well below the lifetime of the format URLs stored in the info
+MEDIA_INFO_TTL: Final[float] = float(os.getenv("MEDIA_INFO_TTL", "1800"))
+MEDIA_INFO_LRU_SIZE: Final[int] = int(os.getenv("MEDIA_INFO_LRU_SIZE", "1024"))
@@ -1,23 +1,104 @@
 import logging
 import os
+from typing import Optional
 
-from pymongo import AsyncMongoClient, MongoClient
+from pymongo import AsyncMongoClient
+from pymongo.errors import PyMongoError
 from beanie import init_beanie
 
+import app.config.config as config
+
+from app.services.metrics import MongoCommandMetrics
+
 from app.download_requests.models.download_request_entity import DownloadRequestEntity
+from app.download_requests.models.download_request_video_entity import DownloadRequestVideoEntity
+from app.download_worker.models.download_checkpoint_entity import DownloadCheckpointEntity
+from app.download_worker.models.stream_checkpoint_entity import StreamCheckpointEntity
+from app.media_cache.models.media_cache_entity import MediaCacheEntity
+from app.media_info.models.media_info_entity import MediaInfoEntity
+from app.rate_limits.models.rate_limit_bucket_entity import RateLimitBucketEntity
+from app.stats.models.download_stats_entity import DownloadStatsEntity
+
+DOCUMENT_MODELS = [
+    DownloadRequestEntity,
+    DownloadRequestVideoEntity,
+    StreamCheckpointEntity,
+    MediaCacheEntity,
+    RateLimitBucketEntity,
+    MediaInfoEntity,
+    DownloadStatsEntity,
+    DownloadCheckpointEntity,
+]
+
+
+# Client shared by everything running in this process, see init_db and close_db
+_client: Optional[AsyncMongoClient] = None
+
+
+def build_client_options() -> dict:
+    """
+    Pool, timeout and concern settings of the MongoDB client
+    """
+    write_concern = config.MONGO_WRITE_CONCERN
+    return {
+        "maxPoolSize": config.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": config.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": config.MONGO_MAX_IDLE_TIME_MS,
+        "connectTimeoutMS": config.MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "w": int(write_concern) if write_concern.isdigit() else write_concern,
+        "readConcernLevel": config.MONGO_READ_CONCERN,
+    }
 
 
-async def init_db():
-    print(os.getenv("MONGO_URI"))
+async def init_db(create_indexes: bool = True):
+    """
+    Connect the process-wide client and initialize Beanie, once per process
+    :param create_indexes: Create the missing indexes of the document models, one round-trip per model
+    """
+    global _client
+    if _client is not None:
+        return _client["yt_downloads"]
+
     client = AsyncMongoClient(
         os.getenv("MONGO_URI"),
         username=os.getenv("MONGO_ROOT_USERNAME"),
         password=os.getenv("MONGO_ROOT_PASSWORD"),
+        event_listeners=[MongoCommandMetrics()],
+        **build_client_options(),
     )
 
     db = client["yt_downloads"]
 
-
-    await init_beanie(database=db, document_models=[DownloadRequestEntity])
+    try:
+        await init_beanie(database=db, document_models=DOCUMENT_MODELS, skip_indexes=not create_indexes)
+    except BaseException:
+        await client.close()
+        raise
+    _client = client
     logging.info("Connected to MongoDB")
     return db
+
+
+async def ping_db() -> bool:
+    """
+    Whether the process-wide client is connected and MongoDB answers
+    """
+    if _client is None:
+        return False
+    try:
+        await _client.admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+
+
+async def close_db() -> None:
+    """
+    Close the pooled connections of the process-wide client
+    """
+    global _client
+    client, _client = _client, None
+    if client is not None:
+        await client.close()
+        logging.info("Closed MongoDB connections")
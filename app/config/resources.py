@@ -0,0 +1,18 @@
+from contextlib import asynccontextmanager
+
+from app.config.database import close_db, init_db
+from app.services.s3_client import close_s3_clients
+
+
+@asynccontextmanager
+async def managed_resources(create_indexes: bool = True):
+    """
+    Open the clients shared by the API or worker process and close their pooled connections on exit.
+    The S3 clients are created on first use.
+    """
+    db = await init_db(create_indexes)
+    try:
+        yield db
+    finally:
+        await close_s3_clients()
+        await close_db()
@@ -0,0 +1,10 @@
+from typing import Literal, Optional
+from pydantic import BaseModel
+
+
+class DownloadRequestBulkResultDTO(BaseModel):
+    index: int
+    url: Optional[str] = None
+    result: Literal["created", "duplicate", "invalid"]
+    id: Optional[str] = None
+    error: Optional[str] = None
@@ -1,8 +1,9 @@
 from typing import Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel
+from app.download_requests.models.download_format import DownloadFormat
 from app.download_requests.models.download_request_entity import DownloadRequestEntity
-from app.download_requests.models.download_request_video import DownloadRequestVideo
 from app.download_requests.enums.download_status import DownloadStatus
+from app.download_requests.enums.transcode_profile import TranscodeProfile
 
 
 class DownloadRequestDTO(BaseModel):
@@ -11,10 +12,14 @@ class DownloadRequestDTO(BaseModel):
     title: Optional[str] = None
     status: DownloadStatus
     imageUrl: Optional[str] = None
-    videos: list[DownloadRequestVideo] = Field(default_factory=list)
     isPlaylist: bool = False
     playlistCount: Optional[int] = None
     downloadedCount: Optional[int] = None
+    downloadedBytes: Optional[int] = None
+    priority: int = 0
+    tenant: Optional[str] = None
+    profile: TranscodeProfile = TranscodeProfile.ORIGINAL
+    format: Optional[DownloadFormat] = None
 
     @classmethod
     def from_entity(cls, entity: DownloadRequestEntity) -> "DownloadRequestDTO":
@@ -24,10 +29,14 @@ class DownloadRequestDTO(BaseModel):
             title=entity.title,
             status=entity.status,  # Pass the enum directly
             imageUrl=entity.imageUrl,
-            videos=entity.videos or [],
             isPlaylist=entity.isPlaylist or False,
             playlistCount=entity.playlistCount,
             downloadedCount=entity.downloadedCount,
+            downloadedBytes=entity.downloadedBytes,
+            priority=entity.priority,
+            tenant=entity.tenant,
+            profile=entity.profile,
+            format=entity.format,
         )
 
     @classmethod
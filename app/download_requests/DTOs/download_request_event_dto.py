@@ -0,0 +1,21 @@
+import json
+from typing import Any, Literal
+from pydantic import BaseModel, Field
+from app.download_requests.models.download_request_entity import DownloadRequestEntity
+
+
+class DownloadRequestEventDTO(BaseModel):
+    event: Literal["snapshot", "update", "deleted"]
+    data: dict[str, Any] = Field(default_factory=dict)
+
+    @classmethod
+    def snapshot(cls, entity: DownloadRequestEntity) -> "DownloadRequestEventDTO":
+        return cls(event="snapshot", data={
+            "status": entity.status.value,
+            "playlistCount": entity.playlistCount,
+            "downloadedCount": entity.downloadedCount,
+            "progress": {video_id: progress.model_dump() for video_id, progress in entity.progress.items()},
+        })
+
+    def to_sse(self) -> str:
+        return f"event: {self.event}\ndata: {json.dumps(self.data, default=str)}\n\n"
@@ -0,0 +1,32 @@
+from typing import Optional
+from pydantic import BaseModel
+from app.download_requests.models.download_request_summary import DownloadRequestSummary
+from app.download_requests.enums.download_status import DownloadStatus
+
+
+class DownloadRequestSummaryDTO(BaseModel):
+    id: str
+    url: str
+    title: Optional[str] = None
+    status: DownloadStatus
+    imageUrl: Optional[str] = None
+    isPlaylist: bool = False
+    playlistCount: Optional[int] = None
+    downloadedCount: Optional[int] = None
+
+    @classmethod
+    def from_summary(cls, summary: DownloadRequestSummary) -> "DownloadRequestSummaryDTO":
+        return cls(
+            id=str(summary.id),
+            url=summary.url,
+            title=summary.title,
+            status=summary.status,
+            imageUrl=summary.imageUrl,
+            isPlaylist=summary.isPlaylist or False,
+            playlistCount=summary.playlistCount,
+            downloadedCount=summary.downloadedCount,
+        )
+
+    @classmethod
+    def from_summaries(cls, summaries: list[DownloadRequestSummary]) -> list["DownloadRequestSummaryDTO"]:
+        return [cls.from_summary(summary) for summary in summaries]
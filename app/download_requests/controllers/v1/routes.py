@@ -1,26 +1,181 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import mimetypes
+import os
+from typing import Any, AsyncIterator, Optional
+
+from bson import ObjectId
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
 import app.config.config as config
+from app.download_requests.DTOs.download_request_bulk_result_dto import DownloadRequestBulkResultDTO
 from app.download_requests.DTOs.download_request_dto import DownloadRequestDTO
+from app.download_requests.DTOs.download_request_event_dto import DownloadRequestEventDTO
+from app.download_requests.DTOs.download_request_summary_dto import DownloadRequestSummaryDTO
+from app.download_requests.enums.download_status import DownloadStatus
+from app.download_requests.models.download_request_video import DownloadRequestVideo
 from app.download_requests.repositories.download_request_repository import DownloadRequestRepository
+from app.download_requests.repositories.download_request_video_repository import DownloadRequestVideoRepository
 from app.download_requests.schemas.download_request_create_schema import DownloadRequestCreateSchema
+from app.download_requests.schemas.download_request_cursor import DownloadRequestCursor
+from app.download_requests.services.download_request_bulk_service import DownloadRequestBulkService
+from app.download_requests.services.download_request_event_broker import download_request_event_broker
+from app.download_requests.services.download_request_response_cache import (
+    CachedResponse,
+    download_request_response_cache,
+)
+from app.services.etag import etag_matches
+from app.services.s3_client import get_async_s3_client
 from validators import url as validate_url
 
 router = APIRouter(prefix=f"{config.API_BASE_PATH}/v1/download-requests", tags=["Download Requests V1"])
 
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
 @router.get("/")
-async def get_download_requests() -> list[DownloadRequestDTO]:
+async def get_download_requests(
+    response: Response,
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    status: Optional[DownloadStatus] = None,
+    isPlaylist: Optional[bool] = None,
+) -> list[DownloadRequestSummaryDTO]:
+    """
+    Newest first. When more results exist, the X-Next-Cursor header holds the cursor of the next page.
+    """
+    try:
+        page_cursor = DownloadRequestCursor.decode(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # Fetch one extra summary to know whether a next page exists
+    summaries = await DownloadRequestRepository.find_page(limit + 1, page_cursor, status, isPlaylist)
+    if len(summaries) > limit:
+        summaries = summaries[:limit]
+        last = summaries[-1]
+        response.headers["X-Next-Cursor"] = DownloadRequestCursor(createdAt=last.createdAt, id=last.id).encode()
+
+    return DownloadRequestSummaryDTO.from_summaries(summaries)
+
+@router.get("/{request_id}", response_model=DownloadRequestDTO)
+async def get_download_request(request_id: str, request: Request) -> Response:
+    """
+    Supports conditional requests with the returned ETag.
+    Finished requests no longer change and are served from memory while the change stream invalidating them is open.
+    """
+    use_cache = download_request_event_broker.watching
+    cached = download_request_response_cache.get(request_id) if use_cache else None
+    if cached is None:
+        token = download_request_response_cache.begin_read()
+        download_request = await DownloadRequestRepository.find_by_id(request_id)
+        if not download_request:
+            raise HTTPException(status_code=404, detail=f"Download request with id {request_id} not found")
+        cached = CachedResponse.from_body(DownloadRequestDTO.from_entity(download_request).model_dump_json().encode())
+        if use_cache and download_request.status.is_terminal:
+            download_request_response_cache.put(request_id, cached, token)
+
+    if cached.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers={"ETag": cached.etag})
+    return Response(cached.body, media_type="application/json", headers={"ETag": cached.etag})
+
+@router.get("/{request_id}/events")
+async def stream_download_request_events(request_id: str) -> StreamingResponse:
+    """
+    Server-Sent Events stream of status, playlist and byte progress updates.
+    The first event is a snapshot of the current state, the stream ends once the request is finished.
+    """
+    if not ObjectId.is_valid(request_id):
+        raise HTTPException(status_code=404, detail=f"Download request with id {request_id} not found")
+
+    # Subscribe before reading the snapshot so that no change falls in between
+    queue = download_request_event_broker.subscribe(request_id)
+    try:
+        download_request = await DownloadRequestRepository.find_by_id(request_id)
+    except BaseException:
+        download_request_event_broker.unsubscribe(request_id, queue)
+        raise
+    if not download_request:
+        download_request_event_broker.unsubscribe(request_id, queue)
+        raise HTTPException(status_code=404, detail=f"Download request with id {request_id} not found")
+
+    async def _events():
+        try:
+            yield DownloadRequestEventDTO.snapshot(download_request).to_sse()
+            if download_request.status.is_terminal:
+                return
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=config.SSE_KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
 
+                yield event.to_sse()
+                status = event.data.get("status")
+                if event.event == "deleted" or (status and DownloadStatus(status).is_terminal):
+                    return
+        finally:
+            download_request_event_broker.unsubscribe(request_id, queue)
 
-    download_requests = await DownloadRequestRepository.find_all()
-    return DownloadRequestDTO.from_entities(download_requests)
+    return StreamingResponse(_events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
-@router.get("/{request_id}")
-async def get_download_request(request_id: str) -> DownloadRequestDTO:
-    print("id" + request_id)
+@router.get("/{request_id}/videos")
+async def get_download_request_videos(
+    request_id: str,
+    response: Response,
+    limit: int = Query(default=100, ge=1, le=500),
+    cursor: Optional[int] = Query(default=None, ge=0),
+) -> list[DownloadRequestVideo]:
+    """
+    Videos of a request ordered by playlist position.
+    When more results exist, the X-Next-Cursor header holds the cursor of the next page.
+    """
+    if not await DownloadRequestRepository.find_by_id(request_id):
+        raise HTTPException(status_code=404, detail=f"Download request with id {request_id} not found")
+
+    # Fetch one extra video to know whether a next page exists
+    videos = await DownloadRequestVideoRepository.find_page(request_id, limit + 1, cursor)
+    if len(videos) > limit:
+        videos = videos[:limit]
+        response.headers["X-Next-Cursor"] = str(videos[-1].position)
+
+    return videos
+
+@router.get("/{request_id}/videos/{video_id}/content")
+async def get_download_request_video_content(request_id: str, video_id: str, request: Request) -> Response:
+    """
+    Serve a downloaded video. Local files support Range requests and conditional requests,
+    videos moved to object storage are redirected to a presigned URL.
+    """
     download_request = await DownloadRequestRepository.find_by_id(request_id)
-    if download_request:
-        return DownloadRequestDTO.from_entity(download_request)
-    raise HTTPException(status_code=404, detail=f"Download request with id {request_id} not found")
+    video = await DownloadRequestVideoRepository.find_by_video_id(request_id, video_id) if download_request else None
+    if not video:
+        raise HTTPException(status_code=404, detail=f"Video {video_id} of download request {request_id} not found")
+
+    if video.objectKey:
+        url = await get_async_s3_client().get_file_url(video.objectKey)
+        if not url:
+            raise HTTPException(status_code=502, detail="Could not generate a download URL")
+        return RedirectResponse(url, status_code=307)
+
+    try:
+        stat_result = await asyncio.to_thread(os.stat, video.path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Content of video {video_id} is no longer available")
+
+    # FileResponse handles Range/If-Range, and hands the file to the server for
+    # zero-copy delivery when it supports the ASGI pathsend extension
+    response = FileResponse(
+        video.path,
+        media_type=mimetypes.guess_type(video.path)[0] or "application/octet-stream",
+        stat_result=stat_result,
+    )
+    if etag_matches(response.headers["etag"], request.headers.get("if-none-match")):
+        return Response(status_code=304, headers={
+            "etag": response.headers["etag"],
+            "last-modified": response.headers["last-modified"],
+        })
+    return response
 
 @router.post("/")
 async def create_download_request(request: DownloadRequestCreateSchema) -> DownloadRequestDTO:
@@ -30,9 +185,58 @@ async def create_download_request(request: DownloadRequestCreateSchema) -> Downl
     entity = await DownloadRequestRepository.create(request)
     return DownloadRequestDTO.from_entity(entity)
 
+async def _iter_ndjson_lines(request: Request) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+async def _iter_items(items: list[Any]) -> AsyncIterator[Any]:
+    for item in items:
+        yield item
+
+@router.post("/bulk", openapi_extra={
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {"type": "array", "items": DownloadRequestCreateSchema.model_json_schema()},
+            },
+            "application/x-ndjson": {
+                "schema": DownloadRequestCreateSchema.model_json_schema(),
+            },
+        },
+    },
+})
+async def create_download_requests_bulk(request: Request) -> list[DownloadRequestBulkResultDTO]:
+    """
+    Create many download requests from a JSON array or an NDJSON stream.
+    URLs already registered or in progress are reported as duplicates instead of being created again.
+    """
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if media_type in NDJSON_MEDIA_TYPES:
+        items = _iter_ndjson_lines(request)
+    else:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON body")
+        if not isinstance(body, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of download requests")
+        items = _iter_items(body)
+
+    return await DownloadRequestBulkService.create_many(items, config.BULK_CHUNK_SIZE)
+
 @router.delete("/{id}")
 async def delete_download_request(id: str):
     success = await DownloadRequestRepository.delete(id)
+    # Other processes learn about the deletion from the change stream
+    download_request_response_cache.invalidate(id)
     if success:
         return {"message": f"Download request with id {id} deleted successfully"}
     raise HTTPException(status_code=404, detail=f"Download request with id {id} not found")
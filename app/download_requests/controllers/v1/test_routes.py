@@ -2,14 +2,24 @@ import pytest
 from httpx import AsyncClient, ASGITransport
 from app.main import app
 from app.download_requests.repositories.download_request_repository import DownloadRequestRepository
+from app.download_requests.repositories.download_request_video_repository import DownloadRequestVideoRepository
 from app.download_requests.models.download_request_entity import DownloadRequestEntity
+from app.download_requests.models.download_request_summary import DownloadRequestSummary
+from app.download_requests.models.download_request_video import DownloadRequestVideo
+from app.download_requests.schemas.download_request_create_schema import DownloadRequestCreateSchema
+from app.download_requests.schemas.download_request_cursor import DownloadRequestCursor
 from app.download_requests.enums.download_status import DownloadStatus
+from app.download_requests.services.download_request_event_broker import (
+    DownloadRequestEventBroker,
+    download_request_event_broker,
+)
 from beanie import PydanticObjectId
+from datetime import datetime, timezone
 from unittest.mock import AsyncMock, patch
 
 @pytest.fixture
-def mock_repo_find_all(mocker):
-    return mocker.patch.object(DownloadRequestRepository, "find_all", new_callable=AsyncMock)
+def mock_repo_find_page(mocker):
+    return mocker.patch.object(DownloadRequestRepository, "find_page", new_callable=AsyncMock)
 
 @pytest.fixture
 def mock_repo_find_by_id(mocker):
@@ -19,20 +29,59 @@ def mock_repo_find_by_id(mocker):
 def mock_repo_create(mocker):
     return mocker.patch.object(DownloadRequestRepository, "create", new_callable=AsyncMock)
 
+@pytest.fixture
+def mock_repo_create_many(mocker):
+    async def create_many(items):
+        return [
+            DownloadRequestEntity.model_construct(id=PydanticObjectId(), url=item.url, status=DownloadStatus.REGISTERED)
+            for item in items
+        ]
+    return mocker.patch.object(DownloadRequestRepository, "create_many", side_effect=create_many)
+
+@pytest.fixture
+def mock_repo_find_in_flight(mocker):
+    return mocker.patch.object(DownloadRequestRepository, "find_in_flight", new_callable=AsyncMock, return_value={})
+
 @pytest.fixture
 def mock_repo_delete(mocker):
     return mocker.patch.object(DownloadRequestRepository, "delete", new_callable=AsyncMock)
 
+def make_summary(url: str) -> DownloadRequestSummary:
+    return DownloadRequestSummary.model_construct(
+        id=PydanticObjectId(), url=url, status=DownloadStatus.REGISTERED, createdAt=datetime.now(timezone.utc)
+    )
+
 @pytest.mark.asyncio
-async def test_get_download_requests(mock_repo_find_all):
-    mock_repo_find_all.return_value = [
-        DownloadRequestEntity.model_construct(id=PydanticObjectId(), url="http://example.com/video1", status=DownloadStatus.REGISTERED),
-        DownloadRequestEntity.model_construct(id=PydanticObjectId(), url="http://example.com/video2", status=DownloadStatus.REGISTERED),
+async def test_get_download_requests(mock_repo_find_page):
+    mock_repo_find_page.return_value = [
+        make_summary("http://example.com/video1"),
+        make_summary("http://example.com/video2"),
     ]
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
         response = await client.get("/api/v1/download-requests/")
         assert response.status_code == 200
         assert len(response.json()) == 2
+        assert "videos" not in response.json()[0]
+        assert "X-Next-Cursor" not in response.headers
+
+@pytest.mark.asyncio
+async def test_get_download_requests_next_cursor(mock_repo_find_page):
+    summaries = [make_summary(f"http://example.com/video{index}") for index in range(3)]
+    mock_repo_find_page.return_value = summaries
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/v1/download-requests/", params={"limit": 2, "status": "Registered"})
+        assert response.status_code == 200
+        assert len(response.json()) == 2
+        cursor = DownloadRequestCursor.decode(response.headers["X-Next-Cursor"])
+        assert cursor.id == summaries[1].id
+        mock_repo_find_page.assert_awaited_once_with(3, None, DownloadStatus.REGISTERED, None)
+
+@pytest.mark.asyncio
+async def test_get_download_requests_invalid_cursor(mock_repo_find_page):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/v1/download-requests/", params={"cursor": "not-a-cursor"})
+        assert response.status_code == 400
+        mock_repo_find_page.assert_not_awaited()
 
 @pytest.mark.asyncio
 async def test_get_download_request(mock_repo_find_by_id):
@@ -45,6 +94,26 @@ async def test_get_download_request(mock_repo_find_by_id):
         response_json = response.json()
         assert response_json["id"] == str(request_id)
 
+@pytest.mark.asyncio
+async def test_get_finished_download_request_is_cached_and_conditional(mock_repo_find_by_id, mocker):
+    mocker.patch.object(DownloadRequestEventBroker, "watching", new_callable=mocker.PropertyMock, return_value=True)
+    request_id = PydanticObjectId()
+    mock_repo_find_by_id.return_value = make_completed_entity(request_id)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get(f"/api/v1/download-requests/{request_id}")
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+
+        cached = await client.get(f"/api/v1/download-requests/{request_id}")
+        assert cached.content == response.content
+        not_modified = await client.get(f"/api/v1/download-requests/{request_id}", headers={"If-None-Match": etag})
+        assert not_modified.status_code == 304
+        assert mock_repo_find_by_id.await_count == 1
+
+        download_request_event_broker.publish_change({"operationType": "update", "documentKey": {"_id": request_id}})
+        await client.get(f"/api/v1/download-requests/{request_id}")
+        assert mock_repo_find_by_id.await_count == 2
+
 @pytest.mark.asyncio
 async def test_get_download_request_not_found(mock_repo_find_by_id):
     request_id = PydanticObjectId()
@@ -88,3 +157,176 @@ async def test_delete_download_request_not_found(mock_repo_delete):
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
         response = await client.delete(f"/api/v1/download-requests/{request_id}")
         assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_stream_download_request_events_ends_on_terminal_status(mock_repo_find_by_id):
+    request_id = PydanticObjectId()
+    mock_repo_find_by_id.return_value = DownloadRequestEntity.model_construct(
+        id=request_id, url="http://example.com/video1", status=DownloadStatus.COMPLETED,
+        playlistCount=None, downloadedCount=None, progress={},
+    )
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get(f"/api/v1/download-requests/{request_id}/events")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.text.startswith("event: snapshot\n")
+        assert '"status": "Completed"' in response.text
+
+@pytest.mark.asyncio
+async def test_stream_download_request_events_not_found(mock_repo_find_by_id):
+    mock_repo_find_by_id.return_value = None
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get(f"/api/v1/download-requests/{PydanticObjectId()}/events")
+        assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_stream_download_request_events_rejects_malformed_ids(mock_repo_find_by_id):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/v1/download-requests/not-an-id/events")
+        assert response.status_code == 404
+    mock_repo_find_by_id.assert_not_awaited()
+    assert "not-an-id" not in download_request_event_broker._subscribers
+
+@pytest.mark.asyncio
+async def test_stream_download_request_events_unsubscribes_when_lookup_fails(mock_repo_find_by_id):
+    request_id = str(PydanticObjectId())
+    mock_repo_find_by_id.side_effect = RuntimeError("database unavailable")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        with pytest.raises(RuntimeError):
+            await client.get(f"/api/v1/download-requests/{request_id}/events")
+    assert request_id not in download_request_event_broker._subscribers
+
+@pytest.fixture
+def mock_video_repo_find_by_video_id(mocker):
+    async def find_by_video_id(request_id, video_id):
+        return mock_video_repo_find_by_video_id.video if video_id == "abc" else None
+    mock_video_repo_find_by_video_id.video = None
+    mocker.patch.object(DownloadRequestVideoRepository, "find_by_video_id", side_effect=find_by_video_id)
+    return mock_video_repo_find_by_video_id
+
+@pytest.fixture
+def mock_video_repo_find_page(mocker):
+    return mocker.patch.object(DownloadRequestVideoRepository, "find_page", new_callable=AsyncMock)
+
+def make_completed_entity(request_id) -> DownloadRequestEntity:
+    return DownloadRequestEntity.model_construct(
+        id=request_id, url="http://example.com/video1", status=DownloadStatus.COMPLETED
+    )
+
+@pytest.mark.asyncio
+async def test_get_download_request_videos_pages_by_position(mock_repo_find_by_id, mock_video_repo_find_page):
+    request_id = PydanticObjectId()
+    mock_repo_find_by_id.return_value = make_completed_entity(request_id)
+    mock_video_repo_find_page.return_value = [
+        DownloadRequestVideo(id=f"v{position}", title="Video", path="/v.mp4", position=position)
+        for position in range(3, 6)
+    ]
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get(
+            f"/api/v1/download-requests/{request_id}/videos", params={"limit": 2, "cursor": 2}
+        )
+        assert response.status_code == 200
+        assert [video["id"] for video in response.json()] == ["v3", "v4"]
+        assert response.headers["X-Next-Cursor"] == "4"
+        mock_video_repo_find_page.assert_awaited_once_with(str(request_id), 3, 2)
+
+@pytest.mark.asyncio
+async def test_get_download_request_videos_not_found(mock_repo_find_by_id, mock_video_repo_find_page):
+    mock_repo_find_by_id.return_value = None
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get(f"/api/v1/download-requests/{PydanticObjectId()}/videos")
+        assert response.status_code == 404
+        mock_video_repo_find_page.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_get_video_content_supports_ranges_and_etags(mock_repo_find_by_id, mock_video_repo_find_by_video_id, tmp_path):
+    file_path = tmp_path / "video.mp4"
+    file_path.write_bytes(b"0123456789")
+    request_id = PydanticObjectId()
+    mock_repo_find_by_id.return_value = make_completed_entity(request_id)
+    mock_video_repo_find_by_video_id.video = DownloadRequestVideo(id="abc", title="Video", path=str(file_path))
+    url = f"/api/v1/download-requests/{request_id}/videos/abc/content"
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get(url, headers={"Range": "bytes=2-5"})
+        assert response.status_code == 206
+        assert response.content == b"2345"
+        assert response.headers["content-type"] == "video/mp4"
+
+        etag = response.headers["etag"]
+        response = await client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+        response = await client.get(url, headers={"If-None-Match": f'"other", W/{etag}'})
+        assert response.status_code == 304
+
+@pytest.mark.asyncio
+async def test_get_video_content_redirects_to_object_storage(mock_repo_find_by_id, mock_video_repo_find_by_video_id, mocker):
+    s3_client = mocker.AsyncMock()
+    s3_client.get_file_url.return_value = "https://storage.example.com/presigned"
+    mocker.patch("app.download_requests.controllers.v1.routes.get_async_s3_client", return_value=s3_client)
+    request_id = PydanticObjectId()
+    mock_repo_find_by_id.return_value = make_completed_entity(request_id)
+    mock_video_repo_find_by_video_id.video = DownloadRequestVideo(
+        id="abc", title="Video", path="/gone.mp4", objectKey="key.mp4"
+    )
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get(f"/api/v1/download-requests/{request_id}/videos/abc/content")
+        assert response.status_code == 307
+        assert response.headers["location"] == "https://storage.example.com/presigned"
+        s3_client.get_file_url.assert_called_once_with("key.mp4")
+
+@pytest.mark.asyncio
+async def test_get_video_content_not_found(mock_repo_find_by_id, mock_video_repo_find_by_video_id):
+    request_id = PydanticObjectId()
+    mock_repo_find_by_id.return_value = make_completed_entity(request_id)
+    mock_video_repo_find_by_video_id.video = DownloadRequestVideo(id="abc", title="Video", path="/missing.mp4")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get(f"/api/v1/download-requests/{request_id}/videos/other/content")
+        assert response.status_code == 404
+        response = await client.get(f"/api/v1/download-requests/{request_id}/videos/abc/content")
+        assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_create_download_requests_bulk(mock_repo_create_many, mock_repo_find_in_flight, mocker):
+    mocker.patch("app.config.config.BULK_CHUNK_SIZE", 2)
+    in_flight_id = PydanticObjectId()
+    mock_repo_find_in_flight.return_value = {
+        DownloadRequestCreateSchema(url="http://example.com/running").dedup_key(): in_flight_id,
+    }
+    request_data = [
+        {"url": "http://example.com/video1"},
+        {"url": "invalid-url"},
+        {"url": "http://example.com/video1"},
+        {"url": "http://example.com/running"},
+        {"nope": 1},
+        {"url": "http://example.com/video1", "profile": "audio-m4a"},
+    ]
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/api/v1/download-requests/bulk", json=request_data)
+        assert response.status_code == 200
+        results = response.json()
+        assert [result["result"] for result in results] == [
+            "created", "invalid", "duplicate", "duplicate", "invalid", "created",
+        ]
+        assert results[2]["id"] == results[0]["id"]
+        assert results[3]["id"] == str(in_flight_id)
+        # The same URL with another profile is a different request
+        assert results[5]["id"] != results[0]["id"]
+        # One insert per chunk, never with already known requests
+        assert mock_repo_create_many.call_count == 2
+
+@pytest.mark.asyncio
+async def test_create_download_requests_bulk_ndjson(mock_repo_create_many, mock_repo_find_in_flight):
+    body = b'{"url": "http://example.com/video1"}\n\n{"url": "http://example.com/video2"}\nnot json\n'
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post(
+            "/api/v1/download-requests/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+        )
+        assert response.status_code == 200
+        assert [result["result"] for result in response.json()] == ["created", "created", "invalid"]
+
+@pytest.mark.asyncio
+async def test_create_download_requests_bulk_requires_array():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/api/v1/download-requests/bulk", json={"url": "http://example.com/video1"})
+        assert response.status_code == 400
@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class AudioCodec(str, Enum):
+    AAC = 'aac'
+    OPUS = 'opus'
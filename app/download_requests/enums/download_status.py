@@ -5,4 +5,8 @@ class DownloadStatus(str, Enum):
     REGISTERED = 'Registered'
     IN_PROGRESS = 'InProgress'
     COMPLETED = 'Completed'
-    FAILED = 'Failed'
\ No newline at end of file
+    FAILED = 'Failed'
+
+    @property
+    def is_terminal(self) -> bool:
+        return self in (DownloadStatus.COMPLETED, DownloadStatus.FAILED)
@@ -0,0 +1,14 @@
+from enum import Enum
+
+
+class TranscodeProfile(str, Enum):
+    # Keep the downloaded streams, only move the MP4 index to the front for streaming
+    ORIGINAL = 'original'
+    AUDIO_M4A = 'audio-m4a'
+    AUDIO_OPUS = 'audio-opus'
+    MAX_720P = 'max-720p'
+    MAX_480P = 'max-480p'
+
+    @property
+    def is_audio(self) -> bool:
+        return self in (TranscodeProfile.AUDIO_M4A, TranscodeProfile.AUDIO_OPUS)
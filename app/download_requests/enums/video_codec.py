@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class VideoCodec(str, Enum):
+    H264 = 'h264'
+    VP9 = 'vp9'
+    AV1 = 'av1'
@@ -1,3 +1,4 @@
+import logging
 from abc import ABC
 from datetime import datetime, timezone
 from typing import Annotated, Optional
@@ -5,6 +6,8 @@ from typing import Annotated, Optional
 from beanie import Document, Indexed, before_event, Insert, Replace
 from pydantic import Field
 
+logger = logging.getLogger(__name__)
+
 
 def get_current_utc_time():
     return datetime.now(timezone.utc)
@@ -26,9 +29,8 @@ class BaseEntity(ABC, Document):
         self.updatedAt = datetime.now(timezone.utc)
 
     async def soft_delete(self):
-        self.deleted = True
-        self.deletedAt = datetime.now(timezone.utc)
-        await self.save()
+        now = datetime.now(timezone.utc)
+        await self.set({"deleted": True, "deletedAt": now, "updatedAt": now})
 
     @classmethod
     def find_active(cls, **kwargs):
@@ -44,7 +46,7 @@ class BaseEntity(ABC, Document):
         }
 
         base_query.update(kwargs)
-        print(base_query)
+        logger.debug("find_active query: %s", base_query)
         return cls.find(base_query)
 
 
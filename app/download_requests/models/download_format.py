@@ -0,0 +1,19 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from app.download_requests.enums.audio_codec import AudioCodec
+from app.download_requests.enums.video_codec import VideoCodec
+
+
+class DownloadFormat(BaseModel):
+    """
+    Which streams of a video to download. Codec preferences are followed when such a
+    stream exists, maxHeight and maxFilesizeMb are hard limits.
+    """
+
+    audioOnly: bool = False
+    maxHeight: Optional[int] = Field(default=None, ge=144, le=4320)
+    videoCodec: Optional[VideoCodec] = None
+    audioCodec: Optional[AudioCodec] = None
+    maxFilesizeMb: Optional[int] = Field(default=None, ge=1)
@@ -0,0 +1,8 @@
+from typing import Optional
+from pydantic import BaseModel
+
+
+class DownloadProgress(BaseModel):
+    downloadedBytes: int = 0
+    totalBytes: Optional[int] = None
+    speed: Optional[float] = None
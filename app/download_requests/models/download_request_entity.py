@@ -1,11 +1,17 @@
+from datetime import datetime
 from typing import Optional, Annotated
 
 from beanie import Indexed
 from pydantic import Field
+from pymongo import ASCENDING, DESCENDING, IndexModel
 
 from app.download_requests.enums.download_status import DownloadStatus
+from app.download_requests.enums.transcode_profile import TranscodeProfile
 from app.download_requests.models.base_entity import BaseEntity
-from app.download_requests.models.download_request_video import DownloadRequestVideo
+from app.download_requests.models.download_format import DownloadFormat
+from app.download_requests.models.download_progress import DownloadProgress
+
+ACTIVE_FILTER = {"deleted": False}
 
 
 class DownloadRequestEntity(BaseEntity):
@@ -13,11 +19,45 @@ class DownloadRequestEntity(BaseEntity):
     title: Optional[str] = None
     status: Annotated[DownloadStatus, Indexed()]
     imageUrl: Optional[str] = None
-    videos: list[DownloadRequestVideo] = Field(default_factory=list)
 
     isPlaylist: Optional[bool] = Field(default=False)
     playlistCount: Optional[int] = None
-    downloadedCount: Optional[int] = None
+    # Aggregates of the videos stored in DownloadRequestVideoEntity
+    downloadedCount: int = 0
+    downloadedBytes: int = 0
+    # Byte progress of the videos currently downloading, keyed by video id
+    progress: dict[str, DownloadProgress] = Field(default_factory=dict)
+
+    # Scheduling: priority orders the requests of a tenant, tenants share the workers fairly
+    priority: int = 0
+    tenant: Optional[str] = None
+
+    # Server-side conversion applied to the downloaded videos
+    profile: TranscodeProfile = TranscodeProfile.ORIGINAL
+    # Streams to download, the best video and audio when not set
+    format: Optional[DownloadFormat] = None
+
+    # Lease held by the worker currently processing the request
+    workerId: Optional[str] = None
+    leaseExpiresAt: Optional[datetime] = None
+
+    # Retries after upstream throttling, the request is not claimed again before notBefore
+    attempts: int = 0
+    notBefore: Optional[datetime] = None
 
     class Settings:
-        name = "download_requests"
\ No newline at end of file
+        name = "download_requests"
+        indexes = [
+            IndexModel([("status", ASCENDING), ("leaseExpiresAt", ASCENDING)]),
+            IndexModel([("status", ASCENDING), ("createdAt", ASCENDING), ("_id", ASCENDING)]),
+            IndexModel([("url", ASCENDING), ("status", ASCENDING)]),
+            IndexModel([("status", ASCENDING), ("notBefore", ASCENDING)]),
+            # Listing indexes, partial on the `deleted: false` filter applied by find_active so that
+            # soft-deleted requests neither bloat them nor have to be skipped by the queries
+            IndexModel([("createdAt", DESCENDING), ("_id", DESCENDING)], partialFilterExpression=ACTIVE_FILTER),
+            IndexModel([("status", ASCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)], partialFilterExpression=ACTIVE_FILTER),
+            IndexModel([("isPlaylist", ASCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)], partialFilterExpression=ACTIVE_FILTER),
+            # Retention of finished requests and purge of soft-deleted ones
+            IndexModel([("status", ASCENDING), ("updatedAt", ASCENDING)], partialFilterExpression=ACTIVE_FILTER),
+            IndexModel([("deletedAt", ASCENDING)], partialFilterExpression={"deleted": True}),
+        ]
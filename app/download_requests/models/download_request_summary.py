@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import Optional
+
+from beanie import PydanticObjectId
+from pydantic import BaseModel, Field
+
+from app.download_requests.enums.download_status import DownloadStatus
+
+
+class DownloadRequestSummary(BaseModel):
+    """
+    Projection of a download request without its videos, used for listings
+    """
+
+    id: PydanticObjectId = Field(alias="_id")
+    url: str
+    title: Optional[str] = None
+    status: DownloadStatus
+    imageUrl: Optional[str] = None
+    isPlaylist: Optional[bool] = False
+    playlistCount: Optional[int] = None
+    downloadedCount: Optional[int] = None
+    createdAt: datetime
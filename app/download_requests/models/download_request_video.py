@@ -7,4 +7,9 @@ class DownloadRequestVideo(BaseModel):
     title: str
     path: str
     imageUrl: Optional[str] = None
-    duration: Optional[int] = 0
\ No newline at end of file
+    duration: Optional[int] = 0
+    position: Optional[int] = None
+    objectKey: Optional[str] = None
+    cacheKey: Optional[str] = None
+    # Size in bytes of the downloaded file
+    size: Optional[int] = None
@@ -0,0 +1,49 @@
+from datetime import datetime
+from typing import Optional
+
+from beanie import Document, PydanticObjectId
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+from app.download_requests.models.base_entity import get_current_utc_time
+from app.download_requests.models.download_request_video import DownloadRequestVideo
+
+
+class DownloadRequestVideoEntity(Document):
+    """
+    Video downloaded for a request, stored apart from the request so that large playlists
+    neither grow the request document nor slow down its reads.
+    Single videos are stored at position 0.
+    """
+
+    requestId: PydanticObjectId
+    position: int = 0
+    videoId: str
+    title: str
+    path: str
+    imageUrl: Optional[str] = None
+    duration: Optional[int] = 0
+    objectKey: Optional[str] = None
+    cacheKey: Optional[str] = None
+    size: Optional[int] = None
+    createdAt: datetime = Field(default_factory=get_current_utc_time)
+
+    class Settings:
+        name = "download_request_videos"
+        indexes = [
+            IndexModel([("requestId", ASCENDING), ("position", ASCENDING)], unique=True),
+            IndexModel([("requestId", ASCENDING), ("videoId", ASCENDING)]),
+        ]
+
+    def to_video(self) -> DownloadRequestVideo:
+        return DownloadRequestVideo(
+            id=self.videoId,
+            title=self.title,
+            path=self.path,
+            imageUrl=self.imageUrl,
+            duration=self.duration,
+            position=self.position,
+            objectKey=self.objectKey,
+            cacheKey=self.cacheKey,
+            size=self.size,
+        )
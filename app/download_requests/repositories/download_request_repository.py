@@ -1,28 +1,96 @@
 from __future__ import annotations
 
+from datetime import datetime, timedelta
 from typing import Optional
 
 from beanie import PydanticObjectId
+from beanie.odm.queries.update import UpdateResponse
+from beanie.odm.utils.encoder import Encoder
+from pymongo import ReturnDocument
 
+from app.download_requests.models.base_entity import get_current_utc_time
+from app.download_requests.models.download_progress import DownloadProgress
 from app.download_requests.models.download_request_entity import DownloadRequestEntity
+from app.download_requests.models.download_request_summary import DownloadRequestSummary
+from app.download_requests.models.download_request_video import DownloadRequestVideo
+from app.download_requests.repositories.download_request_video_repository import DownloadRequestVideoRepository
 from app.download_requests.enums.download_status import DownloadStatus
 from app.download_requests.schemas.download_request_create_schema import DownloadRequestCreateSchema
+from app.download_requests.schemas.download_request_cursor import DownloadRequestCursor
+from app.media_cache.repositories.media_cache_repository import MediaCacheRepository
+from app.stats.repositories.download_stats_repository import DownloadStatsRepository
 
 
 class DownloadRequestRepository:
     @staticmethod
     async def create(data: DownloadRequestCreateSchema) -> DownloadRequestEntity:
-            
+
         entity = DownloadRequestEntity(
             url=data.url,
             status=DownloadStatus.REGISTERED,
-            imageUrl=None
+            imageUrl=None,
+            priority=data.priority,
+            tenant=data.tenant,
+            profile=data.profile,
+            format=data.format,
         )
 
         await entity.insert()
+        await DownloadStatsRepository.increment({DownloadStatus.REGISTERED: 1}, created=1)
 
         return entity
 
+    @staticmethod
+    async def create_many(items: list[DownloadRequestCreateSchema]) -> list[DownloadRequestEntity]:
+        """
+        Insert several requests with a single insert_many round-trip
+        """
+        entities = [
+            DownloadRequestEntity(
+                url=data.url,
+                status=DownloadStatus.REGISTERED,
+                imageUrl=None,
+                priority=data.priority,
+                tenant=data.tenant,
+                profile=data.profile,
+                format=data.format,
+            )
+            for data in items
+        ]
+        if not entities:
+            return []
+
+        result = await DownloadRequestEntity.insert_many(entities)
+        for entity, inserted_id in zip(entities, result.inserted_ids):
+            entity.id = inserted_id
+        await DownloadStatsRepository.increment({DownloadStatus.REGISTERED: len(entities)}, created=len(entities))
+
+        return entities
+
+    @staticmethod
+    async def find_in_flight(items: list[DownloadRequestCreateSchema]) -> dict[tuple, PydanticObjectId]:
+        """
+        Returns the ids of registered or in-progress requests equivalent to the given items, keyed by
+        DownloadRequestCreateSchema.dedup_key, so that only the same URL, tenant, profile and format match
+        """
+        keys = {item.dedup_key() for item in items}
+        rows = await DownloadRequestEntity.get_pymongo_collection().find(
+            {
+                "url": {"$in": list({item.url for item in items})},
+                "status": {"$in": [DownloadStatus.REGISTERED, DownloadStatus.IN_PROGRESS]},
+                "deleted": False,
+            },
+            projection={"url": 1, "tenant": 1, "profile": 1, "format": 1},
+        ).to_list()
+        in_flight = {}
+        for row in rows:
+            key = DownloadRequestCreateSchema.model_validate(
+                {field: row[field] for field in ("url", "tenant", "profile", "format") if row.get(field) is not None}
+            ).dedup_key()
+            if key in keys:
+                in_flight.setdefault(key, row["_id"])
+        return in_flight
+
     @staticmethod
     async def find_by_id(request_id: str) -> Optional[DownloadRequestEntity]:
         object_id = PydanticObjectId(request_id)
@@ -33,19 +101,341 @@ class DownloadRequestRepository:
         return await DownloadRequestEntity.find_active().to_list()
 
     @staticmethod
-    async def update(request_id: str, data: dict) -> Optional[DownloadRequestEntity]:
-        entity = await DownloadRequestRepository.find_by_id(request_id)
-        if entity:
-            for key, value in data.items():
-                setattr(entity, key, value)
-            await entity.save()
-            return entity
-        return None
+    async def find_page(
+        limit: int,
+        cursor: Optional[DownloadRequestCursor] = None,
+        status: Optional[DownloadStatus] = None,
+        is_playlist: Optional[bool] = None,
+    ) -> list[DownloadRequestSummary]:
+        """
+        Returns request summaries newest first, paging with a (createdAt, _id) keyset
+        :param limit: Maximum number of summaries to return
+        :param cursor: Position of the last summary of the previous page
+        :param status: Only return requests with this status
+        :param is_playlist: Only return playlists (True) or single videos (False)
+        """
+        query = {}
+        if status is not None:
+            query["status"] = status
+        if is_playlist is not None:
+            query["isPlaylist"] = is_playlist
+        if cursor is not None:
+            query["$or"] = [
+                {"createdAt": {"$lt": cursor.createdAt}},
+                {"createdAt": cursor.createdAt, "_id": {"$lt": cursor.id}},
+            ]
+
+        return await DownloadRequestEntity.find_active(**query) \
+            .sort("-createdAt", "-_id") \
+            .limit(limit) \
+            .project(DownloadRequestSummary) \
+            .to_list()
+
+    @staticmethod
+    async def find_registered(
+        after: Optional[DownloadRequestEntity] = None,
+        limit: int = 100,
+    ) -> list[DownloadRequestEntity]:
+        """
+        Returns the oldest registered requests, paging with a (createdAt, _id) keyset
+        :param after: Last request of the previous page
+        :param limit: Maximum number of requests to return
+        """
+        conditions = [DownloadRequestRepository._is_due(get_current_utc_time())]
+        if after is not None:
+            conditions.append({"$or": [
+                {"createdAt": {"$gt": after.createdAt}},
+                {"createdAt": after.createdAt, "_id": {"$gt": after.id}},
+            ]})
+
+        return await DownloadRequestEntity.find_active(status=DownloadStatus.REGISTERED, **{"$and": conditions}) \
+            .sort("+createdAt", "+_id") \
+            .limit(limit) \
+            .to_list()
+
+    @staticmethod
+    async def count_by_status() -> dict[DownloadStatus, int]:
+        """
+        Number of non-deleted requests in each status, computed with an aggregation over the whole collection.
+        Prefer the maintained counters of DownloadStatsRepository outside of reconciliation.
+        """
+        counts = {status: 0 for status in DownloadStatus}
+        rows = await DownloadRequestEntity.find_active().aggregate([
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+        ]).to_list()
+        for row in rows:
+            counts[DownloadStatus(row["_id"])] = row["count"]
+        return counts
+
+    @staticmethod
+    async def find_due_retries(since: datetime, until: datetime) -> list[DownloadRequestEntity]:
+        """
+        Returns the registered requests whose retry delay ended in (since, until]
+        """
+        return await DownloadRequestEntity.find_active(
+            status=DownloadStatus.REGISTERED,
+            notBefore={"$gt": since, "$lte": until},
+        ).sort("+notBefore").to_list()
+
+    @staticmethod
+    async def update(
+        request_id: str,
+        data: dict,
+        expected_status: Optional[DownloadStatus] = None,
+        worker_id: Optional[str] = None,
+    ) -> bool:
+        """
+        Set the given fields with a single atomic update, without reading nor rewriting the whole document
+        :param request_id: Id of the request to update
+        :param data: Fields to set, values must already be serializable (e.g. model_dump() of nested models)
+        :param expected_status: Only update the request while it is still in this status
+        :param worker_id: Only update the request while this worker holds its lease
+        :return: False when the request does not exist, is deleted, is no longer in `expected_status`
+            or is no longer leased by `worker_id`
+        """
+        query = {"_id": PydanticObjectId(request_id), "deleted": False}
+        if expected_status is not None:
+            query["status"] = expected_status
+        if worker_id is not None:
+            query["workerId"] = worker_id
+        update = {"$set": {**Encoder().encode(data), "updatedAt": get_current_utc_time()}}
+
+        if "status" not in data:
+            result = await DownloadRequestEntity.find_one(query).update(update)
+            return result.matched_count == 1
+
+        # Only what the stats counters need is sent back: the previous status and the video aggregates
+        previous = await DownloadRequestEntity.get_pymongo_collection().find_one_and_update(
+            query,
+            update,
+            projection={"status": 1, "downloadedCount": 1, "downloadedBytes": 1},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if previous is None:
+            return False
+        current = {**previous, **data}
+        await DownloadRequestRepository._record_status_change(
+            DownloadStatus(previous["status"]),
+            DownloadStatus(data["status"]),
+            current.get("downloadedCount") or 0,
+            current.get("downloadedBytes") or 0,
+        )
+        return True
+
+    @staticmethod
+    async def _record_status_change(
+        previous: DownloadStatus, current: DownloadStatus, videos: int, downloaded_bytes: int
+    ) -> None:
+        flows = {}
+        if current == DownloadStatus.COMPLETED:
+            flows = {"completed": 1, "videos": videos, "bytes": downloaded_bytes}
+        elif current == DownloadStatus.FAILED:
+            flows = {"failed": 1}
+        await DownloadStatsRepository.record_transition(previous, current, **flows)
+
+    @staticmethod
+    async def append_video(request_id: str, video: DownloadRequestVideo, worker_id: Optional[str] = None) -> bool:
+        """
+        Store a finished video and update the aggregates of the request.
+        A video stored again by a retried attempt replaces the previous one without being counted twice,
+        releasing the cached media the previous one referenced.
+        :param worker_id: Only store the video while this worker holds the lease of the in-progress request
+        :return: False when the video was not stored because the request was deleted or `worker_id` lost the lease
+        """
+        query = {"_id": PydanticObjectId(request_id), "deleted": False}
+        if worker_id is not None:
+            query.update(status=DownloadStatus.IN_PROGRESS, workerId=worker_id)
+        result = await DownloadRequestEntity.find_one(query).update({
+            "$set": {"updatedAt": get_current_utc_time()},
+            "$unset": {DownloadRequestRepository._progress_field(video.id): ""},
+        })
+        if result.matched_count != 1:
+            # Nothing references the cached media taken for this video
+            if video.cacheKey:
+                await MediaCacheRepository.release([video.cacheKey])
+            return False
+
+        replaced = await DownloadRequestVideoRepository.save(request_id, video)
+        if replaced is None:
+            increments = {"downloadedCount": 1, "downloadedBytes": video.size or 0}
+        else:
+            increments = {"downloadedBytes": (video.size or 0) - (replaced.size or 0)}
+            # The replaced video held a reference on its cached media
+            if replaced.cacheKey:
+                await MediaCacheRepository.release([replaced.cacheKey])
+        await DownloadRequestEntity.find_one({"_id": PydanticObjectId(request_id)}).update({"$inc": increments})
+        return True
+
+    @staticmethod
+    async def update_progress(request_id: str, video_id: str, progress: DownloadProgress) -> None:
+        await DownloadRequestEntity.find_one({"_id": PydanticObjectId(request_id)}).update({
+            "$set": {DownloadRequestRepository._progress_field(video_id): progress.model_dump()},
+        })
+
+    @staticmethod
+    def _progress_field(video_id: str) -> str:
+        # Dots and dollar signs are not allowed in field names
+        return "progress." + video_id.replace(".", "_").replace("$", "_")
 
     @staticmethod
     async def delete(request_id: str) -> bool:
-        entity = await DownloadRequestRepository.find_by_id(request_id)
-        if entity:
-            await entity.soft_delete()
-            return True
-        return False
\ No newline at end of file
+        """
+        Soft delete a request with a single atomic update and release its cached media
+        """
+        now = get_current_utc_time()
+        previous = await DownloadRequestEntity.get_pymongo_collection().find_one_and_update(
+            {"_id": PydanticObjectId(request_id), "deleted": False},
+            {"$set": {"deleted": True, "deletedAt": now, "updatedAt": now}},
+            projection={"status": 1},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if previous is None:
+            return False
+        await DownloadStatsRepository.increment({DownloadStatus(previous["status"]): -1}, deleted=1)
+        await MediaCacheRepository.release(await DownloadRequestVideoRepository.find_cache_keys(request_id))
+        return True
+
+    @staticmethod
+    async def find_finished_before(
+        status: DownloadStatus, updated_before: datetime, limit: int
+    ) -> list[PydanticObjectId]:
+        """
+        Ids of the oldest non-deleted requests left in `status` since before `updated_before`
+        """
+        rows = await DownloadRequestEntity.get_pymongo_collection().find(
+            {"deleted": False, "status": status, "updatedAt": {"$lt": updated_before}},
+            projection={"_id": 1},
+        ).sort("updatedAt", 1).limit(limit).to_list()
+        return [row["_id"] for row in rows]
+
+    @staticmethod
+    async def find_deleted_before(
+        deleted_before: datetime, limit: int, exclude: Optional[list[PydanticObjectId]] = None
+    ) -> list[PydanticObjectId]:
+        """
+        Ids of the requests soft-deleted before `deleted_before`, oldest deletion first
+        :param exclude: Ids to leave out, e.g. requests whose media could not be removed
+        """
+        query = {"deleted": True, "deletedAt": {"$lt": deleted_before}}
+        if exclude:
+            query["_id"] = {"$nin": exclude}
+        rows = await DownloadRequestEntity.get_pymongo_collection().find(
+            query, projection={"_id": 1},
+        ).sort("deletedAt", 1).limit(limit).to_list()
+        return [row["_id"] for row in rows]
+
+    @staticmethod
+    async def hard_delete(request_ids: list[PydanticObjectId]) -> int:
+        """
+        Remove soft-deleted requests from the collection, requests that are not deleted are left untouched
+        """
+        result = await DownloadRequestEntity.find({"_id": {"$in": request_ids}, "deleted": True}).delete()
+        return result.deleted_count
+
+    @staticmethod
+    async def claim(request_id: str, worker_id: str, lease_seconds: int) -> Optional[DownloadRequestEntity]:
+        """
+        Atomically move a registered request to IN_PROGRESS under a lease owned by `worker_id`.
+        Returns None when the request was already claimed by another worker, deleted or is
+        waiting for a retry delay.
+        """
+        now = get_current_utc_time()
+        claimed = await DownloadRequestEntity.find_one({
+            "_id": PydanticObjectId(request_id),
+            "status": DownloadStatus.REGISTERED,
+            "deleted": False,
+            **DownloadRequestRepository._is_due(now),
+        }).update(
+            {"$set": {
+                "status": DownloadStatus.IN_PROGRESS,
+                "workerId": worker_id,
+                "leaseExpiresAt": now + timedelta(seconds=lease_seconds),
+                "updatedAt": now,
+            }},
+            response_type=UpdateResponse.NEW_DOCUMENT,
+        )
+        if claimed is not None:
+            await DownloadStatsRepository.record_transition(DownloadStatus.REGISTERED, DownloadStatus.IN_PROGRESS)
+        return claimed
+
+    @staticmethod
+    async def renew_lease(request_id: str, worker_id: str, lease_seconds: int) -> bool:
+        """
+        Extend the lease of an in-progress request, returns False if the worker no longer owns it or it was deleted
+        """
+        result = await DownloadRequestEntity.find_one({
+            "_id": PydanticObjectId(request_id),
+            "status": DownloadStatus.IN_PROGRESS,
+            "workerId": worker_id,
+            "deleted": False,
+        }).update(
+            {"$set": {"leaseExpiresAt": get_current_utc_time() + timedelta(seconds=lease_seconds)}},
+        )
+        return result.matched_count == 1
+
+    @staticmethod
+    async def requeue_for_retry(request_id: str, worker_id: str, not_before: datetime) -> bool:
+        """
+        Release an in-progress request owned by `worker_id` back to REGISTERED, to be claimed again after `not_before`
+        """
+        result = await DownloadRequestEntity.find_one({
+            "_id": PydanticObjectId(request_id),
+            "status": DownloadStatus.IN_PROGRESS,
+            "workerId": worker_id,
+        }).update({
+            "$set": {
+                "status": DownloadStatus.REGISTERED,
+                "workerId": None,
+                "leaseExpiresAt": None,
+                "notBefore": not_before,
+                "progress": {},
+                "updatedAt": get_current_utc_time(),
+            },
+            "$inc": {"attempts": 1},
+        })
+        if result.modified_count != 1:
+            return False
+        await DownloadStatsRepository.record_transition(DownloadStatus.IN_PROGRESS, DownloadStatus.REGISTERED)
+        return True
+
+    @staticmethod
+    def _is_due(now: datetime) -> dict:
+        return {"$or": [{"notBefore": None}, {"notBefore": {"$lte": now}}]}
+
+    @staticmethod
+    async def requeue_expired_leases() -> list[DownloadRequestEntity]:
+        """
+        Put in-progress requests whose lease expired back to REGISTERED so another worker can claim them.
+        Requests left in progress without any lease (e.g. by a crashed worker) are requeued as well.
+        Deleted requests are left alone, they are no longer counted in the stats.
+        :return: The requeued requests
+        """
+        now = get_current_utc_time()
+        query = {
+            "status": DownloadStatus.IN_PROGRESS,
+            "deleted": False,
+            "$or": [
+                {"leaseExpiresAt": {"$lt": now}},
+                {"leaseExpiresAt": None},
+            ],
+        }
+        rows = await DownloadRequestEntity.get_pymongo_collection().find(query, projection={"_id": 1}).to_list()
+        requeued = []
+        for row in rows:
+            # The lease may have been renewed since it was found expired
+            entity = await DownloadRequestEntity.find_one({"_id": row["_id"], **query}).update(
+                {"$set": {
+                    "status": DownloadStatus.REGISTERED,
+                    "workerId": None,
+                    "leaseExpiresAt": None,
+                    "updatedAt": now,
+                }},
+                response_type=UpdateResponse.NEW_DOCUMENT,
+            )
+            if entity is not None:
+                requeued.append(entity)
+        if requeued:
+            await DownloadStatsRepository.record_transition(
+                DownloadStatus.IN_PROGRESS, DownloadStatus.REGISTERED, count=len(requeued)
+            )
+        return requeued
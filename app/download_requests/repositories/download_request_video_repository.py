@@ -0,0 +1,83 @@
+from typing import Optional
+
+from beanie import PydanticObjectId
+from pymongo import ReturnDocument
+
+from app.download_requests.models.base_entity import get_current_utc_time
+from app.download_requests.models.download_request_video import DownloadRequestVideo
+from app.download_requests.models.download_request_video_entity import DownloadRequestVideoEntity
+
+
+class DownloadRequestVideoRepository:
+    @staticmethod
+    async def save(request_id: str, video: DownloadRequestVideo) -> Optional[DownloadRequestVideo]:
+        """
+        Store the video at its position in the request, replacing the video stored there by a previous attempt
+        :return: The replaced video, None when no video was stored at this position yet
+        """
+        fields = video.model_dump(exclude={"id", "position"})
+        previous = await DownloadRequestVideoEntity.get_pymongo_collection().find_one_and_update(
+            {"requestId": PydanticObjectId(request_id), "position": video.position or 0},
+            {"$set": {"videoId": video.id, **fields}, "$setOnInsert": {"createdAt": get_current_utc_time()}},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE,
+        )
+        return DownloadRequestVideoEntity.model_validate(previous).to_video() if previous else None
+
+    @staticmethod
+    async def find_page(request_id: str, limit: int, after: Optional[int] = None) -> list[DownloadRequestVideo]:
+        """
+        Returns the videos of a request ordered by position, paging with the position as keyset
+        :param limit: Maximum number of videos to return
+        :param after: Position of the last video of the previous page
+        """
+        query = {"requestId": PydanticObjectId(request_id)}
+        if after is not None:
+            query["position"] = {"$gt": after}
+        entities = await DownloadRequestVideoEntity.find(query).sort("+position").limit(limit).to_list()
+        return [entity.to_video() for entity in entities]
+
+    @staticmethod
+    async def find_positions(request_id: str) -> list[int]:
+        """
+        Positions already holding a video, used to skip them when a request is retried
+        """
+        return await DownloadRequestVideoEntity.distinct("position", {"requestId": PydanticObjectId(request_id)})
+
+    @staticmethod
+    async def find_by_video_id(request_id: str, video_id: str) -> Optional[DownloadRequestVideo]:
+        entity = await DownloadRequestVideoEntity.find_one({
+            "requestId": PydanticObjectId(request_id),
+            "videoId": video_id,
+        })
+        return entity.to_video() if entity else None
+
+    @staticmethod
+    async def find_cache_keys(request_id: str) -> list[str]:
+        """
+        Media cache keys referenced by the videos of a request, once per video
+        """
+        rows = await DownloadRequestVideoEntity.get_pymongo_collection().find(
+            {"requestId": PydanticObjectId(request_id), "cacheKey": {"$ne": None}},
+            projection={"cacheKey": 1, "_id": 0},
+        ).to_list()
+        return [row["cacheKey"] for row in rows]
+
+    @staticmethod
+    async def find_uncached_media(request_ids: list[PydanticObjectId]) -> dict[PydanticObjectId, list[DownloadRequestVideo]]:
+        """
+        Videos of the given requests whose media is owned by the request rather than by the media cache, keyed by request id
+        """
+        entities = await DownloadRequestVideoEntity.find({
+            "requestId": {"$in": request_ids},
+            "cacheKey": None,
+        }).to_list()
+        media = {}
+        for entity in entities:
+            media.setdefault(entity.requestId, []).append(entity.to_video())
+        return media
+
+    @staticmethod
+    async def delete_by_requests(request_ids: list[PydanticObjectId]) -> int:
+        result = await DownloadRequestVideoEntity.find({"requestId": {"$in": request_ids}}).delete()
+        return result.deleted_count
@@ -0,0 +1,288 @@
+from datetime import timedelta
+
+import pytest
+from beanie import init_beanie
+from mongomock_motor import AsyncMongoMockClient
+
+from app.config.database import DOCUMENT_MODELS
+from app.download_requests.enums.download_status import DownloadStatus
+from app.download_requests.enums.transcode_profile import TranscodeProfile
+from app.download_requests.models.base_entity import get_current_utc_time
+from app.download_requests.models.download_format import DownloadFormat
+from app.download_requests.models.download_request_entity import DownloadRequestEntity
+from app.download_requests.models.download_request_video import DownloadRequestVideo
+from app.download_requests.repositories.download_request_repository import DownloadRequestRepository
+from app.download_requests.repositories.download_request_video_repository import DownloadRequestVideoRepository
+from app.download_requests.schemas.download_request_create_schema import DownloadRequestCreateSchema
+from app.download_requests.schemas.download_request_cursor import DownloadRequestCursor
+from app.media_cache.models.media_cache_entity import MediaCacheEntity
+
+
+@pytest.fixture(autouse=True)
+async def database():
+    client = AsyncMongoMockClient()
+    await init_beanie(database=client["yt_downloads_test"], document_models=DOCUMENT_MODELS)
+    yield
+
+
+async def create_request(url: str = "http://example.com/video") -> DownloadRequestEntity:
+    return await DownloadRequestRepository.create(DownloadRequestCreateSchema(url=url))
+
+
+@pytest.mark.asyncio
+async def test_claim_is_exclusive():
+    entity = await create_request()
+
+    claimed = await DownloadRequestRepository.claim(str(entity.id), "worker-a", 60)
+    assert claimed is not None
+    assert claimed.status == DownloadStatus.IN_PROGRESS
+    assert claimed.workerId == "worker-a"
+    assert claimed.leaseExpiresAt is not None
+
+    assert await DownloadRequestRepository.claim(str(entity.id), "worker-b", 60) is None
+
+
+@pytest.mark.asyncio
+async def test_claim_skips_deleted_requests():
+    entity = await create_request()
+    await DownloadRequestRepository.delete(str(entity.id))
+
+    assert await DownloadRequestRepository.claim(str(entity.id), "worker-a", 60) is None
+
+
+@pytest.mark.asyncio
+async def test_renew_lease_only_for_owner():
+    entity = await create_request()
+    await DownloadRequestRepository.claim(str(entity.id), "worker-a", 60)
+
+    assert await DownloadRequestRepository.renew_lease(str(entity.id), "worker-a", 60)
+    assert not await DownloadRequestRepository.renew_lease(str(entity.id), "worker-b", 60)
+
+
+@pytest.mark.asyncio
+async def test_requeue_expired_leases():
+    expired = await create_request("http://example.com/expired")
+    alive = await create_request("http://example.com/alive")
+    await DownloadRequestRepository.claim(str(expired.id), "worker-a", 60)
+    await DownloadRequestRepository.claim(str(alive.id), "worker-b", 60)
+    await DownloadRequestEntity.find_one({"_id": expired.id}).update(
+        {"$set": {"leaseExpiresAt": get_current_utc_time() - timedelta(seconds=1)}}
+    )
+
+    assert [entity.id for entity in await DownloadRequestRepository.requeue_expired_leases()] == [expired.id]
+
+    requeued = await DownloadRequestRepository.find_by_id(str(expired.id))
+    assert requeued.status == DownloadStatus.REGISTERED
+    assert requeued.workerId is None
+    still_claimed = await DownloadRequestRepository.find_by_id(str(alive.id))
+    assert still_claimed.status == DownloadStatus.IN_PROGRESS
+
+
+@pytest.mark.asyncio
+async def test_requeue_requests_left_in_progress_without_lease():
+    entity = await create_request()
+    await DownloadRequestEntity.find_one({"_id": entity.id}).update(
+        {"$set": {"status": DownloadStatus.IN_PROGRESS}}
+    )
+
+    assert len(await DownloadRequestRepository.requeue_expired_leases()) == 1
+
+
+@pytest.mark.asyncio
+async def test_deleted_requests_lose_their_lease_and_are_not_requeued():
+    entity = await create_request()
+    await DownloadRequestRepository.claim(str(entity.id), "worker-a", 60)
+    await DownloadRequestRepository.delete(str(entity.id))
+
+    assert not await DownloadRequestRepository.renew_lease(str(entity.id), "worker-a", 60)
+    await DownloadRequestEntity.find_one({"_id": entity.id}).update(
+        {"$set": {"leaseExpiresAt": get_current_utc_time() - timedelta(seconds=1)}}
+    )
+    assert await DownloadRequestRepository.requeue_expired_leases() == []
+
+
+@pytest.mark.asyncio
+async def test_find_registered_pages_oldest_first():
+    created = [await create_request(f"http://example.com/{index}") for index in range(5)]
+    await DownloadRequestRepository.claim(str(created[1].id), "worker-a", 60)
+
+    first_page = await DownloadRequestRepository.find_registered(limit=2)
+    second_page = await DownloadRequestRepository.find_registered(after=first_page[-1], limit=2)
+
+    assert [entity.url for entity in first_page + second_page] == [
+        "http://example.com/0",
+        "http://example.com/2",
+        "http://example.com/3",
+        "http://example.com/4",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_append_video_stores_videos_apart_and_counts_them_once():
+    entity = await create_request()
+    videos = [
+        DownloadRequestVideo(id="b", title="B", path="/b.mp4", position=1, size=20, cacheKey="youtube:b"),
+        DownloadRequestVideo(id="a", title="A", path="/a.mp4", position=0, size=10),
+    ]
+
+    for video in videos + videos[:1]:
+        await DownloadRequestRepository.append_video(str(entity.id), video)
+
+    updated = await DownloadRequestRepository.find_by_id(str(entity.id))
+    assert (updated.downloadedCount, updated.downloadedBytes) == (2, 30)
+    first_page = await DownloadRequestVideoRepository.find_page(str(entity.id), limit=1)
+    second_page = await DownloadRequestVideoRepository.find_page(str(entity.id), limit=1, after=first_page[-1].position)
+    assert [video.id for video in first_page + second_page] == ["a", "b"]
+    assert (await DownloadRequestVideoRepository.find_by_video_id(str(entity.id), "b")).size == 20
+    assert await DownloadRequestVideoRepository.find_cache_keys(str(entity.id)) == ["youtube:b"]
+
+
+@pytest.mark.asyncio
+async def test_append_video_replacing_a_video_releases_its_media_and_corrects_the_size():
+    entity = await create_request()
+    await MediaCacheEntity(
+        id="youtube:a", extractor="youtube", videoId="a", formatSelector="best", refCount=1
+    ).insert()
+
+    await DownloadRequestRepository.append_video(
+        str(entity.id), DownloadRequestVideo(id="a", title="A", path="/a.mp4", position=0, size=10, cacheKey="youtube:a")
+    )
+    await DownloadRequestRepository.append_video(
+        str(entity.id), DownloadRequestVideo(id="a", title="A", path="/a-retry.mp4", position=0, size=15)
+    )
+
+    updated = await DownloadRequestRepository.find_by_id(str(entity.id))
+    assert (updated.downloadedCount, updated.downloadedBytes) == (1, 15)
+    assert (await MediaCacheEntity.get("youtube:a")).refCount == 0
+    assert await DownloadRequestVideoRepository.find_cache_keys(str(entity.id)) == []
+
+@pytest.mark.asyncio
+async def test_find_page_projects_and_pages_newest_first():
+    created = [await create_request(f"http://example.com/{index}") for index in range(3)]
+    await DownloadRequestRepository.update(str(created[0].id), {"isPlaylist": True})
+
+    first_page = await DownloadRequestRepository.find_page(limit=2)
+    last = first_page[-1]
+    second_page = await DownloadRequestRepository.find_page(
+        limit=2, cursor=DownloadRequestCursor(createdAt=last.createdAt, id=last.id)
+    )
+
+    assert [summary.url for summary in first_page + second_page] == [
+        "http://example.com/2",
+        "http://example.com/1",
+        "http://example.com/0",
+    ]
+    assert not hasattr(first_page[0], "videos")
+    playlists = await DownloadRequestRepository.find_page(limit=10, is_playlist=True)
+    assert [summary.url for summary in playlists] == ["http://example.com/0"]
+
+
+@pytest.mark.asyncio
+async def test_create_many_and_find_in_flight():
+    created = await DownloadRequestRepository.create_many([
+        DownloadRequestCreateSchema(url="http://example.com/a"),
+        DownloadRequestCreateSchema(url="http://example.com/b"),
+    ])
+    assert all(entity.id is not None for entity in created)
+    await DownloadRequestRepository.update(str(created[1].id), {"status": DownloadStatus.COMPLETED})
+    item = DownloadRequestCreateSchema(url="http://example.com/a")
+
+    in_flight = await DownloadRequestRepository.find_in_flight([
+        item,
+        DownloadRequestCreateSchema(url="http://example.com/b"),
+        DownloadRequestCreateSchema(url="http://example.com/c"),
+    ])
+
+    assert in_flight == {item.dedup_key(): created[0].id}
+
+
+@pytest.mark.asyncio
+async def test_find_in_flight_tells_apart_profiles_formats_and_tenants():
+    await DownloadRequestRepository.create_many([
+        DownloadRequestCreateSchema(url="http://example.com/a", profile=TranscodeProfile.AUDIO_M4A),
+        DownloadRequestCreateSchema(url="http://example.com/a", tenant="other"),
+        DownloadRequestCreateSchema(url="http://example.com/a", format=DownloadFormat(maxHeight=720)),
+    ])
+
+    assert await DownloadRequestRepository.find_in_flight([DownloadRequestCreateSchema(url="http://example.com/a")]) == {}
+    matching = DownloadRequestCreateSchema(url="http://example.com/a", format=DownloadFormat(maxHeight=720))
+    assert list(await DownloadRequestRepository.find_in_flight([matching])) == [matching.dedup_key()]
+
+
+@pytest.mark.asyncio
+async def test_requeued_request_is_not_claimed_before_retry_delay():
+    entity = await create_request()
+    await DownloadRequestRepository.claim(str(entity.id), "worker-a", 60)
+
+    now = get_current_utc_time()
+    assert await DownloadRequestRepository.requeue_for_retry(str(entity.id), "worker-a", now + timedelta(minutes=5))
+
+    requeued = await DownloadRequestRepository.find_by_id(str(entity.id))
+    assert requeued.status == DownloadStatus.REGISTERED
+    assert requeued.attempts == 1
+    assert await DownloadRequestRepository.find_registered() == []
+    assert await DownloadRequestRepository.claim(str(entity.id), "worker-b", 60) is None
+
+    due = await DownloadRequestRepository.find_due_retries(now, now + timedelta(minutes=10))
+    assert [request.id for request in due] == [entity.id]
+
+
+@pytest.mark.asyncio
+async def test_update_respects_expected_status():
+    entity = await create_request()
+    await DownloadRequestRepository.claim(str(entity.id), "worker-a", 60)
+    await DownloadRequestRepository.requeue_for_retry(str(entity.id), "worker-a", get_current_utc_time())
+
+    assert await DownloadRequestRepository.update(
+        str(entity.id), {"status": DownloadStatus.COMPLETED}, expected_status=DownloadStatus.IN_PROGRESS
+    ) is False
+    assert await DownloadRequestRepository.update(
+        str(entity.id), {"status": DownloadStatus.FAILED}, expected_status=DownloadStatus.REGISTERED
+    ) is True
+
+    updated = await DownloadRequestRepository.find_by_id(str(entity.id))
+    assert updated.status == DownloadStatus.FAILED
+    assert updated.updatedAt > entity.updatedAt.replace(tzinfo=None)
+
+
+@pytest.mark.asyncio
+async def test_update_and_delete_skip_deleted_requests():
+    entity = await create_request()
+
+    assert await DownloadRequestRepository.delete(str(entity.id)) is True
+    assert await DownloadRequestRepository.delete(str(entity.id)) is False
+    assert await DownloadRequestRepository.update(str(entity.id), {"title": "Title"}) is False
+
+
+@pytest.mark.asyncio
+async def test_updates_are_fenced_on_the_lease_owner():
+    entity = await create_request()
+    await DownloadRequestRepository.claim(str(entity.id), "worker-a", 60)
+    video = DownloadRequestVideo(id="abc", title="Video", path="/app/downloads/abc.mp4", size=10)
+
+    assert not await DownloadRequestRepository.append_video(str(entity.id), video, worker_id="worker-b")
+    assert not await DownloadRequestRepository.update(
+        str(entity.id), {"status": DownloadStatus.COMPLETED}, DownloadStatus.IN_PROGRESS, worker_id="worker-b"
+    )
+    assert await DownloadRequestVideoRepository.find_page(str(entity.id), limit=10) == []
+
+    assert await DownloadRequestRepository.append_video(str(entity.id), video, worker_id="worker-a")
+    assert await DownloadRequestRepository.update(
+        str(entity.id), {"status": DownloadStatus.COMPLETED}, DownloadStatus.IN_PROGRESS, worker_id="worker-a"
+    )
+    assert (await DownloadRequestRepository.find_by_id(str(entity.id))).downloadedCount == 1
+
+
+@pytest.mark.asyncio
+async def test_append_video_to_a_deleted_request_releases_its_media():
+    entity = await create_request()
+    await MediaCacheEntity(
+        id="youtube:a", extractor="youtube", videoId="a", formatSelector="best", refCount=1
+    ).insert()
+    await DownloadRequestRepository.delete(str(entity.id))
+
+    video = DownloadRequestVideo(id="a", title="A", path="/a.mp4", position=0, size=10, cacheKey="youtube:a")
+    assert not await DownloadRequestRepository.append_video(str(entity.id), video)
+
+    assert await DownloadRequestVideoRepository.find_page(str(entity.id), limit=10) == []
+    assert (await MediaCacheEntity.get("youtube:a")).refCount == 0
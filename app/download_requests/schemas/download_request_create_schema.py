@@ -1,5 +1,24 @@
-from pydantic import BaseModel
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from app.download_requests.enums.transcode_profile import TranscodeProfile
+from app.download_requests.models.download_format import DownloadFormat
 
 
 class DownloadRequestCreateSchema(BaseModel):
-    url: str
\ No newline at end of file
+    url: str
+    # Higher values are scheduled first among the requests of the same tenant
+    priority: int = Field(default=0, ge=0, le=9)
+    tenant: Optional[str] = Field(default=None, max_length=64)
+    # Server-side conversion applied to every downloaded video
+    profile: TranscodeProfile = TranscodeProfile.ORIGINAL
+    # Streams to download, the best video and audio when omitted
+    format: Optional[DownloadFormat] = None
+
+    def dedup_key(self) -> tuple[str, Optional[str], str, str]:
+        """
+        Requests with the same key produce the same output for the same tenant, whatever their priority
+        """
+        format_key = self.format.model_dump_json(exclude_defaults=True) if self.format else "{}"
+        return self.url, self.tenant, self.profile.value, format_key
@@ -0,0 +1,27 @@
+import base64
+import json
+from datetime import datetime
+
+from beanie import PydanticObjectId
+from pydantic import BaseModel
+
+
+class DownloadRequestCursor(BaseModel):
+    """
+    Position in the (createdAt, _id) ordered listing, exchanged with clients as an opaque string
+    """
+
+    createdAt: datetime
+    id: PydanticObjectId
+
+    def encode(self) -> str:
+        payload = json.dumps({"createdAt": self.createdAt.isoformat(), "id": str(self.id)})
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, cursor: str) -> "DownloadRequestCursor":
+        try:
+            payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            return cls.model_validate(json.loads(payload))
+        except ValueError as e:
+            raise ValueError("Invalid cursor") from e
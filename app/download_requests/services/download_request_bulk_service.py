@@ -0,0 +1,99 @@
+import logging
+from typing import Any, AsyncIterable
+
+from beanie import PydanticObjectId
+from pydantic import ValidationError
+from validators import url as validate_url
+
+from app.download_requests.DTOs.download_request_bulk_result_dto import DownloadRequestBulkResultDTO
+from app.download_requests.repositories.download_request_repository import DownloadRequestRepository
+from app.download_requests.schemas.download_request_create_schema import DownloadRequestCreateSchema
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadRequestBulkService:
+    """
+    Creates download requests from a stream of items in fixed-size chunks, so that
+    each chunk costs one in-flight lookup and one insert_many round-trip
+    """
+
+    @staticmethod
+    async def create_many(items: AsyncIterable[Any], chunk_size: int) -> list[DownloadRequestBulkResultDTO]:
+        """
+        :param items: Raw items, either decoded JSON values or undecoded JSON strings
+        :param chunk_size: Number of items validated and written per round-trip
+        :return: One result per item, in submission order
+        """
+        results: list[DownloadRequestBulkResultDTO] = []
+        # Ids of requests created or found earlier in this submission, keyed by DownloadRequestCreateSchema.dedup_key
+        known: dict[tuple, PydanticObjectId] = {}
+        chunk: list[Any] = []
+
+        async for item in items:
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                results.extend(await DownloadRequestBulkService._process_chunk(len(results), chunk, known))
+                chunk = []
+
+        if chunk:
+            results.extend(await DownloadRequestBulkService._process_chunk(len(results), chunk, known))
+
+        logger.info(f"Bulk submission of {len(results)} items processed")
+        return results
+
+    @staticmethod
+    async def _process_chunk(
+        offset: int,
+        chunk: list[Any],
+        known: dict[tuple, PydanticObjectId],
+    ) -> list[DownloadRequestBulkResultDTO]:
+        results: list[DownloadRequestBulkResultDTO] = []
+        # Dedup keys of the valid items, keyed by the index of their result
+        item_keys: dict[int, tuple] = {}
+        to_create: dict[tuple, DownloadRequestCreateSchema] = {}
+
+        for index, item in enumerate(chunk, start=offset):
+            try:
+                if isinstance(item, (str, bytes)):
+                    data = DownloadRequestCreateSchema.model_validate_json(item)
+                else:
+                    data = DownloadRequestCreateSchema.model_validate(item)
+            except ValidationError as e:
+                results.append(DownloadRequestBulkResultDTO(
+                    index=index, result="invalid", error=e.errors(include_url=False)[0]["msg"]
+                ))
+                continue
+
+            if not validate_url(data.url):
+                results.append(DownloadRequestBulkResultDTO(
+                    index=index, url=data.url, result="invalid", error="Invalid URL format"
+                ))
+                continue
+
+            results.append(DownloadRequestBulkResultDTO(index=index, url=data.url, result="created"))
+            item_keys[index] = data.dedup_key()
+            to_create.setdefault(item_keys[index], data)
+
+        unknown_items = [data for key, data in to_create.items() if key not in known]
+        if unknown_items:
+            known.update(await DownloadRequestRepository.find_in_flight(unknown_items))
+
+        new_items = {key: data for key, data in to_create.items() if key not in known}
+        if new_items:
+            entities = await DownloadRequestRepository.create_many(list(new_items.values()))
+            for key, entity in zip(new_items, entities):
+                known[key] = entity.id
+
+        for result in results:
+            if result.result != "created":
+                continue
+            key = item_keys[result.index]
+            result.id = str(known[key])
+            if key in new_items:
+                # Later occurrences of the same request are duplicates of the first one
+                del new_items[key]
+            else:
+                result.result = "duplicate"
+
+        return results
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Callable, Optional
+
+from pymongo.errors import OperationFailure
+
+from app.download_requests.DTOs.download_request_event_dto import DownloadRequestEventDTO
+from app.download_requests.models.download_request_entity import DownloadRequestEntity
+
+logger = logging.getLogger(__name__)
+
+WATCHED_FIELDS = ("status", "playlistCount", "downloadedCount")
+
+# Called with the id of every changed request, or None when changes may have been missed
+InvalidationListener = Callable[[Optional[str]], None]
+
+
+class DownloadRequestEventBroker:
+    """
+    Fans out a single change stream on download_requests to every client
+    watching a request, so that watchers never query MongoDB themselves.
+    Invalidation listeners are notified of every change, e.g. to drop cached responses.
+    """
+
+    def __init__(self, queue_size: int = 100, retry_delay: float = 1.0):
+        self._queue_size = queue_size
+        self._retry_delay = retry_delay
+        self._subscribers: dict[str, set[asyncio.Queue]] = defaultdict(set)
+        self._resume_token: Optional[dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._invalidation_listeners: list[InvalidationListener] = []
+        self._watching = False
+
+    @property
+    def watching(self) -> bool:
+        """
+        Whether the change stream is open, i.e. whether invalidation listeners are notified of changes
+        """
+        return self._watching
+
+    def add_invalidation_listener(self, listener: InvalidationListener) -> None:
+        self._invalidation_listeners.append(listener)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._set_watching(False)
+
+    def subscribe(self, request_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue[DownloadRequestEventDTO] = asyncio.Queue(maxsize=self._queue_size)
+        self._subscribers[request_id].add(queue)
+        return queue
+
+    def unsubscribe(self, request_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(request_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[request_id]
+
+    def publish_change(self, change: dict[str, Any]) -> None:
+        request_id = str(change["documentKey"]["_id"])
+        for listener in self._invalidation_listeners:
+            listener(request_id)
+
+        queues = self._subscribers.get(request_id)
+        if not queues:
+            return
+
+        event = self.build_event(change)
+        if event is None:
+            return
+
+        for queue in queues:
+            if queue.full():
+                # Slow client, drop its oldest event rather than blocking the stream
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    @staticmethod
+    def build_event(change: dict[str, Any]) -> Optional[DownloadRequestEventDTO]:
+        operation = change["operationType"]
+        if operation == "delete":
+            return DownloadRequestEventDTO(event="deleted")
+
+        if operation in ("insert", "replace"):
+            document = change.get("fullDocument") or {}
+            if document.get("deleted"):
+                return DownloadRequestEventDTO(event="deleted")
+            data = {field: document.get(field) for field in WATCHED_FIELDS}
+            data["progress"] = document.get("progress") or {}
+            return DownloadRequestEventDTO(event="update", data=data)
+
+        if operation != "update":
+            return None
+
+        description = change.get("updateDescription") or {}
+        updated = description.get("updatedFields") or {}
+        if updated.get("deleted"):
+            return DownloadRequestEventDTO(event="deleted")
+
+        data = {field: updated[field] for field in WATCHED_FIELDS if field in updated}
+        progress = {}
+        for field, value in updated.items():
+            if field == "progress":
+                progress.update(value or {})
+            elif field.startswith("progress."):
+                progress[field.removeprefix("progress.")] = value
+        for field in description.get("removedFields") or []:
+            if field.startswith("progress."):
+                progress[field.removeprefix("progress.")] = None
+        if progress:
+            data["progress"] = progress
+
+        return DownloadRequestEventDTO(event="update", data=data) if data else None
+
+    async def _run(self) -> None:
+        pipeline = [
+            {"$project": {
+                "operationType": 1,
+                "documentKey": 1,
+                "updateDescription": 1,
+                "fullDocument.deleted": 1,
+                "fullDocument.progress": 1,
+                **{f"fullDocument.{field}": 1 for field in WATCHED_FIELDS},
+            }}
+        ]
+        collection = DownloadRequestEntity.get_pymongo_collection()
+
+        while True:
+            try:
+                stream = await collection.watch(pipeline, start_after=self._resume_token)
+                self._set_watching(True)
+                async with stream:
+                    async for change in stream:
+                        self._resume_token = stream.resume_token
+                        self.publish_change(change)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure:
+                self._set_watching(False)
+                # Most likely the resume token is no longer in the oplog
+                logger.exception("Cannot resume download request change stream, restarting from now")
+                self._resume_token = None
+                await asyncio.sleep(self._retry_delay)
+            except Exception:
+                self._set_watching(False)
+                logger.exception("Download request change stream failed, reconnecting")
+                await asyncio.sleep(self._retry_delay)
+
+    def _set_watching(self, watching: bool) -> None:
+        if self._watching and not watching:
+            # Changes happening until the stream is open again would go unnoticed
+            for listener in self._invalidation_listeners:
+                listener(None)
+        self._watching = watching
+
+
+# Global broker instance, started by the API lifespan
+download_request_event_broker = DownloadRequestEventBroker()
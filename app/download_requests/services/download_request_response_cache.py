@@ -0,0 +1,89 @@
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import app.config.config as config
+from app.download_requests.services.download_request_event_broker import download_request_event_broker
+from app.services.etag import etag_matches
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+
+    @classmethod
+    def from_body(cls, body: bytes) -> "CachedResponse":
+        return cls(body=body, etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        return etag_matches(self.etag, if_none_match)
+
+
+class DownloadRequestResponseCache:
+    """
+    In-process LRU of serialized download request responses, keyed by request id.
+    Entries are invalidated from the download_requests change stream. A response read
+    from MongoDB is only stored if no invalidation of its request happened since the read
+    started, so that a change racing with the read never leaves a stale entry behind.
+    """
+
+    def __init__(self, max_size: int):
+        self._max_size = max_size
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        # Sequence number of the last invalidation, and of the last invalidation of recently invalidated keys
+        self._sequence = 0
+        self._invalidated: OrderedDict[str, int] = OrderedDict()
+        # Highest sequence number dropped from _invalidated
+        self._forgotten = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, request_id: str) -> Optional[CachedResponse]:
+        response = self._entries.get(request_id)
+        if response is not None:
+            self._entries.move_to_end(request_id)
+        return response
+
+    def begin_read(self) -> int:
+        """
+        Token to pass to put() for a response about to be read from the database
+        """
+        return self._sequence
+
+    def put(self, request_id: str, response: CachedResponse, token: int) -> bool:
+        """
+        Store a response read after `token` was taken, unless its request was invalidated meanwhile
+        """
+        if self._max_size <= 0 or self._forgotten > token or self._invalidated.get(request_id, 0) > token:
+            return False
+        self._entries[request_id] = response
+        self._entries.move_to_end(request_id)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+        return True
+
+    def invalidate(self, request_id: Optional[str] = None) -> None:
+        """
+        Drop the entry of a request, or every entry when `request_id` is None
+        """
+        self._sequence += 1
+        if request_id is None:
+            self._entries.clear()
+            self._invalidated.clear()
+            self._forgotten = self._sequence
+            return
+
+        self._entries.pop(request_id, None)
+        self._invalidated[request_id] = self._sequence
+        self._invalidated.move_to_end(request_id)
+        while len(self._invalidated) > max(self._max_size, 1):
+            _, sequence = self._invalidated.popitem(last=False)
+            self._forgotten = sequence
+
+
+# Global cache instance, invalidated by download_request_event_broker
+download_request_response_cache = DownloadRequestResponseCache(config.RESPONSE_CACHE_SIZE)
+download_request_event_broker.add_invalidation_listener(download_request_response_cache.invalidate)
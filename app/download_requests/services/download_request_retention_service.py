@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import os
+from datetime import timedelta
+
+from beanie import PydanticObjectId
+
+import app.config.config as config
+from app.download_requests.enums.download_status import DownloadStatus
+from app.download_requests.models.base_entity import get_current_utc_time
+from app.download_requests.repositories.download_request_repository import DownloadRequestRepository
+from app.download_requests.repositories.download_request_video_repository import DownloadRequestVideoRepository
+from app.download_worker.repositories.download_checkpoint_repository import DownloadCheckpointRepository
+from app.media_cache.services.media_cache_service import MediaCacheService
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadRequestRetentionService:
+    """
+    Keeps the requests and their media from growing without bound: finished requests are
+    soft-deleted once their retention ends, and soft-deleted requests are purged in batches
+    together with their videos, checkpoints and media.
+    Media shared through the media cache was released at soft delete and is left to eviction.
+    """
+
+    @staticmethod
+    async def expire_finished(status: DownloadStatus, retention: timedelta, batch_size: int) -> int:
+        """
+        Soft-delete the requests left in `status` for longer than `retention`
+        """
+        updated_before = get_current_utc_time() - retention
+        expired = 0
+        while True:
+            request_ids = await DownloadRequestRepository.find_finished_before(status, updated_before, batch_size)
+            for request_id in request_ids:
+                if await DownloadRequestRepository.delete(str(request_id)):
+                    expired += 1
+            if len(request_ids) < batch_size:
+                break
+
+        if expired:
+            logger.info(f"Expired {expired} {status.value} download requests")
+        return expired
+
+    @staticmethod
+    async def purge_deleted(retention: timedelta, batch_size: int) -> int:
+        """
+        Hard-delete the requests soft-deleted for longer than `retention` and remove their media.
+        Requests whose media could not be removed are kept for the next run.
+        """
+        deleted_before = get_current_utc_time() - retention
+        purged = 0
+        skipped: list[PydanticObjectId] = []
+        while True:
+            request_ids = await DownloadRequestRepository.find_deleted_before(deleted_before, batch_size, skipped)
+            if not request_ids:
+                break
+
+            media = await DownloadRequestVideoRepository.find_uncached_media(request_ids)
+            failed = await MediaCacheService.remove_media([video for videos in media.values() for video in videos])
+            failed_ids = {request_id for request_id, videos in media.items() if any(video in failed for video in videos)}
+            skipped.extend(failed_ids)
+            request_ids = [request_id for request_id in request_ids if request_id not in failed_ids]
+            if not request_ids:
+                continue
+
+            checkpoints = await DownloadCheckpointRepository.find_by_requests(request_ids)
+            await asyncio.to_thread(DownloadRequestRetentionService._remove_files, [
+                file_path
+                for checkpoint in checkpoints
+                for file_path in [*checkpoint.completedFiles, checkpoint.partFile]
+                if file_path
+            ])
+            await DownloadCheckpointRepository.delete_by_requests(request_ids)
+            await DownloadRequestVideoRepository.delete_by_requests(request_ids)
+            purged += await DownloadRequestRepository.hard_delete(request_ids)
+
+        if purged or skipped:
+            logger.info(f"Purged {purged} deleted download requests, {len(skipped)} kept after media removal failures")
+        return purged
+
+    @staticmethod
+    async def apply() -> None:
+        """
+        Apply the configured retention policies, a retention of 0 days disables a policy
+        """
+        batch_size = config.RETENTION_BATCH_SIZE
+        for status, days in (
+            (DownloadStatus.COMPLETED, config.COMPLETED_RETENTION_DAYS),
+            (DownloadStatus.FAILED, config.FAILED_RETENTION_DAYS),
+        ):
+            if days > 0:
+                await DownloadRequestRetentionService.expire_finished(status, timedelta(days=days), batch_size)
+        if config.DELETED_RETENTION_DAYS > 0:
+            await DownloadRequestRetentionService.purge_deleted(timedelta(days=config.DELETED_RETENTION_DAYS), batch_size)
+
+    @staticmethod
+    async def run_retention(interval: float) -> None:
+        while True:
+            try:
+                await DownloadRequestRetentionService.apply()
+            except Exception:
+                logger.exception("Download request retention failed")
+            await asyncio.sleep(interval)
+
+    @staticmethod
+    def _remove_files(file_paths: list[str]) -> None:
+        for file_path in file_paths:
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Failed to remove {file_path}: {str(e)}")
@@ -0,0 +1,60 @@
+import pytest
+from beanie import PydanticObjectId
+
+from app.download_requests.services.download_request_event_broker import DownloadRequestEventBroker
+
+
+def make_update(request_id, updated_fields=None, removed_fields=None):
+    return {
+        "operationType": "update",
+        "documentKey": {"_id": request_id},
+        "updateDescription": {"updatedFields": updated_fields or {}, "removedFields": removed_fields or []},
+    }
+
+
+def test_update_event_contains_status_counters_and_progress():
+    event = DownloadRequestEventBroker.build_event(make_update(
+        PydanticObjectId(),
+        updated_fields={
+            "status": "InProgress",
+            "downloadedCount": 3,
+            "progress.abc": {"downloadedBytes": 10, "totalBytes": 100, "speed": None},
+            "updatedAt": "ignored",
+        },
+        removed_fields=["progress.def"],
+    ))
+
+    assert event.event == "update"
+    assert event.data == {
+        "status": "InProgress",
+        "downloadedCount": 3,
+        "progress": {"abc": {"downloadedBytes": 10, "totalBytes": 100, "speed": None}, "def": None},
+    }
+
+
+def test_irrelevant_updates_produce_no_event():
+    assert DownloadRequestEventBroker.build_event(make_update(PydanticObjectId(), {"leaseExpiresAt": None})) is None
+
+
+def test_soft_delete_produces_deleted_event():
+    event = DownloadRequestEventBroker.build_event(make_update(PydanticObjectId(), {"deleted": True}))
+    assert event.event == "deleted"
+
+
+@pytest.mark.asyncio
+async def test_publish_only_reaches_subscribers_of_the_request():
+    broker = DownloadRequestEventBroker(queue_size=2)
+    watched, other = PydanticObjectId(), PydanticObjectId()
+    queue = broker.subscribe(str(watched))
+    other_queue = broker.subscribe(str(other))
+
+    for count in range(3):
+        broker.publish_change(make_update(watched, {"downloadedCount": count}))
+
+    # The oldest event is dropped once the subscriber queue is full
+    assert [queue.get_nowait().data["downloadedCount"] for _ in range(queue.qsize())] == [1, 2]
+    assert other_queue.empty()
+
+    broker.unsubscribe(str(watched), queue)
+    broker.publish_change(make_update(watched, {"downloadedCount": 4}))
+    assert queue.empty()
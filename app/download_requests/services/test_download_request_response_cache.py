@@ -0,0 +1,53 @@
+from app.download_requests.services.download_request_response_cache import (
+    CachedResponse,
+    DownloadRequestResponseCache,
+)
+
+
+def test_etag_matches_if_none_match_lists():
+    response = CachedResponse.from_body(b'{"id": "abc"}')
+
+    assert response.matches(response.etag)
+    assert response.matches(f'"other", W/{response.etag}')
+    assert response.matches("*")
+    assert not response.matches('"other"')
+    assert not response.matches(None)
+
+
+def test_put_is_skipped_when_the_request_changed_during_the_read():
+    cache = DownloadRequestResponseCache(max_size=10)
+    response = CachedResponse.from_body(b"{}")
+
+    token = cache.begin_read()
+    cache.invalidate("abc")
+    assert not cache.put("abc", response, token)
+
+    assert cache.put("abc", response, cache.begin_read())
+    assert cache.get("abc") == response
+
+    cache.invalidate("abc")
+    assert cache.get("abc") is None
+
+
+def test_invalidations_forgotten_by_the_cache_reject_older_reads():
+    cache = DownloadRequestResponseCache(max_size=1)
+    response = CachedResponse.from_body(b"{}")
+
+    token = cache.begin_read()
+    cache.invalidate("abc")
+    cache.invalidate("def")
+
+    assert not cache.put("abc", response, token)
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = DownloadRequestResponseCache(max_size=2)
+    response = CachedResponse.from_body(b"{}")
+    for request_id in ("a", "b"):
+        cache.put(request_id, response, cache.begin_read())
+    cache.get("a")
+    cache.put("c", response, cache.begin_read())
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert len(cache) == 2
@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+import pytest
+from beanie import init_beanie
+from mongomock_motor import AsyncMongoMockClient
+
+from app.config.database import DOCUMENT_MODELS
+from app.download_requests.enums.download_status import DownloadStatus
+from app.download_requests.models.base_entity import get_current_utc_time
+from app.download_requests.models.download_request_entity import DownloadRequestEntity
+from app.download_requests.models.download_request_video import DownloadRequestVideo
+from app.download_requests.models.download_request_video_entity import DownloadRequestVideoEntity
+from app.download_requests.repositories.download_request_repository import DownloadRequestRepository
+from app.download_requests.repositories.download_request_video_repository import DownloadRequestVideoRepository
+from app.download_requests.schemas.download_request_create_schema import DownloadRequestCreateSchema
+from app.download_requests.services.download_request_retention_service import DownloadRequestRetentionService
+from app.download_worker.repositories.download_checkpoint_repository import DownloadCheckpointRepository
+from app.media_cache.services.media_cache_service import MediaCacheService
+
+
+@pytest.fixture(autouse=True)
+async def database():
+    client = AsyncMongoMockClient()
+    await init_beanie(database=client["yt_downloads_test"], document_models=DOCUMENT_MODELS)
+    yield
+
+
+async def create_deleted_request(tmp_path, name: str, days_ago: float) -> tuple[DownloadRequestEntity, str]:
+    entity = await DownloadRequestRepository.create(DownloadRequestCreateSchema(url=f"http://example.com/{name}"))
+    file_path = tmp_path / f"{name}.mp4"
+    file_path.write_bytes(b"data")
+    await DownloadRequestRepository.append_video(str(entity.id), DownloadRequestVideo(id=name, title=name, path=str(file_path)))
+    await DownloadRequestRepository.delete(str(entity.id))
+    await DownloadRequestEntity.find_one({"_id": entity.id}).update({
+        "$set": {"deletedAt": get_current_utc_time() - timedelta(days=days_ago)},
+    })
+    return entity, str(file_path)
+
+
+@pytest.mark.asyncio
+async def test_purge_deleted_removes_expired_requests_and_media(tmp_path):
+    expired, expired_path = await create_deleted_request(tmp_path, "expired", days_ago=40)
+    recent, recent_path = await create_deleted_request(tmp_path, "recent", days_ago=1)
+    part_path = tmp_path / "expired.f137.mp4.part"
+    part_path.write_bytes(b"partial")
+    await DownloadCheckpointRepository.save(str(expired.id), "other", {"completedFiles": [], "partFile": str(part_path)})
+
+    assert await DownloadRequestRetentionService.purge_deleted(timedelta(days=30), batch_size=1) == 1
+
+    assert await DownloadRequestEntity.get(expired.id) is None
+    assert await DownloadRequestVideoEntity.find({"requestId": expired.id}).count() == 0
+    assert await DownloadCheckpointRepository.find_by_request(str(expired.id)) == []
+    assert not (tmp_path / "expired.mp4").exists()
+    assert not part_path.exists()
+
+    assert await DownloadRequestEntity.get(recent.id) is not None
+    assert (tmp_path / "recent.mp4").exists()
+
+
+@pytest.mark.asyncio
+async def test_purge_deleted_keeps_requests_whose_media_removal_failed(tmp_path, mocker):
+    entity, _ = await create_deleted_request(tmp_path, "expired", days_ago=40)
+    mocker.patch.object(MediaCacheService, "remove_media", side_effect=lambda videos: videos)
+
+    assert await DownloadRequestRetentionService.purge_deleted(timedelta(days=30), batch_size=10) == 0
+
+    assert await DownloadRequestEntity.get(entity.id) is not None
+    assert await DownloadRequestVideoRepository.find_page(str(entity.id), limit=10) != []
+
+
+@pytest.mark.asyncio
+async def test_expire_finished_soft_deletes_old_requests():
+    old = await DownloadRequestRepository.create(DownloadRequestCreateSchema(url="http://example.com/old"))
+    new = await DownloadRequestRepository.create(DownloadRequestCreateSchema(url="http://example.com/new"))
+    for entity in (old, new):
+        await DownloadRequestRepository.update(str(entity.id), {"status": DownloadStatus.COMPLETED})
+    await DownloadRequestEntity.find_one({"_id": old.id}).update({
+        "$set": {"updatedAt": get_current_utc_time() - timedelta(days=10)},
+    })
+
+    assert await DownloadRequestRetentionService.expire_finished(DownloadStatus.COMPLETED, timedelta(days=7), batch_size=1) == 1
+
+    assert await DownloadRequestRepository.find_by_id(str(old.id)) is None
+    assert await DownloadRequestRepository.find_by_id(str(new.id)) is not None
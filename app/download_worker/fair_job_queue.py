@@ -0,0 +1,168 @@
+import asyncio
+import heapq
+import itertools
+from dataclasses import dataclass, field
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+from app.download_requests.models.download_request_entity import DownloadRequestEntity
+
+DEFAULT_TENANT = ""
+
+# URL path fragments of pages that expand to several videos
+MULTI_VIDEO_PATHS = ("/playlist", "/channel/", "/c/", "/user/", "/@")
+
+
+def is_express(download_request: DownloadRequestEntity) -> bool:
+    """
+    Whether the request is expected to be a single video. Playlists are only known
+    for sure after extraction, so the URL shape is used for new requests.
+    """
+    if download_request.isPlaylist:
+        return False
+    parsed = urlparse(download_request.url)
+    if "list" in parse_qs(parsed.query):
+        return False
+    return not any(fragment in parsed.path for fragment in MULTI_VIDEO_PATHS)
+
+
+@dataclass
+class _TenantQueue:
+    weight: float
+    # Heaps of (-priority, sequence, request)
+    express: list = field(default_factory=list)
+    regular: list = field(default_factory=list)
+    running: int = 0
+    virtual_time: float = 0.0
+
+    def __len__(self) -> int:
+        return len(self.express) + len(self.regular)
+
+
+class FairJobQueue:
+    """
+    Bounded job queue doing weighted fair queuing across tenants.
+
+    Each tenant advances a virtual clock by 1/weight per dispatched job and the tenant with
+    the smallest clock is served next, so a tenant flooding the queue only gets its weighted
+    share of the workers. Within a tenant, jobs are served by priority then submission order,
+    single videos first on ties. `get(express_only=True)` only returns single-video jobs.
+
+    Only jobs that could start now count against `maxsize`: the backlog of a tenant at its
+    concurrency cap is kept outside the bound, so that it never blocks other tenants' jobs
+    while workers are idle. Each tenant's own backlog is bounded by `maxsize` as well, so a
+    capped tenant flooding the queue gets backpressure instead of growing it without limit.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        tenant_concurrency: Optional[int] = None,
+        tenant_weights: Optional[dict[str, float]] = None,
+    ):
+        self._maxsize = maxsize
+        self._tenant_concurrency = tenant_concurrency
+        self._tenant_weights = tenant_weights or {}
+        self._tenants: dict[str, _TenantQueue] = {}
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        self._size = 0
+        self._closed = False
+        self._changed = asyncio.Condition()
+
+    def qsize(self) -> int:
+        return self._size
+
+    def ready_size(self) -> int:
+        """
+        Queued jobs of the tenants that are below their concurrency cap
+        """
+        if not self._tenant_concurrency:
+            return self._size
+        return sum(
+            len(tenant) for tenant in self._tenants.values() if tenant.running < self._tenant_concurrency
+        )
+
+    async def put(self, download_request: DownloadRequestEntity) -> None:
+        """
+        Enqueue a request, waiting while the jobs ready to start or the backlog of its tenant fill the queue
+        """
+        name = download_request.tenant or DEFAULT_TENANT
+        async with self._changed:
+            await self._changed.wait_for(
+                lambda: self.ready_size() < self._maxsize and len(self._tenants.get(name, ())) < self._maxsize
+            )
+
+            tenant = self._get_tenant(name)
+            if not tenant and not tenant.running:
+                # A tenant becoming active does not get credit for the time it was idle
+                tenant.virtual_time = max(tenant.virtual_time, self._virtual_time)
+
+            lane = tenant.express if is_express(download_request) else tenant.regular
+            heapq.heappush(lane, (-(download_request.priority or 0), next(self._sequence), download_request))
+            self._size += 1
+            self._changed.notify_all()
+
+    async def get(self, express_only: bool = False) -> Optional[DownloadRequestEntity]:
+        """
+        Wait for the next job this worker may run. Returns None once the queue is closed and drained.
+        """
+        async with self._changed:
+            while True:
+                download_request = self._pop(express_only)
+                if download_request is not None:
+                    self._changed.notify_all()
+                    return download_request
+                if self._closed and self._size == 0:
+                    return None
+                await self._changed.wait()
+
+    async def task_done(self, download_request: DownloadRequestEntity) -> None:
+        """
+        Release the tenant slot held by a finished job
+        """
+        async with self._changed:
+            name = download_request.tenant or DEFAULT_TENANT
+            tenant = self._tenants[name]
+            tenant.running -= 1
+            if not tenant and not tenant.running and tenant.virtual_time <= self._virtual_time:
+                del self._tenants[name]
+            self._changed.notify_all()
+
+    async def close(self) -> None:
+        async with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+
+    def _get_tenant(self, name: str) -> _TenantQueue:
+        if name not in self._tenants:
+            self._tenants[name] = _TenantQueue(weight=self._tenant_weights.get(name, 1.0))
+        return self._tenants[name]
+
+    def _pop(self, express_only: bool) -> Optional[DownloadRequestEntity]:
+        selected: Optional[_TenantQueue] = None
+        selected_lane: Optional[list] = None
+
+        for tenant in self._tenants.values():
+            if self._tenant_concurrency and tenant.running >= self._tenant_concurrency:
+                continue
+
+            if express_only:
+                lane = tenant.express or None
+            else:
+                lanes = [lane for lane in (tenant.express, tenant.regular) if lane]
+                # Compare (-priority, sequence) of the lane heads, express wins priority ties
+                lane = min(lanes, key=lambda l: (l[0][0], l is not tenant.express, l[0][1])) if lanes else None
+
+            if lane is not None and (selected is None or tenant.virtual_time < selected.virtual_time):
+                selected, selected_lane = tenant, lane
+
+        if selected is None:
+            return None
+
+        _, _, download_request = heapq.heappop(selected_lane)
+        self._size -= 1
+        selected.running += 1
+        self._virtual_time = max(self._virtual_time, selected.virtual_time)
+        selected.virtual_time += 1.0 / selected.weight
+        return download_request
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+
+from app.download_requests.enums.download_status import DownloadStatus
+from app.download_requests.models.base_entity import get_current_utc_time
+from app.download_requests.models.download_request_entity import DownloadRequestEntity
+from app.download_requests.repositories.download_request_repository import DownloadRequestRepository
+from app.download_worker.scheduler import DownloadScheduler
+from app.download_worker.services.youtube_download_service import YouTubeDownloadService
+from app.media_cache.repositories.media_cache_repository import MediaCacheRepository
+from app.services.metrics import DOWNLOAD_REQUESTS
+from app.stats.repositories.download_stats_repository import DownloadStatsRepository
+
+logger = logging.getLogger(__name__)
+
+
+def generate_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class DownloadJobRunner:
+    """
+    Claims download requests under a lease before processing them, so that
+    several worker replicas watching the same change stream split the work
+    instead of duplicating it.
+    """
+
+    def __init__(self, worker_id: str, lease_seconds: int, heartbeat_interval: float):
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+
+    async def run(self, download_request: DownloadRequestEntity) -> None:
+        request_id = str(download_request.id)
+        claimed = await DownloadRequestRepository.claim(request_id, self.worker_id, self.lease_seconds)
+        if claimed is None:
+            logger.debug("Download request %s already claimed by another worker", request_id)
+            return
+
+        download = asyncio.create_task(YouTubeDownloadService.download(claimed))
+        heartbeat = asyncio.create_task(self._heartbeat(request_id, download))
+        try:
+            await download
+        except asyncio.CancelledError:
+            # The heartbeat cancelled the download, unless this job is itself being cancelled
+            if asyncio.current_task().cancelling() or not self._lease_lost(heartbeat):
+                raise
+            logger.warning("Stopped processing download request %s after losing its lease", request_id)
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, request_id: str, download: asyncio.Task) -> bool:
+        """
+        Renew the lease, and the media reservations held under it, until the download ends. When the lease is lost, e.g. reaped after a stall
+        and claimed by another worker, the download is cancelled before it writes any result.
+        Returns True when the lease was lost.
+        """
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                renewed = await DownloadRequestRepository.renew_lease(request_id, self.worker_id, self.lease_seconds)
+                if renewed:
+                    # Media reserved by this download stays reserved as long as the request is leased
+                    await MediaCacheRepository.renew_reservations(request_id, self.worker_id, self.lease_seconds)
+            except Exception:
+                logger.exception("Failed to renew lease for download request %s", request_id)
+                continue
+            if not renewed:
+                logger.warning("Lost lease for download request %s, cancelling its download", request_id)
+                download.cancel()
+                return True
+
+    @staticmethod
+    def _lease_lost(heartbeat: asyncio.Task) -> bool:
+        return heartbeat.done() and not heartbeat.cancelled() and heartbeat.exception() is None and heartbeat.result()
+
+    @staticmethod
+    async def reap_expired_leases(scheduler: DownloadScheduler, interval: float) -> None:
+        """
+        Periodically requeue requests whose worker stopped renewing its lease and dispatch them again
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                requeued = await DownloadRequestRepository.requeue_expired_leases()
+                if not requeued:
+                    continue
+
+                logger.info("Requeued %d download requests with expired leases", len(requeued))
+                for download_request in requeued:
+                    await scheduler.submit(download_request)
+            except Exception:
+                logger.exception("Failed to reap expired leases")
+
+    @staticmethod
+    async def dispatch_due_retries(scheduler: DownloadScheduler, interval: float) -> None:
+        """
+        Periodically dispatch requests requeued after throttling once their retry delay is over.
+        Retries already due at startup are dispatched by the backlog sweep.
+        """
+        since = get_current_utc_time()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                until = get_current_utc_time()
+                due = await DownloadRequestRepository.find_due_retries(since, until)
+                for download_request in due:
+                    await scheduler.submit(download_request)
+                since = until
+                if due:
+                    logger.info("Dispatched %d download requests due for retry", len(due))
+            except Exception:
+                logger.exception("Failed to dispatch download requests due for retry")
+
+    @staticmethod
+    async def sample_status_counts(interval: float) -> None:
+        """
+        Periodically publish the number of requests in each status, read from the maintained counters
+        """
+        while True:
+            try:
+                total = await DownloadStatsRepository.find_total()
+                for status in DownloadStatus:
+                    DOWNLOAD_REQUESTS.labels(status.value).set(total.byStatus.get(status.value, 0) if total else 0)
+            except Exception:
+                logger.exception("Failed to sample download request status counts")
+            await asyncio.sleep(interval)
+
+    @staticmethod
+    async def recover_backlog(scheduler: DownloadScheduler) -> int:
+        """
+        Requeue requests orphaned by dead workers, then dispatch every registered request
+        """
+        requeued = await DownloadRequestRepository.requeue_expired_leases()
+        if requeued:
+            logger.info("Requeued %d orphaned download requests", len(requeued))
+        return await DownloadJobRunner.dispatch_backlog(scheduler)
+
+    @staticmethod
+    async def dispatch_backlog(scheduler: DownloadScheduler, batch_size: int = 100) -> int:
+        """
+        Submit registered requests to the scheduler, oldest first, in keyset-paged batches
+        """
+        dispatched = 0
+        last = None
+        while True:
+            batch = await DownloadRequestRepository.find_registered(after=last, limit=batch_size)
+            for download_request in batch:
+                await scheduler.submit(download_request)
+            dispatched += len(batch)
+            if len(batch) < batch_size:
+                break
+            last = batch[-1]
+
+        if dispatched:
+            logger.info("Dispatched %d registered download requests from backlog", dispatched)
+        return dispatched
@@ -1,12 +1,32 @@
 import asyncio
+import logging
+import signal
+import time
 
-from app.config.database import init_db
+from prometheus_client import start_http_server
+from pymongo.errors import OperationFailure
+
+import app.config.config as config
+from app.config.resources import managed_resources
+from app.config.logging_config import configure_logging
 from app.download_requests.enums.download_status import DownloadStatus
 from app.download_requests.models.download_request_entity import DownloadRequestEntity
-from app.download_worker.services.youtube_download_service import YouTubeDownloadService
+from app.download_requests.services.download_request_retention_service import DownloadRequestRetentionService
+from app.download_worker.job_runner import DownloadJobRunner, generate_worker_id
+from app.download_worker.repositories.stream_checkpoint_repository import StreamCheckpointRepository
+from app.download_worker.scheduler import DownloadScheduler
+from app.download_worker.services.media_postprocessor import media_postprocessor
+from app.media_cache.services.media_cache_service import MediaCacheService
+from app.rate_limits.services.extractor_rate_limiter import extractor_rate_limiter
+from app.services.metrics import WORKER_ACTIVE_JOBS, WORKER_QUEUED_JOBS, WORKER_SLOTS
+from app.stats.services.download_stats_service import DownloadStatsService
+
+logger = logging.getLogger(__name__)
 
+STREAM_CHECKPOINT_NAME = "download_requests"
 
-async def listen_for_download_request_insert(db):
+
+async def open_download_request_stream(db):
     pipeline = [
         {
             "$match": {
@@ -17,21 +37,105 @@ async def listen_for_download_request_insert(db):
         }
     ]
 
-    stream = await db["download_requests"].watch(pipeline)
+    resume_token = await StreamCheckpointRepository.load(STREAM_CHECKPOINT_NAME)
+    if resume_token is not None:
+        try:
+            return await db["download_requests"].watch(pipeline, start_after=resume_token)
+        except OperationFailure as e:
+            # The token fell out of the oplog; the backlog sweep covers the gap
+            logger.warning("Cannot resume change stream, starting from now: %s", e)
+
+    return await db["download_requests"].watch(pipeline)
+
+
+async def sweep_backlog(scheduler: DownloadScheduler) -> None:
+    try:
+        await DownloadJobRunner.recover_backlog(scheduler)
+    except Exception:
+        logger.exception("Failed to dispatch the download request backlog")
+
 
-    async for change in stream:
-        print("📥 New request to download:", change["fullDocument"])
-        download_request = DownloadRequestEntity(**change["fullDocument"])
-        await YouTubeDownloadService.download(download_request)
+async def listen_for_download_request_insert(db, scheduler: DownloadScheduler):
+    # Open the stream before sweeping so that nothing inserted during the sweep is missed.
+    # Requests seen by both are dispatched twice but only claimed once.
+    stream = await open_download_request_stream(db)
 
+    async with stream:
+        # The sweep runs alongside the stream, so that new requests do not wait behind a large backlog
+        sweep = asyncio.create_task(sweep_backlog(scheduler))
 
+        last_checkpoint = time.monotonic()
+        try:
+            async for change in stream:
+                logger.info("New request to download: %s", change["fullDocument"]["_id"])
+                download_request = DownloadRequestEntity(**change["fullDocument"])
+                # Blocks while the scheduler queue is full
+                await scheduler.submit(download_request)
 
+                if time.monotonic() - last_checkpoint >= config.STREAM_CHECKPOINT_INTERVAL:
+                    await StreamCheckpointRepository.save(STREAM_CHECKPOINT_NAME, stream.resume_token)
+                    last_checkpoint = time.monotonic()
+        finally:
+            sweep.cancel()
+            if stream.resume_token is not None:
+                await StreamCheckpointRepository.save(STREAM_CHECKPOINT_NAME, stream.resume_token)
 
 
 async def main():
-    db = await init_db()
-    print("Download worker started")
-    await listen_for_download_request_insert(db)
+    async with managed_resources() as db:
+        await run_worker(db)
+
+
+async def run_worker(db):
+    runner = DownloadJobRunner(
+        worker_id=config.WORKER_ID or generate_worker_id(),
+        lease_seconds=config.LEASE_SECONDS,
+        heartbeat_interval=config.LEASE_HEARTBEAT_INTERVAL,
+    )
+    scheduler = DownloadScheduler(
+        runner.run,
+        concurrency=config.WORKER_CONCURRENCY,
+        queue_size=config.WORKER_QUEUE_SIZE,
+        express_concurrency=config.WORKER_EXPRESS_CONCURRENCY,
+        tenant_concurrency=config.TENANT_MAX_CONCURRENCY or None,
+        tenant_weights=config.TENANT_WEIGHTS,
+    )
+    scheduler.start()
+
+    WORKER_SLOTS.set(config.WORKER_CONCURRENCY + config.WORKER_EXPRESS_CONCURRENCY)
+    WORKER_ACTIVE_JOBS.set_function(lambda: scheduler.active)
+    WORKER_QUEUED_JOBS.set_function(lambda: scheduler.pending)
+    if config.WORKER_METRICS_PORT:
+        start_http_server(config.WORKER_METRICS_PORT)
+
+    listener = asyncio.create_task(listen_for_download_request_insert(db, scheduler))
+    reaper = asyncio.create_task(DownloadJobRunner.reap_expired_leases(scheduler, config.LEASE_REAPER_INTERVAL))
+    retrier = asyncio.create_task(DownloadJobRunner.dispatch_due_retries(scheduler, config.RETRY_DISPATCH_INTERVAL))
+    evictor = asyncio.create_task(MediaCacheService.run_eviction(config.MEDIA_CACHE_EVICT_INTERVAL))
+    sampler = asyncio.create_task(DownloadJobRunner.sample_status_counts(config.METRICS_SAMPLE_INTERVAL))
+    reconciler = asyncio.create_task(DownloadStatsService.run_reconciliation(config.STATS_RECONCILE_INTERVAL))
+    retention = asyncio.create_task(DownloadRequestRetentionService.run_retention(config.RETENTION_INTERVAL))
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, listener.cancel)
+
+    logger.info("Download worker %s started", runner.worker_id)
+    try:
+        await listener
+    except asyncio.CancelledError:
+        logger.info("Shutdown requested, draining %d queued downloads", scheduler.pending)
+    finally:
+        reaper.cancel()
+        retrier.cancel()
+        evictor.cancel()
+        sampler.cancel()
+        reconciler.cancel()
+        retention.cancel()
+        await scheduler.shutdown()
+        media_postprocessor.shutdown()
+        extractor_rate_limiter.shutdown()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    configure_logging()
+    asyncio.run(main())
@@ -0,0 +1,33 @@
+from datetime import datetime
+from typing import Optional
+
+from beanie import Document, PydanticObjectId
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+from app.download_requests.models.base_entity import get_current_utc_time
+
+
+class DownloadCheckpointEntity(Document):
+    """
+    On-disk state of a video download that has not finished yet, keyed by "<request id>:<video id>".
+    yt-dlp resumes the files listed here when the download is retried on the same volume.
+    """
+
+    id: str
+    requestId: PydanticObjectId
+    videoId: str
+    # Format files downloaded completely, waiting to be merged
+    completedFiles: list[str] = Field(default_factory=list)
+    # File currently being downloaded and the bytes already written to it
+    partFile: Optional[str] = None
+    partBytes: int = 0
+    totalBytes: Optional[int] = None
+    merging: bool = False
+    updatedAt: datetime = Field(default_factory=get_current_utc_time)
+
+    class Settings:
+        name = "download_checkpoints"
+        indexes = [
+            IndexModel([("requestId", ASCENDING)]),
+        ]
@@ -0,0 +1,20 @@
+from datetime import datetime
+from typing import Any, Optional
+
+from beanie import Document
+from pydantic import Field
+
+from app.download_requests.models.base_entity import get_current_utc_time
+
+
+class StreamCheckpointEntity(Document):
+    """
+    Last processed resume token of a change stream, keyed by stream name
+    """
+
+    id: str
+    resumeToken: Optional[dict[str, Any]] = None
+    updatedAt: datetime = Field(default_factory=get_current_utc_time)
+
+    class Settings:
+        name = "stream_checkpoints"
@@ -0,0 +1,50 @@
+from typing import Optional
+
+from beanie import PydanticObjectId
+
+from app.download_requests.models.base_entity import get_current_utc_time
+from app.download_worker.models.download_checkpoint_entity import DownloadCheckpointEntity
+
+
+class DownloadCheckpointRepository:
+    @staticmethod
+    def build_key(request_id: str, video_id: str) -> str:
+        return f"{request_id}:{video_id}"
+
+    @staticmethod
+    async def find(request_id: str, video_id: str) -> Optional[DownloadCheckpointEntity]:
+        return await DownloadCheckpointEntity.get(DownloadCheckpointRepository.build_key(request_id, video_id))
+
+    @staticmethod
+    async def find_by_request(request_id: str) -> list[DownloadCheckpointEntity]:
+        return await DownloadCheckpointEntity.find({"requestId": PydanticObjectId(request_id)}).to_list()
+
+    @staticmethod
+    async def find_by_requests(request_ids: list[PydanticObjectId]) -> list[DownloadCheckpointEntity]:
+        return await DownloadCheckpointEntity.find({"requestId": {"$in": request_ids}}).to_list()
+
+    @staticmethod
+    async def save(request_id: str, video_id: str, fields: dict) -> None:
+        """
+        Upsert the given checkpoint fields
+        """
+        await DownloadCheckpointEntity.find_one({
+            "_id": DownloadCheckpointRepository.build_key(request_id, video_id),
+        }).update({
+            "$set": {**fields, "updatedAt": get_current_utc_time()},
+            "$setOnInsert": {"requestId": PydanticObjectId(request_id), "videoId": video_id},
+        }, upsert=True)
+
+    @staticmethod
+    async def delete(request_id: str, video_id: str) -> None:
+        await DownloadCheckpointEntity.find_one({
+            "_id": DownloadCheckpointRepository.build_key(request_id, video_id),
+        }).delete()
+
+    @staticmethod
+    async def delete_by_request(request_id: str) -> None:
+        await DownloadCheckpointEntity.find({"requestId": PydanticObjectId(request_id)}).delete()
+
+    @staticmethod
+    async def delete_by_requests(request_ids: list[PydanticObjectId]) -> None:
+        await DownloadCheckpointEntity.find({"requestId": {"$in": request_ids}}).delete()
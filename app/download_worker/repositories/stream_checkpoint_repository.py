@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from typing import Any, Optional
+
+from app.download_requests.models.base_entity import get_current_utc_time
+from app.download_worker.models.stream_checkpoint_entity import StreamCheckpointEntity
+
+
+class StreamCheckpointRepository:
+    @staticmethod
+    async def load(name: str) -> Optional[dict[str, Any]]:
+        checkpoint = await StreamCheckpointEntity.get(name)
+        return checkpoint.resumeToken if checkpoint else None
+
+    @staticmethod
+    async def save(name: str, resume_token: dict[str, Any]) -> None:
+        await StreamCheckpointEntity.find_one({"_id": name}).upsert(
+            {"$set": {"resumeToken": resume_token, "updatedAt": get_current_utc_time()}},
+            on_insert=StreamCheckpointEntity(id=name, resumeToken=resume_token),
+        )
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+from app.download_requests.models.download_request_entity import DownloadRequestEntity
+from app.download_worker.fair_job_queue import FairJobQueue
+
+logger = logging.getLogger(__name__)
+
+DownloadHandler = Callable[[DownloadRequestEntity], Awaitable[None]]
+
+
+class DownloadScheduler:
+    """
+    Runs download jobs on a fixed pool of worker tasks fed by a bounded fair queue.
+    Producers awaiting `submit` are suspended while the queue is full, which
+    applies backpressure to the change stream.
+
+    Tenants share the workers by weight and are capped at `tenant_concurrency` running
+    jobs each. `express_concurrency` additional workers only run single-video requests,
+    so small jobs start quickly even while large playlists occupy the other workers.
+    """
+
+    def __init__(
+        self,
+        handler: DownloadHandler,
+        concurrency: int,
+        queue_size: int,
+        express_concurrency: int = 0,
+        tenant_concurrency: Optional[int] = None,
+        tenant_weights: Optional[dict[str, float]] = None,
+    ):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+
+        self._handler = handler
+        self._concurrency = concurrency
+        self._express_concurrency = express_concurrency
+        self._queue = FairJobQueue(queue_size, tenant_concurrency, tenant_weights)
+        self._workers: list[asyncio.Task] = []
+        self._active = 0
+        self._closed = False
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._run(express_only=False), name=f"download-worker-{index}")
+            for index in range(self._concurrency)
+        ] + [
+            asyncio.create_task(self._run(express_only=True), name=f"download-express-worker-{index}")
+            for index in range(self._express_concurrency)
+        ]
+        logger.info(
+            "Download scheduler started with %d workers and %d express workers",
+            self._concurrency, self._express_concurrency,
+        )
+
+    async def submit(self, download_request: DownloadRequestEntity) -> None:
+        """
+        Enqueue a download request, waiting for a free slot if the queue is full
+        """
+        if self._closed:
+            raise RuntimeError("Scheduler is shut down")
+        await self._queue.put(download_request)
+
+    async def shutdown(self) -> None:
+        """
+        Stop accepting jobs, let queued and running jobs finish, then stop the workers
+        """
+        if self._closed:
+            return
+        self._closed = True
+
+        await self._queue.close()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("Download scheduler stopped")
+
+    async def _run(self, express_only: bool) -> None:
+        while True:
+            download_request = await self._queue.get(express_only)
+            if download_request is None:
+                return
+
+            self._active += 1
+            try:
+                await self._handler(download_request)
+            except Exception:
+                logger.exception("Unhandled error while processing download request %s", download_request.id)
+            finally:
+                self._active -= 1
+                await self._queue.task_done(download_request)
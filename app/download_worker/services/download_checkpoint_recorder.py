@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Future
+from typing import Any, Dict
+
+from app.download_worker.repositories.download_checkpoint_repository import DownloadCheckpointRepository
+from app.download_worker.services.download_stage_recorder import MERGER_KEY
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadCheckpointRecorder:
+    """
+    yt-dlp progress and postprocessor hooks persisting which files of each video are
+    complete, how far the current .part file got and whether a merge is pending.
+    Like DownloadProgressReporter, writes are scheduled on the event loop from the
+    download thread and throttled to one per video every `interval` seconds.
+    """
+
+    def __init__(self, request_id: str, loop: asyncio.AbstractEventLoop, interval: float):
+        self._request_id = request_id
+        self._loop = loop
+        self._interval = interval
+        self._checkpoints: dict[str, dict[str, Any]] = {}
+        self._last_write: dict[str, float] = {}
+        self._writes: list[Future] = []
+
+    def progress_hook(self, status: Dict[str, Any]) -> None:
+        video_id = (status.get('info_dict') or {}).get('id')
+        if not video_id:
+            return
+
+        checkpoint = self._get_checkpoint(video_id)
+        if status.get('status') == 'downloading':
+            # Record a new part file right away, only its offset is throttled
+            new_part = status.get('tmpfilename') != checkpoint['partFile']
+            checkpoint['partFile'] = status.get('tmpfilename')
+            checkpoint['partBytes'] = status.get('downloaded_bytes') or 0
+            checkpoint['totalBytes'] = status.get('total_bytes') or status.get('total_bytes_estimate')
+            self._write(video_id, force=new_part)
+        elif status.get('status') == 'finished':
+            if status.get('filename') and status['filename'] not in checkpoint['completedFiles']:
+                checkpoint['completedFiles'].append(status['filename'])
+            checkpoint.update(partFile=None, partBytes=0, totalBytes=None)
+            self._write(video_id, force=True)
+
+    def postprocessor_hook(self, status: Dict[str, Any]) -> None:
+        video_id = (status.get('info_dict') or {}).get('id')
+        if not video_id or status.get('postprocessor') != MERGER_KEY or status.get('status') != 'started':
+            return
+        self._get_checkpoint(video_id)['merging'] = True
+        self._write(video_id, force=True)
+
+    async def close(self) -> None:
+        """
+        Wait for the scheduled writes, so that none lands after the checkpoint is deleted
+        """
+        writes, self._writes = self._writes, []
+        await asyncio.gather(*[asyncio.wrap_future(write) for write in writes], return_exceptions=True)
+
+    def _get_checkpoint(self, video_id: str) -> dict[str, Any]:
+        return self._checkpoints.setdefault(video_id, {
+            'completedFiles': [],
+            'partFile': None,
+            'partBytes': 0,
+            'totalBytes': None,
+            'merging': False,
+        })
+
+    def _write(self, video_id: str, force: bool) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_write.get(video_id, 0) < self._interval:
+            return
+        self._last_write[video_id] = now
+
+        fields = {**self._checkpoints[video_id], 'completedFiles': list(self._checkpoints[video_id]['completedFiles'])}
+        future = asyncio.run_coroutine_threadsafe(
+            DownloadCheckpointRepository.save(self._request_id, video_id, fields),
+            self._loop,
+        )
+        future.add_done_callback(self._log_failure)
+        self._writes = [write for write in self._writes if not write.done()] + [future]
+
+    def _log_failure(self, future: Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning(f"Failed to save download checkpoint for {self._request_id}: {future.exception()}")
@@ -0,0 +1,49 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Future
+from typing import Any, Dict
+
+from app.download_requests.models.download_progress import DownloadProgress
+from app.download_requests.repositories.download_request_repository import DownloadRequestRepository
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadProgressReporter:
+    """
+    yt-dlp progress hook persisting per-video byte progress on the download request.
+    yt-dlp calls the hook from the download thread, so writes are scheduled on the
+    event loop and throttled to one per video every `interval` seconds.
+    """
+
+    def __init__(self, request_id: str, loop: asyncio.AbstractEventLoop, interval: float):
+        self._request_id = request_id
+        self._loop = loop
+        self._interval = interval
+        self._last_report: dict[str, float] = {}
+
+    def hook(self, status: Dict[str, Any]) -> None:
+        video_id = (status.get('info_dict') or {}).get('id')
+        if not video_id or status.get('status') not in ('downloading', 'finished'):
+            return
+
+        now = time.monotonic()
+        if status['status'] == 'downloading' and now - self._last_report.get(video_id, 0) < self._interval:
+            return
+        self._last_report[video_id] = now
+
+        progress = DownloadProgress(
+            downloadedBytes=status.get('downloaded_bytes') or 0,
+            totalBytes=status.get('total_bytes') or status.get('total_bytes_estimate'),
+            speed=status.get('speed'),
+        )
+        future = asyncio.run_coroutine_threadsafe(
+            DownloadRequestRepository.update_progress(self._request_id, video_id, progress),
+            self._loop,
+        )
+        future.add_done_callback(self._log_failure)
+
+    def _log_failure(self, future: Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning(f"Failed to report progress for {self._request_id}: {future.exception()}")
@@ -0,0 +1,44 @@
+import os
+import time
+from typing import Any, Dict, Optional
+
+from app.services.metrics import DOWNLOAD_BYTES, DOWNLOAD_STAGE_DURATION, DOWNLOAD_THROUGHPUT
+
+# yt-dlp postprocessor key of the ffmpeg step merging video and audio streams
+MERGER_KEY = 'Merger'
+
+
+class DownloadStageRecorder:
+    """
+    Splits the time spent in a yt-dlp download call into transfer and merge stages.
+    The postprocessor hook runs on the download thread, like the call itself.
+    """
+
+    def __init__(self):
+        self._started = time.monotonic()
+        self._merge_started: Optional[float] = None
+        self._merge_seconds = 0.0
+
+    def postprocessor_hook(self, status: Dict[str, Any]) -> None:
+        if status.get('postprocessor') != MERGER_KEY:
+            return
+        if status.get('status') == 'started':
+            self._merge_started = time.monotonic()
+        elif status.get('status') == 'finished' and self._merge_started is not None:
+            self._merge_seconds += time.monotonic() - self._merge_started
+            self._merge_started = None
+
+    def record(self, file_path: str) -> None:
+        """
+        Publish the stage durations and the transfer rate once the file is complete
+        """
+        download_seconds = time.monotonic() - self._started - self._merge_seconds
+        DOWNLOAD_STAGE_DURATION.labels('download').observe(download_seconds)
+        if self._merge_seconds:
+            DOWNLOAD_STAGE_DURATION.labels('merge').observe(self._merge_seconds)
+
+        if os.path.exists(file_path):
+            size = os.path.getsize(file_path)
+            DOWNLOAD_BYTES.inc(size)
+            if download_seconds > 0:
+                DOWNLOAD_THROUGHPUT.observe(size / download_seconds)
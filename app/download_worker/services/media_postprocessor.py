@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import app.config.config as config
+from app.download_requests.enums.transcode_profile import TranscodeProfile
+from app.download_requests.models.download_request_video import DownloadRequestVideo
+from app.services.metrics import DOWNLOAD_STAGE_DURATION
+
+logger = logging.getLogger(__name__)
+
+FFMPEG_BASE_ARGS = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-nostdin', '-y']
+# Containers where the index can be moved to the front of the file
+FASTSTART_EXTENSIONS = {'mp4', 'm4a', 'mov'}
+# Output extension and ffmpeg output options of each profile
+PROFILE_OUTPUTS: dict[TranscodeProfile, tuple[Optional[str], list[str]]] = {
+    TranscodeProfile.ORIGINAL: (None, ['-map', '0', '-c', 'copy', '-movflags', '+faststart']),
+    TranscodeProfile.AUDIO_M4A: ('m4a', ['-vn', '-c:a', 'aac', '-b:a', '192k', '-movflags', '+faststart']),
+    TranscodeProfile.AUDIO_OPUS: ('opus', ['-vn', '-c:a', 'libopus', '-b:a', '128k']),
+    TranscodeProfile.MAX_720P: ('mp4', [
+        '-vf', "scale=-2:'min(720,ih)'", '-c:v', 'libx264', '-preset', 'veryfast', '-crf', '23',
+        '-c:a', 'aac', '-b:a', '160k', '-movflags', '+faststart',
+    ]),
+    TranscodeProfile.MAX_480P: ('mp4', [
+        '-vf', "scale=-2:'min(480,ih)'", '-c:v', 'libx264', '-preset', 'veryfast', '-crf', '26',
+        '-c:a', 'aac', '-b:a', '128k', '-movflags', '+faststart',
+    ]),
+}
+
+
+def build_ffmpeg_command(input_path: str, profile: TranscodeProfile) -> Optional[tuple[list[str], str]]:
+    """
+    ffmpeg command applying `profile` to `input_path` and the path of its output,
+    or None when the file can be kept as is
+    """
+    root, ext = os.path.splitext(input_path)
+    ext = ext.lstrip('.').lower()
+    output_ext, output_args = PROFILE_OUTPUTS[profile]
+    if output_ext is None:
+        if ext not in FASTSTART_EXTENSIONS:
+            return None
+        output_ext = ext
+
+    output_path = f"{root}.{profile.value}.{output_ext}"
+    return [*FFMPEG_BASE_ARGS, '-i', input_path, *output_args, output_path], output_path
+
+
+def _run_ffmpeg(command: list[str]) -> None:
+    # Runs in a worker process of the pool
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg exited with {result.returncode}: {result.stderr.strip()[-500:]}")
+
+
+class MediaPostprocessor:
+    """
+    Remux and transcoding stage run after a video is downloaded, on a dedicated process pool
+    so that CPU-heavy work neither holds a download slot nor the default thread pool.
+    At most `max_workers` files are processed at once, the others wait for a free process.
+    """
+
+    def __init__(self, max_workers: int):
+        self._max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def process(self, video: DownloadRequestVideo, profile: TranscodeProfile) -> DownloadRequestVideo:
+        """
+        Apply `profile` to the downloaded file, the original file is replaced by the result.
+        Transcoding errors are raised, a failed remux of the original streams keeps the file as is.
+        """
+        command = build_ffmpeg_command(video.path, profile)
+        if command is None or not os.path.exists(video.path):
+            return video
+        args, output_path = command
+
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self._get_executor(), _run_ffmpeg, args)
+        except BaseException as e:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            if profile == TranscodeProfile.ORIGINAL and isinstance(e, Exception):
+                # The downloaded file is still playable, only not optimized for streaming
+                logger.warning(f"Failed to remux {video.path}, keeping it as downloaded: {str(e)}")
+                return video
+            raise
+        DOWNLOAD_STAGE_DURATION.labels('postprocess').observe(time.monotonic() - started)
+
+        if os.path.splitext(output_path)[1] == os.path.splitext(video.path)[1]:
+            # Same container: keep the original file name
+            os.replace(output_path, video.path)
+            output_path = video.path
+        else:
+            os.remove(video.path)
+
+        return video.model_copy(update={'path': output_path, 'size': os.path.getsize(output_path)})
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Forking a process running pymongo and executor threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._max_workers, mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+
+# Global post-processing stage used by the download service
+media_postprocessor = MediaPostprocessor(max_workers=config.POSTPROCESS_CONCURRENCY)
@@ -0,0 +1,42 @@
+import asyncio
+import logging
+import os
+
+from app.download_requests.models.download_request_video import DownloadRequestVideo
+from app.services.s3_client import get_async_s3_client
+
+logger = logging.getLogger(__name__)
+
+
+class MediaUploadService:
+    """
+    Moves downloaded media from the local downloads directory to S3-compatible storage
+    """
+
+    @staticmethod
+    def build_object_key(request_id: str, video: DownloadRequestVideo) -> str:
+        return f"{request_id}/{os.path.basename(video.path)}"
+
+    @staticmethod
+    async def upload(video: DownloadRequestVideo, request_id: str) -> DownloadRequestVideo:
+        """
+        Upload a downloaded video, verify the stored size and remove the local copy.
+        Transfers run on the thread pool of the async S3 client, apart from the downloads.
+        Returns the video with its object key set.
+        """
+        object_key = MediaUploadService.build_object_key(request_id, video)
+        s3_client = get_async_s3_client()
+        local_size = os.path.getsize(video.path)
+
+        if not await s3_client.upload_file(video.path, object_key):
+            raise RuntimeError(f"Failed to upload {video.path} as {object_key}")
+
+        stored_size = await s3_client.get_file_size(object_key)
+        if stored_size != local_size:
+            raise RuntimeError(
+                f"Upload verification failed for {object_key}: expected {local_size} bytes, found {stored_size}"
+            )
+
+        await asyncio.to_thread(os.remove, video.path)
+        logger.info(f"Uploaded {video.path} as {object_key} and removed local copy")
+        return video.model_copy(update={"objectKey": object_key})
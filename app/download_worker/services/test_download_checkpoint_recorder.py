@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock
+
+from app.download_worker.repositories.download_checkpoint_repository import DownloadCheckpointRepository
+from app.download_worker.services.download_checkpoint_recorder import DownloadCheckpointRecorder
+
+
+@pytest.mark.asyncio
+async def test_records_completed_files_part_offsets_and_pending_merges(mocker):
+    save = mocker.patch.object(DownloadCheckpointRepository, "save", new_callable=AsyncMock)
+    recorder = DownloadCheckpointRecorder("request", asyncio.get_running_loop(), interval=60)
+    info_dict = {"id": "abc"}
+
+    def _download():
+        recorder.progress_hook({"status": "finished", "filename": "/d/abc.f137.mp4", "info_dict": info_dict})
+        recorder.progress_hook({
+            "status": "downloading", "tmpfilename": "/d/abc.f140.m4a.part", "downloaded_bytes": 10,
+            "total_bytes": 100, "info_dict": info_dict,
+        })
+        # Throttled until the interval elapsed
+        recorder.progress_hook({
+            "status": "downloading", "tmpfilename": "/d/abc.f140.m4a.part", "downloaded_bytes": 20,
+            "total_bytes": 100, "info_dict": info_dict,
+        })
+        recorder.postprocessor_hook({"status": "started", "postprocessor": "Merger", "info_dict": info_dict})
+
+    await asyncio.get_running_loop().run_in_executor(None, _download)
+    await recorder.close()
+
+    checkpoints = [call.args[2] for call in save.call_args_list]
+    assert [checkpoint["partBytes"] for checkpoint in checkpoints] == [0, 10, 20]
+    assert checkpoints[1]["partFile"] == "/d/abc.f140.m4a.part"
+    assert checkpoints[-1]["completedFiles"] == ["/d/abc.f137.mp4"]
+    assert checkpoints[-1]["merging"] is True
@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.download_requests.enums.transcode_profile import TranscodeProfile
+from app.download_requests.models.download_request_video import DownloadRequestVideo
+from app.download_worker.services import media_postprocessor as module
+from app.download_worker.services.media_postprocessor import MediaPostprocessor, build_ffmpeg_command
+
+
+def test_original_profile_only_remuxes_mp4_containers():
+    args, output_path = build_ffmpeg_command("/d/abc.mp4", TranscodeProfile.ORIGINAL)
+    assert output_path == "/d/abc.original.mp4"
+    assert args[-3:] == ["-movflags", "+faststart", output_path]
+    assert "copy" in args
+
+    assert build_ffmpeg_command("/d/abc.webm", TranscodeProfile.ORIGINAL) is None
+
+
+def test_audio_profile_changes_the_container():
+    args, output_path = build_ffmpeg_command("/d/abc.webm", TranscodeProfile.AUDIO_OPUS)
+    assert output_path == "/d/abc.audio-opus.opus"
+    assert "-vn" in args and "libopus" in args
+
+
+@pytest.mark.asyncio
+async def test_process_replaces_the_downloaded_file(mocker, tmp_path):
+    def fake_ffmpeg(command):
+        with open(command[-1], "wb") as output:
+            output.write(b"audio")
+
+    mocker.patch.object(module, "_run_ffmpeg", side_effect=fake_ffmpeg)
+    postprocessor = MediaPostprocessor(max_workers=1)
+    mocker.patch.object(postprocessor, "_get_executor", return_value=ThreadPoolExecutor(max_workers=1))
+    source = tmp_path / "abc.mp4"
+    source.write_bytes(b"video and audio")
+
+    video = await postprocessor.process(
+        DownloadRequestVideo(id="abc", title="Video", path=str(source)), TranscodeProfile.AUDIO_M4A
+    )
+
+    assert video.path == str(tmp_path / "abc.audio-m4a.m4a")
+    assert video.size == len(b"audio")
+    assert not source.exists()
+
+
+@pytest.mark.asyncio
+async def test_failed_transcode_raises_and_failed_remux_keeps_the_file(mocker, tmp_path):
+    mocker.patch.object(module, "_run_ffmpeg", side_effect=RuntimeError("ffmpeg exited with 1"))
+    postprocessor = MediaPostprocessor(max_workers=1)
+    mocker.patch.object(postprocessor, "_get_executor", return_value=ThreadPoolExecutor(max_workers=1))
+    source = tmp_path / "abc.mp4"
+    source.write_bytes(b"video")
+    video = DownloadRequestVideo(id="abc", title="Video", path=str(source))
+
+    with pytest.raises(RuntimeError):
+        await postprocessor.process(video, TranscodeProfile.MAX_480P)
+    assert await postprocessor.process(video, TranscodeProfile.ORIGINAL) == video
+
+    assert source.read_bytes() == b"video"
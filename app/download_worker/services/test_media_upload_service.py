@@ -0,0 +1,50 @@
+import os
+
+import pytest
+from moto import mock_aws
+
+from app.download_requests.models.download_request_video import DownloadRequestVideo
+from app.download_worker.services import media_upload_service
+from app.download_worker.services.media_upload_service import MediaUploadService
+from app.services.s3_client import AsyncS3Client, S3Client
+
+
+@pytest.fixture
+async def s3_client(monkeypatch):
+    monkeypatch.delenv("S3_ENDPOINT_URL", raising=False)
+    monkeypatch.setenv("S3_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("S3_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("S3_BUCKET_NAME", "yt-downloads-test")
+    monkeypatch.setenv("S3_MULTIPART_CHUNKSIZE_MB", "5")
+    with mock_aws():
+        client = S3Client()
+        async_client = AsyncS3Client(client)
+        monkeypatch.setattr(media_upload_service, "get_async_s3_client", lambda: async_client)
+        yield client
+        await async_client.close()
+
+
+@pytest.mark.asyncio
+async def test_upload_stores_object_and_removes_local_copy(s3_client, tmp_path):
+    file_path = tmp_path / "request_abc.mp4"
+    file_path.write_bytes(os.urandom(6 * 1024 * 1024))
+    video = DownloadRequestVideo(id="abc", title="Video", path=str(file_path))
+
+    uploaded = await MediaUploadService.upload(video, "request")
+
+    assert uploaded.objectKey == "request/request_abc.mp4"
+    assert s3_client.get_file_size(uploaded.objectKey) == 6 * 1024 * 1024
+    assert not file_path.exists()
+
+
+@pytest.mark.asyncio
+async def test_failed_upload_keeps_local_copy(s3_client, tmp_path, mocker):
+    file_path = tmp_path / "request_abc.mp4"
+    file_path.write_bytes(b"data")
+    mocker.patch.object(s3_client, "upload_file", return_value=False)
+    video = DownloadRequestVideo(id="abc", title="Video", path=str(file_path))
+
+    with pytest.raises(RuntimeError):
+        await MediaUploadService.upload(video, "request")
+
+    assert file_path.exists()
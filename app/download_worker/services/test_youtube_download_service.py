@@ -0,0 +1,240 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from beanie import PydanticObjectId
+from unittest.mock import AsyncMock
+
+from app.download_requests.enums.download_status import DownloadStatus
+from app.download_requests.enums.transcode_profile import TranscodeProfile
+from app.download_requests.enums.video_codec import VideoCodec
+from app.download_requests.models.base_entity import get_current_utc_time
+from app.download_requests.models.download_format import DownloadFormat
+from app.download_requests.models.download_request_entity import DownloadRequestEntity
+from app.download_requests.models.download_request_video import DownloadRequestVideo
+from app.download_requests.repositories.download_request_repository import DownloadRequestRepository
+from app.download_requests.repositories.download_request_video_repository import DownloadRequestVideoRepository
+from app.download_worker.repositories.download_checkpoint_repository import DownloadCheckpointRepository
+from app.download_worker.services.youtube_download_service import FORMAT_SELECTOR, YouTubeDownloadService
+from app.rate_limits.services.extractor_rate_limiter import ThrottledError
+
+
+@pytest.fixture
+def mock_repo_update(mocker):
+    return mocker.patch.object(DownloadRequestRepository, "update", new_callable=AsyncMock)
+
+@pytest.fixture
+def mock_repo_append_video(mocker):
+    return mocker.patch.object(DownloadRequestRepository, "append_video", new_callable=AsyncMock)
+
+@pytest.fixture
+def mock_video_repo_find_positions(mocker):
+    return mocker.patch.object(
+        DownloadRequestVideoRepository, "find_positions", new_callable=AsyncMock, return_value=[]
+    )
+
+def make_request() -> DownloadRequestEntity:
+    return DownloadRequestEntity.model_construct(
+        id=PydanticObjectId(), url="http://example.com/playlist", status=DownloadStatus.IN_PROGRESS
+    )
+
+def make_video(video_id: str, position=None) -> DownloadRequestVideo:
+    return DownloadRequestVideo(id=video_id, title=video_id, path=f"/app/downloads/{video_id}.mp4", position=position)
+
+@pytest.mark.asyncio
+async def test_playlist_entries_are_downloaded_concurrently_and_persisted_incrementally(
+    mocker, mock_repo_update, mock_repo_append_video, mock_video_repo_find_positions
+):
+    entries = [{"id": f"v{index}", "url": f"http://example.com/v{index}"} for index in range(4)]
+    mocker.patch.object(
+        YouTubeDownloadService, "_extract_info", new_callable=AsyncMock,
+        return_value={"title": "Playlist", "entries": entries},
+    )
+
+    running = 0
+    peak = 0
+
+    async def fake_download_video(source, request_id, position=None, format_options=None):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if source.endswith("v2"):
+            raise RuntimeError("unavailable")
+        return make_video(source.rsplit("/", 1)[-1], position)
+
+    mocker.patch.object(YouTubeDownloadService, "_download_video", side_effect=fake_download_video)
+    mocker.patch("app.config.config.PLAYLIST_CONCURRENCY", 2)
+
+    await YouTubeDownloadService.download(make_request())
+
+    assert peak == 2
+    assert sorted(call.args[1].id for call in mock_repo_append_video.call_args_list) == ["v0", "v1", "v3"]
+    first_update = mock_repo_update.call_args_list[0].args[1]
+    assert first_update["playlistCount"] == 4
+    assert mock_repo_update.call_args_list[-1].args[1]["status"] == DownloadStatus.COMPLETED
+
+@pytest.mark.asyncio
+async def test_playlist_retry_skips_entries_stored_by_previous_attempts(
+    mocker, mock_repo_update, mock_repo_append_video, mock_video_repo_find_positions, tmp_path
+):
+    entries = [{"id": f"v{index}", "url": f"http://example.com/v{index}"} for index in range(3)]
+    mocker.patch.object(
+        YouTubeDownloadService, "_extract_info", new_callable=AsyncMock,
+        return_value={"title": "Playlist", "entries": entries},
+    )
+    mock_video_repo_find_positions.return_value = [0, 2]
+    download_video = mocker.patch.object(
+        YouTubeDownloadService, "_download_video", new_callable=AsyncMock, return_value=make_video("v1", 1)
+    )
+    part_file = tmp_path / "v3.f137.mp4.part"
+    part_file.write_bytes(b"partial")
+    checkpoint = mocker.Mock(completedFiles=[], partFile=str(part_file))
+    mocker.patch.object(
+        DownloadCheckpointRepository, "find_by_request", new_callable=AsyncMock, return_value=[checkpoint]
+    )
+    delete_checkpoints = mocker.patch.object(
+        DownloadCheckpointRepository, "delete_by_request", new_callable=AsyncMock
+    )
+
+    await YouTubeDownloadService.download(make_request())
+
+    assert [call.args[0] for call in download_video.call_args_list] == ["http://example.com/v1"]
+    assert mock_repo_update.call_args.args[1]["status"] == DownloadStatus.COMPLETED
+    assert not part_file.exists()
+    delete_checkpoints.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_playlist_entries_report_the_bytes_they_resume(
+    mocker, mock_repo_update, mock_repo_append_video, mock_video_repo_find_positions, tmp_path
+):
+    entries = [{"id": "v0", "url": "http://example.com/v0"}]
+    mocker.patch.object(
+        YouTubeDownloadService, "_extract_info", new_callable=AsyncMock,
+        return_value={"title": "Playlist", "entries": entries},
+    )
+    mocker.patch.object(YouTubeDownloadService, "_download_video", new_callable=AsyncMock, return_value=make_video("v0", 0))
+    mocker.patch.object(YouTubeDownloadService, "_discard_partial_files", new_callable=AsyncMock)
+    part_file = tmp_path / "v0.mp4.part"
+    part_file.write_bytes(b"partial")
+    find_checkpoint = mocker.patch.object(
+        DownloadCheckpointRepository, "find", new_callable=AsyncMock,
+        return_value=mocker.Mock(completedFiles=[], partFile=str(part_file)),
+    )
+    resumed_bytes = mocker.patch("app.download_worker.services.youtube_download_service.DOWNLOAD_RESUMED_BYTES")
+
+    await YouTubeDownloadService.download(make_request())
+
+    assert find_checkpoint.call_args.args[1] == "v0"
+    resumed_bytes.inc.assert_called_once_with(len(b"partial"))
+
+@pytest.mark.asyncio
+async def test_single_video_reuses_extracted_info(mocker, mock_repo_update, mock_repo_append_video):
+    info_dict = {"id": "abc", "title": "Video"}
+    mocker.patch.object(YouTubeDownloadService, "_extract_info", new_callable=AsyncMock, return_value=info_dict)
+    download_video = mocker.patch.object(
+        YouTubeDownloadService, "_download_video", new_callable=AsyncMock, return_value=make_video("abc")
+    )
+
+    await YouTubeDownloadService.download(make_request())
+
+    assert download_video.call_args.args[0] is info_dict
+    assert mock_repo_append_video.call_args.args[1].id == "abc"
+    update = mock_repo_update.call_args.args[1]
+    assert update["status"] == DownloadStatus.COMPLETED
+    assert update["isPlaylist"] is False
+
+@pytest.mark.asyncio
+async def test_video_skipped_by_max_filesize_is_not_stored(mocker, tmp_path):
+    ydl = mocker.MagicMock()
+    ydl.__enter__.return_value.process_ie_result.return_value = {
+        "id": "abc", "ext": "mp4", "requested_downloads": [{"filepath": str(tmp_path / "abc.mp4")}],
+    }
+    mocker.patch("app.download_worker.services.youtube_download_service.yt_dlp.YoutubeDL", return_value=ydl)
+    async def run(url, call):
+        return await asyncio.to_thread(call)
+
+    mocker.patch("app.download_worker.services.youtube_download_service.extractor_rate_limiter.run", side_effect=run)
+    delete_checkpoint = mocker.patch.object(DownloadCheckpointRepository, "delete", new_callable=AsyncMock)
+
+    with pytest.raises(RuntimeError, match="maximum file size"):
+        await YouTubeDownloadService._download_video({"id": "abc"}, str(PydanticObjectId()))
+
+    delete_checkpoint.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_failure_marks_request_failed_and_discards_partial_files(mocker, mock_repo_update, tmp_path):
+    mocker.patch.object(YouTubeDownloadService, "_extract_info", new_callable=AsyncMock, side_effect=RuntimeError("boom"))
+    part_file = tmp_path / "abc.f137.mp4.part"
+    part_file.write_bytes(b"partial")
+    checkpoint = mocker.Mock(completedFiles=[str(tmp_path / "abc.f140.m4a")], partFile=str(part_file))
+    mocker.patch.object(
+        DownloadCheckpointRepository, "find_by_request", new_callable=AsyncMock, return_value=[checkpoint]
+    )
+    delete_checkpoints = mocker.patch.object(
+        DownloadCheckpointRepository, "delete_by_request", new_callable=AsyncMock
+    )
+
+    await YouTubeDownloadService.download(make_request())
+
+    assert mock_repo_update.call_args.args[1]["status"] == DownloadStatus.FAILED
+    assert not part_file.exists()
+    delete_checkpoints.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_throttled_request_is_requeued_with_backoff(mocker, mock_repo_update):
+    mocker.patch.object(
+        YouTubeDownloadService, "_extract_info", new_callable=AsyncMock, side_effect=ThrottledError("429")
+    )
+    requeue = mocker.patch.object(DownloadRequestRepository, "requeue_for_retry", new_callable=AsyncMock)
+    mocker.patch("app.config.config.THROTTLE_RETRY_BASE_DELAY", 60)
+    request = make_request()
+    request.attempts = 2
+    request.workerId = "worker-a"
+
+    before = get_current_utc_time()
+    await YouTubeDownloadService.download(request)
+
+    mock_repo_update.assert_not_called()
+    request_id, worker_id, not_before = requeue.call_args.args
+    assert (request_id, worker_id) == (str(request.id), "worker-a")
+    # 60s * 2^2 with jitter in [120s, 240s]
+    assert timedelta(seconds=119) <= not_before - before <= timedelta(seconds=241)
+
+@pytest.mark.asyncio
+async def test_throttled_request_fails_after_max_attempts(mocker, mock_repo_update):
+    mocker.patch.object(
+        YouTubeDownloadService, "_extract_info", new_callable=AsyncMock, side_effect=ThrottledError("429")
+    )
+    requeue = mocker.patch.object(DownloadRequestRepository, "requeue_for_retry", new_callable=AsyncMock)
+    mocker.patch("app.config.config.THROTTLE_MAX_ATTEMPTS", 3)
+    request = make_request()
+    request.attempts = 3
+
+    await YouTubeDownloadService.download(request)
+
+    requeue.assert_not_called()
+    assert mock_repo_update.call_args.args[1]["status"] == DownloadStatus.FAILED
+
+def test_default_format_keeps_the_default_selector_and_cache_key():
+    options = YouTubeDownloadService._build_format_options(None, TranscodeProfile.ORIGINAL)
+
+    assert options == {}
+    assert YouTubeDownloadService._build_ydl_opts("request", options)["format"] == FORMAT_SELECTOR
+    assert YouTubeDownloadService._get_media_variant(options, TranscodeProfile.ORIGINAL) == FORMAT_SELECTOR
+
+def test_format_presets_map_to_ytdlp_options():
+    options = YouTubeDownloadService._build_format_options(
+        DownloadFormat(maxHeight=480, videoCodec=VideoCodec.VP9, maxFilesizeMb=100), TranscodeProfile.ORIGINAL
+    )
+
+    assert options["format"] == "bv*[height<=?480]+ba/b[height<=?480]"
+    assert options["format_sort"] == ["vcodec:vp9", "size:100M"]
+    assert options["max_filesize"] == 100 * 1024 * 1024
+
+def test_audio_profiles_only_download_audio():
+    options = YouTubeDownloadService._build_format_options(DownloadFormat(maxHeight=720), TranscodeProfile.AUDIO_OPUS)
+
+    assert options["format"] == "ba[ext=m4a]/ba/b"
+    assert YouTubeDownloadService._get_media_variant(options, TranscodeProfile.AUDIO_OPUS) == "ba[ext=m4a]/ba/b|audio-opus"
@@ -1,14 +1,36 @@
 import asyncio
+import contextlib
 import logging
-from typing import Dict, Any, List
+import os
+import random
+from datetime import timedelta
+from typing import Dict, Any, Optional, Union
+
+import app.config.config as config
 from app.download_requests.enums.download_status import DownloadStatus
+from app.download_requests.enums.transcode_profile import TranscodeProfile
+from app.download_requests.models.base_entity import get_current_utc_time
+from app.download_requests.models.download_format import DownloadFormat
 from app.download_requests.models.download_request_entity import DownloadRequestEntity
 from app.download_requests.models.download_request_video import DownloadRequestVideo
 from app.download_requests.repositories.download_request_repository import DownloadRequestRepository
+from app.download_requests.repositories.download_request_video_repository import DownloadRequestVideoRepository
+from app.download_worker.repositories.download_checkpoint_repository import DownloadCheckpointRepository
+from app.download_worker.services.download_checkpoint_recorder import DownloadCheckpointRecorder
+from app.download_worker.services.download_progress_reporter import DownloadProgressReporter
+from app.download_worker.services.download_stage_recorder import DownloadStageRecorder
+from app.download_worker.services.media_postprocessor import media_postprocessor
+from app.download_worker.services.media_upload_service import MediaUploadService
+from app.media_cache.services.media_cache_service import MediaCacheService
+from app.media_info.services.media_info_service import EXTRACTOR_ARGS, MediaInfoService
+from app.rate_limits.services.extractor_rate_limiter import ThrottledError, extractor_rate_limiter
+from app.services.metrics import DOWNLOAD_RESUMED_BYTES, DOWNLOAD_STAGE_DURATION
 import yt_dlp
 
 logger = logging.getLogger(__name__)
 
+FORMAT_SELECTOR = 'bv*[ext=mp4]+ba[ext=m4a]/b[ext=mp4] / bv*+ba/b'
+
 class YouTubeDownloadService:
 
     @staticmethod
@@ -16,141 +38,376 @@ class YouTubeDownloadService:
         """
         Main download orchestration method that handles the full lifecycle
         Supports both single videos and playlists
+        The request is expected to be already claimed (IN_PROGRESS) by the calling worker
         """
         try:
-            # Update status to IN_PROGRESS
-            download_request = await DownloadRequestRepository.update(
-                str(download_request.id),
-                {"status": DownloadStatus.IN_PROGRESS}
-            )
             logger.info(f"Processing download request: {download_request.id} - {download_request.url}")
+            request_id = str(download_request.id)
 
-            result = await YouTubeDownloadService._process_download(
-                download_request.url,
-                str(download_request.id)
-            )
-
-            await YouTubeDownloadService._update_download_video_info(result, download_request)
-
+            info_dict = await YouTubeDownloadService._extract_info(download_request.url)
 
+            profile = download_request.profile
+            format_options = YouTubeDownloadService._build_format_options(download_request.format, profile)
+            worker_id = download_request.workerId
+            if YouTubeDownloadService._is_playlist(info_dict):
+                await YouTubeDownloadService._download_playlist(info_dict, request_id, profile, format_options, worker_id)
+            else:
+                await YouTubeDownloadService._download_single(info_dict, request_id, profile, format_options, worker_id)
 
+        except ThrottledError as e:
+            await YouTubeDownloadService._retry_later(download_request, e)
         except Exception as e:
             # Handle any errors and mark as failed
             logger.error(f"Failed to download {download_request.url}: {str(e)}", exc_info=True)
-            await DownloadRequestRepository.update(str(download_request.id), {
-                "status": DownloadStatus.FAILED
-            })
+            await YouTubeDownloadService._fail(download_request)
+
+    @staticmethod
+    async def _fail(download_request: DownloadRequestEntity) -> None:
+        """
+        Mark the request failed and discard its partial files, unless another worker took it over meanwhile
+        """
+        request_id = str(download_request.id)
+        failed = await DownloadRequestRepository.update(request_id, {
+            "status": DownloadStatus.FAILED,
+            "leaseExpiresAt": None,
+        }, expected_status=DownloadStatus.IN_PROGRESS, worker_id=download_request.workerId)
+        if failed:
+            await YouTubeDownloadService._discard_partial_files(request_id)
+
+    @staticmethod
+    async def _retry_later(download_request: DownloadRequestEntity, error: ThrottledError) -> None:
+        """
+        Requeue a throttled request with an exponential, jittered delay, or fail it once out of attempts
+        """
+        request_id = str(download_request.id)
+        attempts = download_request.attempts or 0
+        if attempts >= config.THROTTLE_MAX_ATTEMPTS:
+            logger.error(f"Giving up on {download_request.url} after {attempts} throttled attempts: {str(error)}")
+            await YouTubeDownloadService._fail(download_request)
+            return
+
+        delay = min(config.THROTTLE_RETRY_MAX_DELAY, config.THROTTLE_RETRY_BASE_DELAY * 2 ** attempts)
+        delay = random.uniform(delay / 2, delay)
+        not_before = get_current_utc_time() + timedelta(seconds=delay)
+        logger.warning(f"Download of {download_request.url} throttled, retrying in {delay:.0f}s: {str(error)}")
+        await DownloadRequestRepository.requeue_for_retry(request_id, download_request.workerId, not_before)
+
+    @staticmethod
+    def _build_format_options(download_format: Optional[DownloadFormat], profile: TranscodeProfile) -> Dict[str, Any]:
+        """
+        yt-dlp format selection options of a request, empty for the default best mp4 video and audio.
+        Audio transcoding profiles only download the audio stream.
+        """
+        download_format = download_format or DownloadFormat()
+        audio_only = download_format.audioOnly or profile.is_audio
+
+        # Preferences, in priority order, among the formats allowed by the selector
+        format_sort = []
+        if download_format.videoCodec and not audio_only:
+            format_sort.append(f'vcodec:{download_format.videoCodec.value}')
+        if download_format.audioCodec:
+            format_sort.append(f'acodec:{download_format.audioCodec.value}')
+        if download_format.maxFilesizeMb:
+            # Largest file below the limit
+            format_sort.append(f'size:{download_format.maxFilesizeMb}M')
+
+        height = f'[height<=?{download_format.maxHeight}]' if download_format.maxHeight else ''
+        if audio_only:
+            selector = 'ba/b' if download_format.audioCodec else 'ba[ext=m4a]/ba/b'
+        elif download_format.videoCodec or download_format.audioCodec:
+            # The preferred codecs may not come in mp4/m4a containers
+            selector = f'bv*{height}+ba/b{height}'
+        else:
+            selector = f'bv*[ext=mp4]{height}+ba[ext=m4a]/b[ext=mp4]{height} / bv*{height}+ba/b{height}'
+
+        options: Dict[str, Any] = {}
+        if selector != FORMAT_SELECTOR:
+            options['format'] = selector
+        if format_sort:
+            options['format_sort'] = format_sort
+        if download_format.maxFilesizeMb:
+            options['max_filesize'] = download_format.maxFilesizeMb * 1024 * 1024
+        return options
+
+    @staticmethod
+    def _get_media_variant(format_options: Dict[str, Any], profile: TranscodeProfile) -> str:
+        """
+        Media cache variant of the files produced with these options, the plain format selector by default
+        """
+        parts = [format_options.get('format', FORMAT_SELECTOR), *format_options.get('format_sort', [])]
+        if format_options.get('max_filesize'):
+            parts.append(f"max_filesize:{format_options['max_filesize']}")
+        if profile != TranscodeProfile.ORIGINAL:
+            parts.append(profile.value)
+        return '|'.join(parts)
+
+    @staticmethod
+    def _build_ydl_opts(request_id: str, format_options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return {
+            'format': FORMAT_SELECTOR,
+            'outtmpl': f'/app/downloads/{request_id}_%(id)s.%(ext)s',
+            'quiet': False,
+            'no_warnings': False,
+            'extractor_args': EXTRACTOR_ARGS,
+            'keepvideo': False,  # Don't keep intermediate video files after merging
+            # Resume the .part files and reuse the format files left by an interrupted attempt
+            'continuedl': True,
+            'nopart': False,
+            # Remuxing for streaming (faststart) and transcoding run in the post-processing stage
+            **(format_options or {}),
+        }
+
+    @staticmethod
+    def _is_playlist(info_dict: Dict[str, Any]) -> bool:
+        return 'entries' in info_dict and isinstance(info_dict['entries'], list)
+
+    @staticmethod
+    async def _extract_info(url: str) -> Dict[str, Any]:
+        """
+        Metadata-only extraction. Playlist entries are extracted flat (id, url, title)
+        so that they can be downloaded independently afterwards. A recent probe of the
+        same URL is reused instead of extracting again.
+        """
+        return await MediaInfoService.probe(url)
 
     @staticmethod
-    async def _process_download(url: str, request_id: str) -> Dict[str, Any]:
+    async def _download_single(
+        info_dict: Dict[str, Any],
+        request_id: str,
+        profile: TranscodeProfile,
+        format_options: Dict[str, Any],
+        worker_id: Optional[str] = None,
+    ) -> None:
+        video = await YouTubeDownloadService._fetch_video(
+            info_dict, info_dict.get('extractor_key'), info_dict.get('id'), request_id,
+            profile=profile, format_options=format_options, worker_id=worker_id,
+        )
+
+        if not await DownloadRequestRepository.append_video(request_id, video, worker_id):
+            logger.warning(f"Lost the lease of {request_id}, not storing its video")
+            return
+        completed = await DownloadRequestRepository.update(request_id, {
+            "status": DownloadStatus.COMPLETED,
+            "leaseExpiresAt": None,
+            "isPlaylist": False,
+            "progress": {},
+            "title": video.title,
+            "imageUrl": video.imageUrl,
+        }, expected_status=DownloadStatus.IN_PROGRESS, worker_id=worker_id)
+        if completed:
+            logger.info(f"Successfully completed download: {request_id}")
+
+    @staticmethod
+    async def _download_playlist(
+        info_dict: Dict[str, Any],
+        request_id: str,
+        profile: TranscodeProfile,
+        format_options: Dict[str, Any],
+        worker_id: Optional[str] = None,
+    ) -> None:
+        """
+        Download playlist entries concurrently, persisting each finished entry as soon as it is available.
+        Entries stored by a previous attempt of the request are skipped.
+        """
+        entries = [e for e in info_dict['entries'] if e is not None]
+        playlist_title = info_dict.get('title', 'Unknown Playlist')
+        stored_positions = set(await DownloadRequestVideoRepository.find_positions(request_id))
+        stored_positions &= set(range(len(entries)))
+
+        logger.info(
+            f"Processing playlist: {playlist_title} with {len(entries)} videos, {len(stored_positions)} already stored"
+        )
+
+        await DownloadRequestRepository.update(request_id, {
+            "isPlaylist": True,
+            "title": playlist_title,
+            "imageUrl": YouTubeDownloadService._get_thumbnail(info_dict),
+            "playlistCount": len(entries),
+        })
+
+        semaphore = asyncio.Semaphore(config.PLAYLIST_CONCURRENCY)
+        throttled: list[ThrottledError] = []
+
+        async def _download_entry(position: int, entry: Dict[str, Any]) -> bool:
+            entry_url = entry.get('url') or entry.get('webpage_url')
+            try:
+                video = await YouTubeDownloadService._fetch_video(
+                    entry_url, entry.get('ie_key'), entry.get('id'), request_id, position, semaphore,
+                    profile, format_options, worker_id,
+                )
+            except ThrottledError as e:
+                throttled.append(e)
+                return False
+            except Exception as e:
+                logger.warning(f"Failed to download playlist entry {entry.get('id')} of {request_id}: {str(e)}")
+                return False
+
+            return await DownloadRequestRepository.append_video(request_id, video, worker_id)
+
+        results = await asyncio.gather(*[
+            _download_entry(position, entry) for position, entry in enumerate(entries)
+            if position not in stored_positions
+        ])
+        downloaded_count = len(stored_positions) + sum(results)
+
+        if throttled:
+            # Retry the playlist later, entries downloaded meanwhile are skipped then
+            raise throttled[0]
+
+        if entries and downloaded_count == 0:
+            raise RuntimeError(f"None of the {len(entries)} playlist entries could be downloaded")
+
+        completed = await DownloadRequestRepository.update(request_id, {
+            "status": DownloadStatus.COMPLETED,
+            "leaseExpiresAt": None,
+            "progress": {},
+        }, expected_status=DownloadStatus.IN_PROGRESS, worker_id=worker_id)
+        if not completed:
+            logger.warning(f"Lost the lease of {request_id} before completing it")
+            return
+        # Entries that failed for good leave their partial files behind
+        await YouTubeDownloadService._discard_partial_files(request_id)
+        logger.info(f"Successfully completed download: {request_id} - Playlist with {downloaded_count} videos")
+
+    @staticmethod
+    async def _fetch_video(
+        source: Union[str, Dict[str, Any]],
+        extractor: Optional[str],
+        video_id: Optional[str],
+        request_id: str,
+        position: Optional[int] = None,
+        download_semaphore: Optional[asyncio.Semaphore] = None,
+        profile: TranscodeProfile = TranscodeProfile.ORIGINAL,
+        format_options: Optional[Dict[str, Any]] = None,
+        worker_id: Optional[str] = None,
+    ) -> DownloadRequestVideo:
+        """
+        Resolve a video through the media cache, downloading and storing it only on a cache miss.
+        Download, post-processing and upload are separate stages: the download slot is released
+        as soon as the transfer ends, so the next entry downloads while this one is remuxed.
+        """
+        async def _fetch() -> DownloadRequestVideo:
+            async with download_semaphore or contextlib.nullcontext():
+                if video_id:
+                    await YouTubeDownloadService._log_resume(request_id, video_id)
+                video = await YouTubeDownloadService._download_video(source, request_id, position, format_options)
+            video = await media_postprocessor.process(video, profile)
+            return await YouTubeDownloadService._store_video(video, request_id)
+
+        if not extractor or not video_id:
+            return await _fetch()
+
+        # Each format and profile produces different media, cached under its own key
+        variant = YouTubeDownloadService._get_media_variant(format_options or {}, profile)
+        video = await MediaCacheService.get_or_fetch(extractor, video_id, variant, _fetch, worker_id, request_id)
+        return video.model_copy(update={"position": position})
+
+    @staticmethod
+    async def _download_video(
+        source: Union[str, Dict[str, Any]],
+        request_id: str,
+        position: Optional[int] = None,
+        format_options: Optional[Dict[str, Any]] = None,
+    ) -> DownloadRequestVideo:
         """
         Execute the actual yt-dlp download in a thread pool to avoid blocking
-        Returns dict with file_paths, videos metadata, and playlist info
+        `source` is either a URL or an already extracted info dict
         """
-        def _download():
-            downloaded_files = []
-            videos_metadata = []
+        loop = asyncio.get_running_loop()
+        reporter = DownloadProgressReporter(request_id, loop, config.PROGRESS_REPORT_INTERVAL)
+        checkpoints = DownloadCheckpointRecorder(request_id, loop, config.DOWNLOAD_CHECKPOINT_INTERVAL)
 
+        def _download():
+            recorder = DownloadStageRecorder()
             ydl_opts = {
-                'format': 'bv*[ext=mp4]+ba[ext=m4a]/b[ext=mp4] / bv*+ba/b',
-                'outtmpl': f'/app/downloads/{request_id}_%(id)s.%(ext)s',
-                'quiet': False,
-                'no_warnings': False,
-                'extractor_args': {'youtube': {'player_client': ['android', 'web']}},
-                'keepvideo': False,  # Don't keep intermediate video files after merging
-                'postprocessor_args': {
-                    'ffmpeg': ['-movflags', 'faststart']  # Optimize for streaming
-                },
+                **YouTubeDownloadService._build_ydl_opts(request_id, format_options),
+                'progress_hooks': [reporter.hook, checkpoints.progress_hook],
+                'postprocessor_hooks': [recorder.postprocessor_hook, checkpoints.postprocessor_hook],
             }
-
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info_dict = ydl.extract_info(url, download=True)
-
-                is_playlist = 'entries' in info_dict and isinstance(info_dict['entries'], list)
-
-                logger.info('Is playlist: %s', is_playlist)
-
-                print('Is playlist print', is_playlist)
-
-
-                if is_playlist:
-                    # Handle playlist
-                    playlist_title = info_dict.get('title', 'Unknown Playlist')
-                    playlist_thumbnail = info_dict.get('thumbnail')
-                    entries = [e for e in info_dict['entries'] if e is not None]
-
-                    logger.info(f"Processing playlist: {playlist_title} with {len(entries)} videos")
-
-                    for entry in entries:
-                        video_id = entry.get('id')
-                        ext = entry.get('ext', 'mp4')
-                        file_path = f"/app/downloads/{request_id}_{video_id}.{ext}"
-
-                        downloaded_files.append(file_path)
-                        videos_metadata.append(DownloadRequestVideo(
-                            id=video_id,
-                            title=entry.get('title', 'Unknown'),
-                            path=file_path,
-                            imageUrl=entry.get('thumbnail', ''),
-                            duration=entry.get('duration', 0)
-                        ))
-
-                    return {
-                        'is_playlist': True,
-                        'playlist_count': len(entries),
-                        'downloaded_count': len(downloaded_files),
-                        'playlist_title': playlist_title,
-                        'playlist_thumbnail': playlist_thumbnail,
-                        'file_paths': downloaded_files,
-                        'videos': videos_metadata
-                    }
+                if isinstance(source, dict):
+                    info_dict = ydl.process_ie_result(source, download=True)
                 else:
-                    # Handle single video
-                    video_id = info_dict.get('id')
-                    ext = info_dict.get('ext', 'mp4')
-                    file_path = f"/app/downloads/{request_id}_{video_id}.{ext}"
-
-                    video = DownloadRequestVideo(
-                        id=video_id,
-                        title=info_dict.get('title', 'Unknown'),
-                        path=file_path,
-                        imageUrl=info_dict.get('thumbnail', ''),
-                        duration=info_dict.get('duration', 0)
-                    )
-
-                    return {
-                        'is_playlist': False,
-                        'playlist_count': None,
-                        'downloaded_count': 1,
-                        'file_paths': [file_path],
-                        'videos': [video]
-                    }
-
-        # Run in thread pool to avoid blocking async event loop
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, _download)
-
-
-    @staticmethod
-    async def _update_download_video_info(result: Dict[str, Any], download_request: DownloadRequestEntity):
-        update_data = {
-            "status": DownloadStatus.COMPLETED,
-            "isPlaylist": result['is_playlist'],
-            "videos": [video.model_dump() for video in result['videos']]
-        }
+                    info_dict = ydl.extract_info(source, download=True)
 
-        if result['is_playlist']:
-            update_data['playlistCount'] = result['playlist_count']
-            update_data['downloadedCount'] = result['downloaded_count']
-            update_data['title'] = result.get('playlist_title')
-            update_data['imageUrl'] = result.get('playlist_thumbnail')
-        else:
-            if result['videos']:
-                update_data['title'] = result['videos'][0].title
-                update_data['imageUrl'] = result['videos'][0].imageUrl
+            video_id = info_dict.get('id')
+            ext = info_dict.get('ext', 'mp4')
+            requested_downloads = info_dict.get('requested_downloads') or [{}]
+            file_path = requested_downloads[0].get('filepath') or f"/app/downloads/{request_id}_{video_id}.{ext}"
+            # yt-dlp skips files larger than max_filesize without raising
+            if not os.path.exists(file_path):
+                raise RuntimeError(f"{video_id} was not downloaded, it may exceed the maximum file size")
+            recorder.record(file_path)
 
-        await DownloadRequestRepository.update(str(download_request.id), update_data)
+            return DownloadRequestVideo(
+                id=video_id,
+                title=info_dict.get('title', 'Unknown'),
+                path=file_path,
+                imageUrl=YouTubeDownloadService._get_thumbnail(info_dict) or '',
+                duration=int(info_dict.get('duration') or 0),
+                position=position,
+                size=os.path.getsize(file_path),
+            )
+
+        url = source.get('webpage_url') or source.get('url') if isinstance(source, dict) else source
+        try:
+            video = await extractor_rate_limiter.run(url, _download)
+        finally:
+            await checkpoints.close()
+        await DownloadCheckpointRepository.delete(request_id, video.id)
+        return video
 
-        log_msg = f"Successfully completed download: {download_request.id}"
-        if result['is_playlist']:
-            log_msg += f" - Playlist with {result['downloadedCount']} videos"
+    @staticmethod
+    async def _log_resume(request_id: str, video_id: str) -> None:
+        """
+        Report the bytes an interrupted attempt left on disk, yt-dlp picks them up instead of downloading them again
+        """
+        checkpoint = await DownloadCheckpointRepository.find(request_id, video_id)
+        if checkpoint is None:
+            return
+        resumed_bytes = sum(
+            os.path.getsize(file_path)
+            for file_path in [*checkpoint.completedFiles, checkpoint.partFile]
+            if file_path and os.path.exists(file_path)
+        )
+        if resumed_bytes:
+            DOWNLOAD_RESUMED_BYTES.inc(resumed_bytes)
+            logger.info(f"Resuming {video_id} of {request_id} with {resumed_bytes} bytes already downloaded")
+
+    @staticmethod
+    async def _discard_partial_files(request_id: str) -> None:
+        """
+        Remove the files of unfinished downloads once the request will not be retried anymore
+        """
+        try:
+            for checkpoint in await DownloadCheckpointRepository.find_by_request(request_id):
+                for file_path in [*checkpoint.completedFiles, checkpoint.partFile]:
+                    if file_path:
+                        with contextlib.suppress(FileNotFoundError):
+                            os.remove(file_path)
+            await DownloadCheckpointRepository.delete_by_request(request_id)
+        except Exception as e:
+            logger.warning(f"Failed to discard partial downloads of {request_id}: {str(e)}")
+
+    @staticmethod
+    async def _store_video(video: DownloadRequestVideo, request_id: str) -> DownloadRequestVideo:
+        """
+        Move the downloaded file to object storage when uploads are enabled.
+        On failure the local file is kept and the video is served from disk.
+        """
+        if not config.UPLOAD_TO_S3:
+            return video
+
+        try:
+            with DOWNLOAD_STAGE_DURATION.labels('upload').time():
+                return await MediaUploadService.upload(video, request_id)
+        except Exception as e:
+            logger.error(f"Failed to upload {video.path} for {request_id}, keeping local copy: {str(e)}")
+            return video
+
+    @staticmethod
+    def _get_thumbnail(info_dict: Dict[str, Any]) -> Optional[str]:
+        if info_dict.get('thumbnail'):
+            return info_dict['thumbnail']
+        thumbnails = info_dict.get('thumbnails') or []
+        return thumbnails[-1].get('url') if thumbnails else None
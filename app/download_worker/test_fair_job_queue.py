@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+from beanie import PydanticObjectId
+
+from app.download_requests.enums.download_status import DownloadStatus
+from app.download_requests.models.download_request_entity import DownloadRequestEntity
+from app.download_worker.fair_job_queue import FairJobQueue, is_express
+
+PLAYLIST_URL = "https://www.youtube.com/playlist?list=PL123"
+VIDEO_URL = "https://www.youtube.com/watch?v=abc"
+
+
+def make_request(url: str = VIDEO_URL, tenant: str = None, priority: int = 0) -> DownloadRequestEntity:
+    return DownloadRequestEntity.model_construct(
+        id=PydanticObjectId(), url=url, status=DownloadStatus.REGISTERED, tenant=tenant, priority=priority
+    )
+
+
+@pytest.mark.parametrize("url, expected", [
+    (VIDEO_URL, True),
+    ("https://youtu.be/abc", True),
+    (PLAYLIST_URL, False),
+    ("https://www.youtube.com/watch?v=abc&list=PL123", False),
+    ("https://www.youtube.com/@someone/videos", False),
+])
+def test_is_express_uses_url_shape(url, expected):
+    assert is_express(make_request(url)) is expected
+
+
+@pytest.mark.asyncio
+async def test_alternates_between_tenants_by_weight():
+    queue = FairJobQueue(maxsize=20, tenant_weights={"heavy": 2})
+    for _ in range(6):
+        await queue.put(make_request(PLAYLIST_URL, tenant="flood"))
+        await queue.put(make_request(PLAYLIST_URL, tenant="heavy"))
+
+    order = []
+    for _ in range(6):
+        request = await queue.get()
+        order.append(request.tenant)
+        await queue.task_done(request)
+
+    assert order.count("heavy") == 4
+    assert order.count("flood") == 2
+
+
+@pytest.mark.asyncio
+async def test_orders_by_priority_within_tenant():
+    queue = FairJobQueue(maxsize=10)
+    low = make_request(priority=0)
+    high = make_request(priority=5)
+    playlist = make_request(PLAYLIST_URL, priority=5)
+    for request in (low, playlist, high):
+        await queue.put(request)
+
+    # Equal priorities favour the single video
+    assert [await queue.get() for _ in range(3)] == [high, playlist, low]
+
+
+@pytest.mark.asyncio
+async def test_caps_running_jobs_per_tenant():
+    queue = FairJobQueue(maxsize=10, tenant_concurrency=1)
+    first = make_request(tenant="a")
+    await queue.put(first)
+    await queue.put(make_request(tenant="a"))
+    other = make_request(tenant="b")
+    await queue.put(other)
+
+    assert await queue.get() is first
+    # Tenant "a" is at its cap, so "b" goes next even though it was queued later
+    assert await queue.get() is other
+    assert queue._pop(express_only=False) is None
+
+    await queue.task_done(first)
+    assert (await queue.get()).tenant == "a"
+
+
+@pytest.mark.asyncio
+async def test_backlog_of_capped_tenant_does_not_block_other_tenants():
+    queue = FairJobQueue(maxsize=2, tenant_concurrency=1)
+    await queue.put(make_request(tenant="a"))
+    running = await queue.get()
+
+    # Tenant "a" is at its cap, its backlog is kept outside the bound
+    for _ in range(2):
+        await asyncio.wait_for(queue.put(make_request(tenant="a")), timeout=1)
+    other = make_request(tenant="b")
+    await asyncio.wait_for(queue.put(other), timeout=1)
+
+    assert await queue.get() is other
+    assert queue.qsize() == 2
+
+    await queue.task_done(running)
+    assert (await queue.get()).tenant == "a"
+
+
+@pytest.mark.asyncio
+async def test_backlog_of_capped_tenant_is_bounded():
+    queue = FairJobQueue(maxsize=2, tenant_concurrency=1)
+    await queue.put(make_request(tenant="a"))
+    running = await queue.get()
+    for _ in range(2):
+        await queue.put(make_request(tenant="a"))
+
+    blocked = asyncio.create_task(queue.put(make_request(tenant="a")))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    await queue.task_done(running)
+    await queue.get()
+    await asyncio.wait_for(blocked, timeout=1)
+    assert queue.qsize() == 2
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+from beanie import PydanticObjectId
+from unittest.mock import AsyncMock
+
+from app.download_requests.enums.download_status import DownloadStatus
+from app.download_requests.models.download_request_entity import DownloadRequestEntity
+from app.download_requests.repositories.download_request_repository import DownloadRequestRepository
+from app.download_worker.job_runner import DownloadJobRunner
+from app.download_worker.services.youtube_download_service import YouTubeDownloadService
+
+
+@pytest.mark.asyncio
+async def test_download_is_cancelled_when_the_lease_is_lost(mocker):
+    request = DownloadRequestEntity.model_construct(
+        id=PydanticObjectId(), url="http://example.com/video", status=DownloadStatus.IN_PROGRESS, workerId="worker-a"
+    )
+    mocker.patch.object(DownloadRequestRepository, "claim", new_callable=AsyncMock, return_value=request)
+    mocker.patch.object(DownloadRequestRepository, "renew_lease", new_callable=AsyncMock, return_value=False)
+    cancelled = asyncio.Event()
+
+    async def slow_download(download_request):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    mocker.patch.object(YouTubeDownloadService, "download", side_effect=slow_download)
+    runner = DownloadJobRunner("worker-a", lease_seconds=60, heartbeat_interval=0.01)
+
+    await asyncio.wait_for(runner.run(request), timeout=1)
+
+    assert cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_reaper_only_dispatches_the_requeued_requests(mocker):
+    requeued = DownloadRequestEntity.model_construct(id=PydanticObjectId(), url="http://example.com/video")
+    mocker.patch.object(DownloadRequestRepository, "requeue_expired_leases", new_callable=AsyncMock, return_value=[requeued])
+    find_registered = mocker.patch.object(DownloadRequestRepository, "find_registered", new_callable=AsyncMock)
+    submitted = asyncio.Event()
+    scheduler = mocker.Mock(submit=AsyncMock(side_effect=lambda download_request: submitted.set()))
+
+    reaper = asyncio.create_task(DownloadJobRunner.reap_expired_leases(scheduler, interval=0.01))
+    await asyncio.wait_for(submitted.wait(), timeout=1)
+    reaper.cancel()
+
+    scheduler.submit.assert_awaited_with(requeued)
+    find_registered.assert_not_awaited()
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+from beanie import PydanticObjectId
+
+from app.download_requests.enums.download_status import DownloadStatus
+from app.download_requests.models.download_request_entity import DownloadRequestEntity
+from app.download_worker.scheduler import DownloadScheduler
+
+
+def make_request(url: str = "http://example.com/video") -> DownloadRequestEntity:
+    return DownloadRequestEntity.model_construct(id=PydanticObjectId(), url=url, status=DownloadStatus.REGISTERED)
+
+
+@pytest.mark.asyncio
+async def test_runs_jobs_concurrently_up_to_limit():
+    running = 0
+    peak = 0
+    release = asyncio.Event()
+
+    async def handler(_):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await release.wait()
+        running -= 1
+
+    scheduler = DownloadScheduler(handler, concurrency=3, queue_size=10)
+    scheduler.start()
+    for _ in range(6):
+        await scheduler.submit(make_request())
+
+    await asyncio.sleep(0)
+    assert scheduler.active == 3
+    assert scheduler.pending == 3
+
+    release.set()
+    await scheduler.shutdown()
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_submit_blocks_when_queue_is_full():
+    release = asyncio.Event()
+
+    async def handler(_):
+        await release.wait()
+
+    scheduler = DownloadScheduler(handler, concurrency=1, queue_size=1)
+    scheduler.start()
+    await scheduler.submit(make_request())
+    await asyncio.sleep(0)
+    await scheduler.submit(make_request())
+
+    blocked = asyncio.create_task(scheduler.submit(make_request()))
+    await asyncio.sleep(0)
+    assert not blocked.done()
+
+    release.set()
+    await asyncio.wait_for(blocked, timeout=1)
+    await scheduler.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_shutdown_drains_queue_and_survives_handler_errors():
+    processed = []
+
+    async def handler(request):
+        if request.url.endswith("fail"):
+            raise RuntimeError("boom")
+        processed.append(request.url)
+
+    scheduler = DownloadScheduler(handler, concurrency=2, queue_size=10)
+    scheduler.start()
+    for url in ["a", "fail", "b", "c"]:
+        await scheduler.submit(make_request(url))
+
+    await scheduler.shutdown()
+    assert sorted(processed) == ["a", "b", "c"]
+
+    with pytest.raises(RuntimeError):
+        await scheduler.submit(make_request())
+
+
+@pytest.mark.asyncio
+async def test_express_workers_start_single_videos_during_playlist_flood():
+    release = asyncio.Event()
+    started = []
+
+    async def handler(request):
+        started.append(request.url)
+        await release.wait()
+
+    scheduler = DownloadScheduler(handler, concurrency=1, queue_size=20, express_concurrency=1)
+    scheduler.start()
+    for index in range(10):
+        await scheduler.submit(make_request(f"https://www.youtube.com/playlist?list=PL{index}"))
+    await asyncio.sleep(0)
+    await scheduler.submit(make_request("https://www.youtube.com/watch?v=small"))
+    await asyncio.sleep(0)
+
+    assert "https://www.youtube.com/watch?v=small" in started
+    assert scheduler.active == 2
+
+    release.set()
+    await scheduler.shutdown()
+    assert len(started) == 11
@@ -1,46 +1,75 @@
 import asyncio
 import logging
 from contextlib import asynccontextmanager
-from typing import Union
 
-from fastapi import FastAPI
-from pymongo import MongoClient
-import os
 from dotenv import load_dotenv
+from fastapi import FastAPI, Response
+from prometheus_client import CONTENT_TYPE_LATEST
 
-from app.config.database import init_db
-from app.download_requests.enums.download_status import DownloadStatus
-from app.download_requests.models.download_request_entity import DownloadRequestEntity
-from app.download_requests.repositories.download_request_repository import (
-    DownloadRequestRepository,
-)
-from app.services.s3_client import S3Client
-
+import app.config.config as config
+from app.config.database import ping_db
+from app.config.logging_config import configure_logging
+from app.config.resources import managed_resources
 from app.download_requests.controllers.v1.routes import (
     router as download_requests_router_v1,
 )
+from app.download_requests.services.download_request_event_broker import download_request_event_broker
+from app.media_info.controllers.v1.routes import router as probe_router_v1
+from app.services.metrics import MetricsMiddleware, generate_metrics
+from app.stats.controllers.v1.routes import router as stats_router_v1
 
 # Load environment variables from .env file
 load_dotenv()
-
-# s3_client = S3Client()
-from contextlib import asynccontextmanager
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup code
-    await init_db()
-    print("Database initialized")
-    yield
-    # Shutdown code
-    # Close any resources if needed
+    # Startup code, run by every server process
+    configure_logging()
+    async with managed_resources(create_indexes=config.API_CREATE_INDEXES):
+        logger.info("Database initialized")
+        download_request_event_broker.start()
+        yield
+        # Shutdown code
+        await download_request_event_broker.stop()
 
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 
 
 app.include_router(download_requests_router_v1)
+app.include_router(probe_router_v1)
+app.include_router(stats_router_v1)
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    return Response(generate_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/health/live", include_in_schema=False)
+def liveness() -> dict:
+    """
+    The process is serving requests
+    """
+    return {"status": "ok"}
+
+
+@app.get("/health/ready", include_in_schema=False)
+async def readiness(response: Response) -> dict:
+    """
+    The process finished starting and MongoDB answers
+    """
+    try:
+        ready = await asyncio.wait_for(ping_db(), timeout=config.HEALTH_CHECK_TIMEOUT)
+    except asyncio.TimeoutError:
+        ready = False
+    if not ready:
+        response.status_code = 503
+        return {"status": "unavailable", "mongodb": "down"}
+    return {"status": "ok", "mongodb": "up"}
 
 
 @app.get("/")
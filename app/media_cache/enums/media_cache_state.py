@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class MediaCacheState(str, Enum):
+    PENDING = 'Pending'
+    READY = 'Ready'
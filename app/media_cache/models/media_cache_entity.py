@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Optional
+
+from beanie import Document, PydanticObjectId
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+from app.download_requests.models.base_entity import get_current_utc_time
+from app.download_requests.models.download_request_video import DownloadRequestVideo
+from app.media_cache.enums.media_cache_state import MediaCacheState
+
+
+class MediaCacheEntity(Document):
+    """
+    Stored media shared by every download request that references it,
+    keyed by extractor, video id and format selector
+    """
+
+    id: str
+    extractor: str
+    videoId: str
+    formatSelector: str
+    state: MediaCacheState = MediaCacheState.PENDING
+    video: Optional[DownloadRequestVideo] = None
+    size: int = 0
+    refCount: int = 0
+    # Worker and download request fetching a pending entry, and the end of the lease their heartbeat renews
+    workerId: Optional[str] = None
+    requestId: Optional[PydanticObjectId] = None
+    leaseExpiresAt: Optional[datetime] = None
+    lastAccessedAt: datetime = Field(default_factory=get_current_utc_time)
+    createdAt: datetime = Field(default_factory=get_current_utc_time)
+    updatedAt: datetime = Field(default_factory=get_current_utc_time)
+
+    class Settings:
+        name = "media_cache"
+        indexes = [
+            IndexModel([("state", ASCENDING), ("refCount", ASCENDING), ("lastAccessedAt", ASCENDING)]),
+        ]
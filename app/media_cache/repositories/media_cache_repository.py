@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from beanie import PydanticObjectId
+from beanie.odm.queries.update import UpdateResponse
+from pymongo.errors import DuplicateKeyError
+
+from app.download_requests.models.base_entity import get_current_utc_time
+from app.download_requests.models.download_request_video import DownloadRequestVideo
+from app.media_cache.enums.media_cache_state import MediaCacheState
+from app.media_cache.models.media_cache_entity import MediaCacheEntity
+
+
+class MediaCacheRepository:
+    @staticmethod
+    async def find_by_key(key: str) -> Optional[MediaCacheEntity]:
+        return await MediaCacheEntity.get(key)
+
+    @staticmethod
+    async def acquire(key: str) -> Optional[MediaCacheEntity]:
+        """
+        Take a reference on a ready cache entry, returns None if the media is not cached
+        """
+        now = get_current_utc_time()
+        return await MediaCacheEntity.find_one({"_id": key, "state": MediaCacheState.READY}).update(
+            {"$inc": {"refCount": 1}, "$set": {"lastAccessedAt": now, "updatedAt": now}},
+            response_type=UpdateResponse.NEW_DOCUMENT,
+        )
+
+    @staticmethod
+    async def reserve(
+        key: str,
+        extractor: str,
+        video_id: str,
+        format_selector: str,
+        worker_id: Optional[str],
+        request_id: Optional[str],
+        lease_seconds: int,
+    ) -> bool:
+        """
+        Mark the media as being fetched by a request under a lease. Returns False if another fetch already holds the reservation.
+        """
+        now = get_current_utc_time()
+        try:
+            await MediaCacheEntity(
+                id=key,
+                extractor=extractor,
+                videoId=video_id,
+                formatSelector=format_selector,
+                workerId=worker_id,
+                requestId=PydanticObjectId(request_id) if request_id else None,
+                leaseExpiresAt=now + timedelta(seconds=lease_seconds),
+            ).insert()
+            return True
+        except DuplicateKeyError:
+            return False
+
+    @staticmethod
+    async def take_over_expired(key: str, worker_id: Optional[str], request_id: Optional[str], lease_seconds: int) -> bool:
+        """
+        Take over a reservation whose fetcher stopped renewing its lease, e.g. because its worker died
+        """
+        now = get_current_utc_time()
+        result = await MediaCacheEntity.find_one({
+            "_id": key,
+            "state": MediaCacheState.PENDING,
+            "$or": [{"leaseExpiresAt": {"$lt": now}}, {"leaseExpiresAt": None}],
+        }).update({"$set": {
+            "workerId": worker_id,
+            "requestId": PydanticObjectId(request_id) if request_id else None,
+            "leaseExpiresAt": now + timedelta(seconds=lease_seconds),
+            "updatedAt": now,
+        }})
+        return result.matched_count == 1
+
+    @staticmethod
+    async def renew_reservations(request_id: str, worker_id: str, lease_seconds: int) -> None:
+        """
+        Extend the lease of the reservations held by a request, along with the lease of the request itself
+        """
+        now = get_current_utc_time()
+        await MediaCacheEntity.find({
+            "state": MediaCacheState.PENDING,
+            "workerId": worker_id,
+            "requestId": PydanticObjectId(request_id),
+        }).update({"$set": {"leaseExpiresAt": now + timedelta(seconds=lease_seconds), "updatedAt": now}})
+
+    @staticmethod
+    async def complete(key: str, video: DownloadRequestVideo, size: int) -> None:
+        now = get_current_utc_time()
+        await MediaCacheEntity.find_one({"_id": key, "state": MediaCacheState.PENDING}).update({
+            "$set": {
+                "state": MediaCacheState.READY,
+                "video": video.model_dump(exclude={"position"}),
+                "size": size,
+                "refCount": 1,
+                "lastAccessedAt": now,
+                "updatedAt": now,
+            },
+            "$unset": {"workerId": "", "requestId": "", "leaseExpiresAt": ""},
+        })
+
+    @staticmethod
+    async def abandon(key: str) -> None:
+        """
+        Drop a reservation whose fetch failed so that the next request retries it
+        """
+        await MediaCacheEntity.find_one({"_id": key, "state": MediaCacheState.PENDING}).delete()
+
+    @staticmethod
+    async def invalidate(key: str) -> None:
+        await MediaCacheEntity.find_one({"_id": key}).delete()
+
+    @staticmethod
+    async def release(keys: Iterable[str]) -> None:
+        """
+        Drop one reference per occurrence of each key
+        """
+        now = get_current_utc_time()
+        for key, count in Counter(keys).items():
+            await MediaCacheEntity.find_one({"_id": key}).update(
+                {"$inc": {"refCount": -count}, "$set": {"updatedAt": now}}
+            )
+
+    @staticmethod
+    async def find_unreferenced(
+        accessed_before: Optional[datetime] = None,
+        limit: int = 100,
+    ) -> list[MediaCacheEntity]:
+        """
+        Returns ready entries nobody references, least recently used first
+        """
+        query = {"state": MediaCacheState.READY, "refCount": {"$lte": 0}}
+        if accessed_before is not None:
+            query["lastAccessedAt"] = {"$lt": accessed_before}
+        return await MediaCacheEntity.find(query).sort("+lastAccessedAt").limit(limit).to_list()
+
+    @staticmethod
+    async def total_size() -> int:
+        result = await MediaCacheEntity.find({"state": MediaCacheState.READY}).sum(MediaCacheEntity.size)
+        return int(result or 0)
+
+    @staticmethod
+    async def delete_unreferenced(key: str) -> bool:
+        """
+        Delete an entry only if it is still unreferenced, so a concurrent acquire wins over eviction
+        """
+        result = await MediaCacheEntity.find_one({"_id": key, "refCount": {"$lte": 0}}).delete()
+        return bool(result and result.deleted_count)
@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import logging
+import os
+from datetime import timedelta
+from typing import Awaitable, Callable, Optional
+
+import app.config.config as config
+from app.download_requests.models.base_entity import get_current_utc_time
+from app.download_requests.models.download_request_video import DownloadRequestVideo
+from app.media_cache.repositories.media_cache_repository import MediaCacheRepository
+from app.services.s3_client import get_async_s3_client
+
+logger = logging.getLogger(__name__)
+
+VideoFetcher = Callable[[], Awaitable[DownloadRequestVideo]]
+
+
+class MediaCacheService:
+    """
+    Content-addressed media cache. Requests for a video already stored with the
+    same format selector link to the stored media instead of downloading it again,
+    and concurrent requests for the same media share a single fetch.
+    """
+
+    # Fetches running in this process, keyed by cache key
+    _in_flight: dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def build_key(extractor: str, video_id: str, format_selector: str) -> str:
+        format_hash = hashlib.sha1(format_selector.encode()).hexdigest()[:12]
+        return f"{extractor.lower()}:{video_id}:{format_hash}"
+
+    @staticmethod
+    async def get_or_fetch(
+        extractor: str,
+        video_id: str,
+        format_selector: str,
+        fetch: VideoFetcher,
+        worker_id: Optional[str] = None,
+        request_id: Optional[str] = None,
+    ) -> DownloadRequestVideo:
+        """
+        Return the cached video holding a new reference on it, fetching it first if needed.
+        A fetch reserves the media under a lease renewed by the heartbeat of the request's own lease,
+        other workers wait for it and take the reservation over once that lease expires.
+        :param worker_id: Worker fetching the media for the download request `request_id`
+        """
+        key = MediaCacheService.build_key(extractor, video_id, format_selector)
+
+        while True:
+            entry = await MediaCacheRepository.acquire(key)
+            if entry is not None:
+                if MediaCacheService._is_available(entry.video):
+                    logger.info(f"Media cache hit for {key}")
+                    return entry.video.model_copy(update={"cacheKey": key})
+                logger.warning(f"Cached media for {key} is missing, fetching it again")
+                await MediaCacheRepository.invalidate(key)
+                continue
+
+            in_flight = MediaCacheService._in_flight.get(key)
+            if in_flight is not None:
+                # Propagates the fetch error to every coalesced request
+                try:
+                    await asyncio.shield(in_flight)
+                except asyncio.CancelledError:
+                    if not in_flight.cancelled():
+                        raise
+                continue
+
+            if await MediaCacheRepository.reserve(
+                key, extractor, video_id, format_selector, worker_id, request_id, config.LEASE_SECONDS
+            ):
+                return await MediaCacheService._fetch(key, fetch)
+
+            # Another worker process is fetching the same media
+            if await MediaCacheRepository.take_over_expired(key, worker_id, request_id, config.LEASE_SECONDS):
+                return await MediaCacheService._fetch(key, fetch)
+            await asyncio.sleep(config.MEDIA_CACHE_POLL_INTERVAL)
+
+    @staticmethod
+    async def _fetch(key: str, fetch: VideoFetcher) -> DownloadRequestVideo:
+        future = asyncio.get_running_loop().create_future()
+        # Avoid "exception never retrieved" warnings when nobody coalesced on this fetch
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        MediaCacheService._in_flight[key] = future
+
+        try:
+            video = await fetch()
+            size = await MediaCacheService._get_size(video)
+            await MediaCacheRepository.complete(key, video, size)
+            future.set_result(None)
+            return video.model_copy(update={"cacheKey": key})
+        except BaseException as e:
+            await asyncio.shield(MediaCacheRepository.abandon(key))
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+            raise
+        finally:
+            del MediaCacheService._in_flight[key]
+
+    @staticmethod
+    async def evict(budget_bytes: int, ttl: timedelta) -> int:
+        """
+        Remove unreferenced media unused for longer than `ttl`, then least recently
+        used unreferenced media until the cache fits in `budget_bytes`
+        """
+        evicted = []
+
+        for entry in await MediaCacheRepository.find_unreferenced(accessed_before=get_current_utc_time() - ttl):
+            if await MediaCacheRepository.delete_unreferenced(entry.id):
+                evicted.append(entry)
+
+        total_size = await MediaCacheRepository.total_size()
+        while total_size > budget_bytes:
+            candidates = await MediaCacheRepository.find_unreferenced()
+            evicted_in_round = 0
+            for entry in candidates:
+                if total_size <= budget_bytes:
+                    break
+                if await MediaCacheRepository.delete_unreferenced(entry.id):
+                    evicted.append(entry)
+                    evicted_in_round += 1
+                    total_size -= entry.size
+            if not evicted_in_round:
+                break
+
+        if evicted:
+            await MediaCacheService.remove_media([entry.video for entry in evicted if entry.video is not None])
+            logger.info(f"Evicted {len(evicted)} media cache entries")
+        return len(evicted)
+
+    @staticmethod
+    async def run_eviction(interval: float) -> None:
+        budget_bytes = int(config.MEDIA_CACHE_BUDGET_GB * 1024 ** 3)
+        ttl = timedelta(hours=config.MEDIA_CACHE_TTL_HOURS)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await MediaCacheService.evict(budget_bytes, ttl)
+            except Exception:
+                logger.exception("Media cache eviction failed")
+
+    @staticmethod
+    async def remove_media(videos: list[DownloadRequestVideo]) -> list[DownloadRequestVideo]:
+        """
+        Delete the stored files of the given videos, objects in bulk with DeleteObjects
+        :return: Videos whose file could not be deleted
+        """
+        failed = []
+        object_keys = [video.objectKey for video in videos if video.objectKey]
+        if object_keys:
+            failed_keys = set(await get_async_s3_client().delete_files(object_keys))
+            failed.extend(video for video in videos if video.objectKey in failed_keys)
+
+        local_videos = [video for video in videos if not video.objectKey and video.path]
+        if local_videos:
+            failed.extend(await asyncio.to_thread(MediaCacheService._remove_files, local_videos))
+        return failed
+
+    @staticmethod
+    def _remove_files(videos: list[DownloadRequestVideo]) -> list[DownloadRequestVideo]:
+        failed = []
+        for video in videos:
+            try:
+                os.remove(video.path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error(f"Failed to remove {video.path}: {str(e)}")
+                failed.append(video)
+        return failed
+
+    @staticmethod
+    def _is_available(video: DownloadRequestVideo) -> bool:
+        return video is not None and (video.objectKey is not None or os.path.exists(video.path))
+
+    @staticmethod
+    async def _get_size(video: DownloadRequestVideo) -> int:
+        if video.objectKey:
+            return await get_async_s3_client().get_file_size(video.objectKey) or 0
+        return await asyncio.to_thread(lambda: os.path.getsize(video.path) if os.path.exists(video.path) else 0)
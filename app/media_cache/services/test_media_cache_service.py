@@ -0,0 +1,122 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from beanie import PydanticObjectId, init_beanie
+from mongomock_motor import AsyncMongoMockClient
+
+from app.config.database import DOCUMENT_MODELS
+from app.download_requests.models.base_entity import get_current_utc_time
+from app.download_requests.models.download_request_video import DownloadRequestVideo
+from app.media_cache.models.media_cache_entity import MediaCacheEntity
+from app.media_cache.repositories.media_cache_repository import MediaCacheRepository
+from app.media_cache.services.media_cache_service import MediaCacheService
+
+
+@pytest.fixture(autouse=True)
+async def database():
+    client = AsyncMongoMockClient()
+    await init_beanie(database=client["yt_downloads_test"], document_models=DOCUMENT_MODELS)
+    yield
+
+
+def make_fetcher(tmp_path, calls: list, delay: float = 0.01):
+    async def fetch() -> DownloadRequestVideo:
+        calls.append(1)
+        await asyncio.sleep(delay)
+        file_path = tmp_path / "request_abc.mp4"
+        file_path.write_bytes(b"media")
+        return DownloadRequestVideo(id="abc", title="Video", path=str(file_path))
+
+    return fetch
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_fetch(tmp_path):
+    calls = []
+    fetch = make_fetcher(tmp_path, calls)
+
+    videos = await asyncio.gather(*[
+        MediaCacheService.get_or_fetch("Youtube", "abc", "best", fetch) for _ in range(10)
+    ])
+
+    assert len(calls) == 1
+    assert {video.path for video in videos} == {str(tmp_path / "request_abc.mp4")}
+    entry = await MediaCacheRepository.find_by_key(MediaCacheService.build_key("Youtube", "abc", "best"))
+    assert entry.refCount == 10
+    assert entry.size == len(b"media")
+
+
+@pytest.mark.asyncio
+async def test_format_selector_is_part_of_the_key(tmp_path):
+    calls = []
+    fetch = make_fetcher(tmp_path, calls)
+
+    await MediaCacheService.get_or_fetch("Youtube", "abc", "best", fetch)
+    await MediaCacheService.get_or_fetch("Youtube", "abc", "bestaudio", fetch)
+
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_is_retried_by_next_request(tmp_path):
+    async def failing_fetch():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await MediaCacheService.get_or_fetch("Youtube", "abc", "best", failing_fetch)
+
+    calls = []
+    await MediaCacheService.get_or_fetch("Youtube", "abc", "best", make_fetcher(tmp_path, calls))
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_evict_removes_unreferenced_media_past_ttl(tmp_path, mocker):
+    # Aggregations are not supported by the in-memory MongoDB stand-in
+    mocker.patch.object(MediaCacheRepository, "total_size", return_value=0)
+    video = await MediaCacheService.get_or_fetch("Youtube", "abc", "best", make_fetcher(tmp_path, []))
+    key = video.cacheKey
+
+    assert await MediaCacheService.evict(budget_bytes=0, ttl=timedelta(0)) == 0
+
+    await MediaCacheRepository.release([key])
+    await MediaCacheEntity.find_one({"_id": key}).update({"$set": {"lastAccessedAt": get_current_utc_time() - timedelta(days=1)}})
+    assert await MediaCacheService.evict(budget_bytes=10 ** 9, ttl=timedelta(hours=1)) == 1
+
+    assert await MediaCacheRepository.find_by_key(key) is None
+    assert not (tmp_path / "request_abc.mp4").exists()
+
+
+
+@pytest.mark.asyncio
+async def test_reservation_is_taken_over_once_its_lease_expires(tmp_path, mocker):
+    mocker.patch("app.config.config.MEDIA_CACHE_POLL_INTERVAL", 0.01)
+    key = MediaCacheService.build_key("Youtube", "abc", "best")
+    await MediaCacheRepository.reserve(key, "Youtube", "abc", "best", "dead-worker", None, lease_seconds=60)
+    calls = []
+    fetching = asyncio.create_task(
+        MediaCacheService.get_or_fetch("Youtube", "abc", "best", make_fetcher(tmp_path, calls), "worker-b")
+    )
+    await asyncio.sleep(0.05)
+    assert not calls
+
+    await MediaCacheEntity.find_one({"_id": key}).update(
+        {"$set": {"leaseExpiresAt": get_current_utc_time() - timedelta(seconds=1)}}
+    )
+    video = await asyncio.wait_for(fetching, timeout=1)
+
+    assert calls == [1]
+    assert video.cacheKey == key
+    assert (await MediaCacheRepository.find_by_key(key)).workerId is None
+
+
+@pytest.mark.asyncio
+async def test_renewed_reservation_is_not_taken_over():
+    key = MediaCacheService.build_key("Youtube", "abc", "best")
+    request_id = str(PydanticObjectId())
+    await MediaCacheRepository.reserve(key, "Youtube", "abc", "best", "worker-a", request_id, lease_seconds=0)
+
+    await MediaCacheRepository.renew_reservations(request_id, "worker-a", lease_seconds=60)
+
+    assert not await MediaCacheRepository.take_over_expired(key, "worker-b", None, lease_seconds=60)
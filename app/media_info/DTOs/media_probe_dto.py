@@ -0,0 +1,31 @@
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+
+class MediaProbeDTO(BaseModel):
+    url: str
+    id: Optional[str] = None
+    extractor: Optional[str] = None
+    title: Optional[str] = None
+    imageUrl: Optional[str] = None
+    duration: Optional[int] = None
+    isPlaylist: bool = False
+    playlistCount: Optional[int] = None
+
+    @classmethod
+    def from_info(cls, url: str, info: dict[str, Any]) -> "MediaProbeDTO":
+        entries = info.get("entries")
+        is_playlist = isinstance(entries, list)
+        thumbnails = info.get("thumbnails") or []
+
+        return cls(
+            url=url,
+            id=info.get("id"),
+            extractor=info.get("extractor_key"),
+            title=info.get("title"),
+            imageUrl=info.get("thumbnail") or (thumbnails[-1].get("url") if thumbnails else None),
+            duration=int(info["duration"]) if info.get("duration") else None,
+            isPlaylist=is_playlist,
+            playlistCount=len([entry for entry in entries if entry is not None]) if is_playlist else None,
+        )
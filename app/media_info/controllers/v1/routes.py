@@ -0,0 +1,32 @@
+from fastapi import APIRouter, HTTPException, Response
+from validators import url as validate_url
+
+import app.config.config as config
+from app.media_info.DTOs.media_probe_dto import MediaProbeDTO
+from app.media_info.schemas.media_probe_schema import MediaProbeSchema
+from app.media_info.services.media_info_service import MediaExtractionError, MediaInfoService
+from app.rate_limits.services.extractor_rate_limiter import ThrottledError
+
+router = APIRouter(prefix=f"{config.API_BASE_PATH}/v1/probe", tags=["Probe V1"])
+
+
+@router.post("/")
+async def probe_media(request: MediaProbeSchema, response: Response) -> MediaProbeDTO:
+    """
+    Metadata of a URL (title, thumbnail, duration, playlist size) without downloading it
+    """
+    if not validate_url(request.url):
+        raise HTTPException(status_code=400, detail="Invalid URL format")
+
+    try:
+        info = await MediaInfoService.probe(request.url)
+    except ThrottledError:
+        raise HTTPException(
+            status_code=429,
+            detail="Upstream is throttling requests, retry later",
+            headers={"Retry-After": str(int(config.RATE_LIMIT_COOLDOWN))},
+        )
+    except MediaExtractionError as e:
+        raise HTTPException(status_code=422, detail=f"Cannot extract media info: {e}")
+
+    return MediaProbeDTO.from_info(request.url, info)
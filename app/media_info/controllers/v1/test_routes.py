@@ -0,0 +1,47 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from unittest.mock import AsyncMock
+
+from app.main import app
+from app.media_info.services.media_info_service import MediaExtractionError, MediaInfoService
+from app.rate_limits.services.extractor_rate_limiter import ThrottledError
+
+
+@pytest.fixture
+def mock_probe(mocker):
+    return mocker.patch.object(MediaInfoService, "probe", new_callable=AsyncMock)
+
+@pytest.mark.asyncio
+async def test_probe_playlist(mock_probe):
+    mock_probe.return_value = {
+        "id": "PL1",
+        "extractor_key": "YoutubeTab",
+        "title": "Playlist",
+        "thumbnails": [{"url": "http://example.com/small.jpg"}, {"url": "http://example.com/large.jpg"}],
+        "entries": [{"id": "a"}, None, {"id": "b"}],
+    }
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.post("/api/v1/probe/", json={"url": "https://www.youtube.com/playlist?list=PL1"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["isPlaylist"] is True
+    assert body["playlistCount"] == 2
+    assert body["imageUrl"] == "http://example.com/large.jpg"
+
+@pytest.mark.asyncio
+async def test_probe_errors(mock_probe):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        invalid = await ac.post("/api/v1/probe/", json={"url": "not a url"})
+
+        mock_probe.side_effect = ThrottledError("429")
+        throttled = await ac.post("/api/v1/probe/", json={"url": "https://youtu.be/abc"})
+
+        mock_probe.side_effect = MediaExtractionError("ERROR: Video unavailable")
+        unavailable = await ac.post("/api/v1/probe/", json={"url": "https://youtu.be/abc"})
+
+    assert invalid.status_code == 400
+    assert throttled.status_code == 429
+    assert "Retry-After" in throttled.headers
+    assert unavailable.status_code == 422
@@ -0,0 +1,26 @@
+from datetime import datetime
+from typing import Any
+
+from beanie import Document
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+from app.download_requests.models.base_entity import get_current_utc_time
+
+
+class MediaInfoEntity(Document):
+    """
+    Metadata-only yt-dlp extraction result keyed by normalized URL.
+    MongoDB removes the document once `expiresAt` is reached.
+    """
+
+    id: str
+    info: dict[str, Any]
+    createdAt: datetime = Field(default_factory=get_current_utc_time)
+    expiresAt: datetime
+
+    class Settings:
+        name = "media_info"
+        indexes = [
+            IndexModel([("expiresAt", ASCENDING)], expireAfterSeconds=0),
+        ]
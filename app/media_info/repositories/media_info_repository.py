@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Optional
+
+from app.download_requests.models.base_entity import get_current_utc_time
+from app.media_info.models.media_info_entity import MediaInfoEntity
+
+
+class MediaInfoRepository:
+    @staticmethod
+    async def find_by_key(key: str) -> Optional[MediaInfoEntity]:
+        """
+        Returns the cached info, ignoring entries expired but not yet removed by the TTL monitor
+        """
+        return await MediaInfoEntity.find_one({"_id": key, "expiresAt": {"$gt": get_current_utc_time()}})
+
+    @staticmethod
+    async def save(key: str, info: dict[str, Any], expires_at: datetime) -> None:
+        await MediaInfoEntity.find_one({"_id": key}).upsert(
+            {"$set": {"info": info, "createdAt": get_current_utc_time(), "expiresAt": expires_at}},
+            on_insert=MediaInfoEntity(id=key, info=info, expiresAt=expires_at),
+        )
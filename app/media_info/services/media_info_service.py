@@ -0,0 +1,169 @@
+import asyncio
+import copy
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import app.config.config as config
+from app.download_requests.models.base_entity import get_current_utc_time
+from app.media_info.repositories.media_info_repository import MediaInfoRepository
+from app.rate_limits.services.extractor_rate_limiter import extractor_rate_limiter
+from app.services.metrics import DOWNLOAD_STAGE_DURATION
+
+logger = logging.getLogger(__name__)
+
+EXTRACTOR_ARGS = {'youtube': {'player_client': ['android', 'web']}}
+# Query parameters that do not change the extracted media
+IGNORED_QUERY_PARAMS = {'si', 'feature', 'pp', 't', 'start', 'index', 'ab_channel'}
+# Bulky fields never used by the API nor the download worker
+DROPPED_FIELDS = ('automatic_captions', 'subtitles', 'heatmap')
+
+
+class MediaExtractionError(Exception):
+    """
+    The extractor could not read the media info, e.g. unavailable or private media
+    """
+
+
+class MediaInfoService:
+    """
+    Metadata-only extraction shared by the probe endpoint and the download worker.
+    Results are cached in MongoDB for MEDIA_INFO_TTL seconds, short enough for the
+    format URLs they hold to still be valid, with an in-process LRU in front.
+    """
+
+    # Normalized URL -> (expiry as time.monotonic(), info dict)
+    _lru: OrderedDict[str, tuple[float, Dict[str, Any]]] = OrderedDict()
+    # Extractions and lookups running in this process, keyed by normalized URL
+    _in_flight: dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def normalize_url(url: str) -> str:
+        """
+        Cache key of a URL: lowercase host without www/m prefixes, short links expanded,
+        tracking parameters and fragment dropped, remaining parameters sorted
+        """
+        parsed = urlsplit(url.strip())
+        host = (parsed.hostname or '').lower().removeprefix('www.').removeprefix('m.')
+        path = parsed.path.rstrip('/')
+        query = [
+            (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+            if key not in IGNORED_QUERY_PARAMS and not key.startswith('utm_')
+        ]
+
+        if host == 'youtu.be' and path:
+            host, path = 'youtube.com', '/watch'
+            query.append(('v', parsed.path.strip('/')))
+        elif host == 'youtube.com' and path.startswith('/shorts/'):
+            query.append(('v', path.removeprefix('/shorts/')))
+            path = '/watch'
+
+        return urlunsplit((parsed.scheme.lower() or 'https', host, path, urlencode(sorted(query)), ''))
+
+    @staticmethod
+    async def probe(url: str) -> Dict[str, Any]:
+        """
+        Return the metadata of `url`, extracting it only when neither cache has it.
+        Playlist entries are extracted flat (id, url, title).
+        Raises MediaExtractionError when the extractor cannot read the URL.
+        The returned dict is a copy that the caller may modify.
+        """
+        key = MediaInfoService.normalize_url(url)
+
+        info = MediaInfoService._get_cached(key)
+        if info is None:
+            in_flight = MediaInfoService._in_flight.get(key)
+            if in_flight is not None:
+                info = await asyncio.shield(in_flight)
+            else:
+                info = await MediaInfoService._load(key, url)
+
+        return copy.deepcopy(info)
+
+    @staticmethod
+    async def _load(key: str, url: str) -> Dict[str, Any]:
+        future = asyncio.get_running_loop().create_future()
+        # Avoid "exception never retrieved" warnings when nobody coalesced on this lookup
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        MediaInfoService._in_flight[key] = future
+
+        try:
+            entity = await MediaInfoRepository.find_by_key(key)
+            if entity is not None:
+                info, expires_at = entity.info, entity.expiresAt
+            else:
+                info = await MediaInfoService._extract(url)
+                expires_at = get_current_utc_time() + timedelta(seconds=config.MEDIA_INFO_TTL)
+                try:
+                    await MediaInfoRepository.save(key, info, expires_at)
+                except Exception as e:
+                    logger.warning(f"Failed to cache media info of {url}: {str(e)}")
+
+            MediaInfoService._put_cached(key, info, expires_at)
+            future.set_result(info)
+            return info
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+            raise
+        finally:
+            del MediaInfoService._in_flight[key]
+
+    @staticmethod
+    async def _extract(url: str) -> Dict[str, Any]:
+        def _extract_info():
+            # Imported on first use, yt-dlp is the slowest import of the API
+            import yt_dlp
+
+            ydl_opts = {
+                'quiet': True,
+                'no_warnings': True,
+                'extract_flat': 'in_playlist',
+                'extractor_args': EXTRACTOR_ARGS,
+            }
+            try:
+                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                    info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+            except yt_dlp.utils.DownloadError as e:
+                raise MediaExtractionError(e.msg or str(e)) from e
+            for field in DROPPED_FIELDS:
+                info.pop(field, None)
+            return info
+
+        started = time.monotonic()
+        info = await extractor_rate_limiter.run(url, _extract_info)
+        elapsed = time.monotonic() - started
+        DOWNLOAD_STAGE_DURATION.labels('extract').observe(elapsed)
+        logger.info(f"Extracted media info of {url} in {elapsed:.2f}s")
+        return info
+
+    @staticmethod
+    def _get_cached(key: str) -> Optional[Dict[str, Any]]:
+        cached = MediaInfoService._lru.get(key)
+        if cached is None:
+            return None
+        expires, info = cached
+        if expires <= time.monotonic():
+            del MediaInfoService._lru[key]
+            return None
+        MediaInfoService._lru.move_to_end(key)
+        return info
+
+    @staticmethod
+    def _put_cached(key: str, info: Dict[str, Any], expires_at: datetime) -> None:
+        if expires_at.tzinfo is None:
+            # Datetimes read back from MongoDB are naive UTC
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        remaining = (expires_at - get_current_utc_time()).total_seconds()
+        if config.MEDIA_INFO_LRU_SIZE <= 0 or remaining <= 0:
+            return
+
+        MediaInfoService._lru[key] = (time.monotonic() + remaining, info)
+        MediaInfoService._lru.move_to_end(key)
+        while len(MediaInfoService._lru) > config.MEDIA_INFO_LRU_SIZE:
+            MediaInfoService._lru.popitem(last=False)
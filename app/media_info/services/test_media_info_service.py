@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+from beanie import init_beanie
+from mongomock_motor import AsyncMongoMockClient
+
+from app.config.database import DOCUMENT_MODELS
+from app.media_info.repositories.media_info_repository import MediaInfoRepository
+from app.media_info.services.media_info_service import MediaInfoService
+
+
+@pytest.fixture(autouse=True)
+async def database():
+    client = AsyncMongoMockClient()
+    await init_beanie(database=client["yt_downloads_test"], document_models=DOCUMENT_MODELS)
+    MediaInfoService._lru.clear()
+    yield
+
+
+@pytest.fixture
+def mock_extract(mocker):
+    async def extract(url):
+        await asyncio.sleep(0.01)
+        return {"id": "abc", "title": "Video", "duration": 42}
+    return mocker.patch.object(MediaInfoService, "_extract", side_effect=extract)
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://www.youtube.com/watch?v=abc&si=x&utm_source=y#t=1", "https://youtube.com/watch?v=abc"),
+    ("https://youtu.be/abc?t=10", "https://youtube.com/watch?v=abc"),
+    ("https://m.youtube.com/shorts/abc", "https://youtube.com/watch?v=abc"),
+    ("https://youtube.com/watch?list=PL1&v=abc", "https://youtube.com/watch?list=PL1&v=abc"),
+])
+def test_normalize_url(url, expected):
+    assert MediaInfoService.normalize_url(url) == expected
+
+
+@pytest.mark.asyncio
+async def test_concurrent_probes_share_one_extraction(mock_extract):
+    results = await asyncio.gather(
+        MediaInfoService.probe("https://www.youtube.com/watch?v=abc"),
+        MediaInfoService.probe("https://youtu.be/abc"),
+    )
+
+    assert mock_extract.call_count == 1
+    assert results[0] == results[1] == {"id": "abc", "title": "Video", "duration": 42}
+    # Callers get copies of the cached info
+    results[0]["title"] = "Changed"
+    assert (await MediaInfoService.probe("https://youtu.be/abc"))["title"] == "Video"
+
+
+@pytest.mark.asyncio
+async def test_probe_falls_back_to_the_ttl_collection(mock_extract):
+    await MediaInfoService.probe("https://youtu.be/abc")
+    assert await MediaInfoRepository.find_by_key("https://youtube.com/watch?v=abc") is not None
+
+    # Another process only shares the MongoDB cache
+    MediaInfoService._lru.clear()
+    info = await MediaInfoService.probe("https://youtu.be/abc")
+
+    assert mock_extract.call_count == 1
+    assert info["title"] == "Video"
@@ -0,0 +1,20 @@
+from beanie import Document
+
+
+class RateLimitBucketEntity(Document):
+    """
+    Token bucket shared by every worker process, keyed by extractor domain ("*" for the global bucket).
+    Writes are guarded by `version` so that concurrent workers never lose an update.
+    """
+
+    id: str
+    tokens: float
+    # Current refill rate in tokens per second, lowered when the upstream throttles
+    rate: float
+    # Epoch seconds
+    refilledAt: float
+    blockedUntil: float = 0.0
+    version: int = 0
+
+    class Settings:
+        name = "rate_limit_buckets"
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from app.rate_limits.models.rate_limit_bucket_entity import RateLimitBucketEntity
+
+
+class RateLimitBucketRepository:
+    @staticmethod
+    async def find_by_key(key: str) -> Optional[RateLimitBucketEntity]:
+        return await RateLimitBucketEntity.get(key)
+
+    @staticmethod
+    async def create(entity: RateLimitBucketEntity) -> bool:
+        """
+        Insert a new bucket, returns False if another worker created it first
+        """
+        try:
+            await entity.insert()
+        except DuplicateKeyError:
+            return False
+        return True
+
+    @staticmethod
+    async def save_if_unchanged(entity: RateLimitBucketEntity) -> bool:
+        """
+        Write the bucket state if nobody updated it since it was read, bumping its version.
+        Returns False on a concurrent update, in which case the caller reloads and retries.
+        """
+        result = await RateLimitBucketEntity.find_one({"_id": entity.id, "version": entity.version}).update(
+            {"$set": {
+                "tokens": entity.tokens,
+                "rate": entity.rate,
+                "refilledAt": entity.refilledAt,
+                "blockedUntil": entity.blockedUntil,
+                "version": entity.version + 1,
+            }},
+        )
+        return result.modified_count == 1
@@ -0,0 +1,256 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Callable, Optional, Protocol, TypeVar
+from urllib.parse import urlparse
+
+import app.config.config as config
+from app.rate_limits.models.rate_limit_bucket_entity import RateLimitBucketEntity
+from app.rate_limits.repositories.rate_limit_bucket_repository import RateLimitBucketRepository
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+GLOBAL_KEY = "*"
+DOMAIN_ALIASES = {"youtu.be": "youtube.com"}
+THROTTLING_MARKERS = (
+    "http error 429",
+    "too many requests",
+    "rate-limit",
+    "rate limit",
+    "confirm you're not a bot",
+    "confirm you’re not a bot",
+)
+
+
+class ThrottledError(Exception):
+    """
+    Raised when the upstream throttled an extractor call, the request should be retried later
+    """
+
+
+def get_domain(url: Optional[str]) -> str:
+    hostname = (urlparse(url or "").hostname or "").lower()
+    hostname = DOMAIN_ALIASES.get(hostname, hostname)
+    return ".".join(hostname.split(".")[-2:]) or "unknown"
+
+
+def is_throttling_error(error: Optional[BaseException]) -> bool:
+    """
+    Whether the error, or any error it wraps, is an HTTP 429 or a throttling page
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if 429 in (getattr(error, "status", None), getattr(error, "code", None)):
+            return True
+        message = str(error).lower()
+        if any(marker in message for marker in THROTTLING_MARKERS):
+            return True
+        # yt-dlp's DownloadError keeps the original error in exc_info
+        exc_info = getattr(error, "exc_info", None)
+        wrapped = exc_info[1] if isinstance(exc_info, tuple) and len(exc_info) > 1 else None
+        error = wrapped or error.__cause__ or error.__context__
+    return False
+
+
+@dataclass
+class TokenBucket:
+    tokens: float
+    rate: float
+    # Epoch seconds
+    refilledAt: float
+    blockedUntil: float = 0.0
+
+
+@dataclass(frozen=True)
+class BucketPolicy:
+    """
+    :param capacity: Burst size
+    :param max_rate: Refill rate in tokens per second when the upstream is healthy
+    :param min_rate: Floor of the refill rate after repeated throttling
+    :param recovery: Refill rate regained per second since the last throttling (additive increase)
+    """
+    capacity: float
+    max_rate: float
+    min_rate: float
+    recovery: float
+
+    def new_bucket(self, now: float) -> TokenBucket:
+        return TokenBucket(tokens=self.capacity, rate=self.max_rate, refilledAt=now)
+
+    def refill(self, bucket: TokenBucket, now: float) -> None:
+        elapsed = max(0.0, now - bucket.refilledAt)
+        bucket.tokens = min(self.capacity, bucket.tokens + elapsed * bucket.rate)
+        bucket.rate = min(self.max_rate, bucket.rate + elapsed * self.recovery)
+        bucket.refilledAt = now
+
+    def take(self, bucket: TokenBucket, now: float) -> float:
+        """
+        Take a token, returns 0 on success or the number of seconds to wait before retrying
+        """
+        self.refill(bucket, now)
+        if now < bucket.blockedUntil:
+            return bucket.blockedUntil - now
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return 0.0
+        return (1 - bucket.tokens) / bucket.rate
+
+    def penalize(self, bucket: TokenBucket, now: float, cooldown: float) -> bool:
+        """
+        Halve the refill rate (multiplicative decrease) and pause the bucket for `cooldown` seconds.
+        Throttling reported while the bucket is already paused is part of the same episode and ignored.
+        """
+        self.refill(bucket, now)
+        if now < bucket.blockedUntil:
+            return False
+        bucket.rate = max(self.min_rate, bucket.rate / 2)
+        bucket.tokens = min(bucket.tokens, 0.0)
+        bucket.blockedUntil = now + cooldown
+        return True
+
+
+class TokenBucketStore(Protocol):
+    async def update(
+        self, key: str, policy: BucketPolicy, mutate: Callable[[TokenBucket, float], T]
+    ) -> T:
+        ...
+
+
+class LocalTokenBucketStore:
+    """
+    In-process buckets, for a single worker process or when MongoDB coordination is not wanted
+    """
+
+    def __init__(self):
+        self._buckets: dict[str, TokenBucket] = {}
+
+    async def update(self, key: str, policy: BucketPolicy, mutate: Callable[[TokenBucket, float], T]) -> T:
+        now = time.time()
+        bucket = self._buckets.setdefault(key, policy.new_bucket(now))
+        return mutate(bucket, now)
+
+
+class MongoTokenBucketStore:
+    """
+    Buckets shared by every worker process through MongoDB, updated with optimistic concurrency
+    """
+
+    async def update(self, key: str, policy: BucketPolicy, mutate: Callable[[TokenBucket, float], T]) -> T:
+        while True:
+            now = time.time()
+            entity = await RateLimitBucketRepository.find_by_key(key)
+            if entity is None:
+                bucket = policy.new_bucket(now)
+                result = mutate(bucket, now)
+                if await RateLimitBucketRepository.create(RateLimitBucketEntity(id=key, **asdict(bucket))):
+                    return result
+                continue
+
+            bucket = TokenBucket(
+                tokens=entity.tokens, rate=entity.rate, refilledAt=entity.refilledAt, blockedUntil=entity.blockedUntil
+            )
+            result = mutate(bucket, now)
+            if await RateLimitBucketRepository.save_if_unchanged(entity.model_copy(update=asdict(bucket))):
+                return result
+
+
+class ExtractorRateLimiter:
+    """
+    Paces extractor calls with a global token bucket and one bucket per extractor domain.
+    Domain buckets slow down when the upstream throttles and recover gradually afterwards.
+    Calls run on a dedicated thread pool of `max_workers` threads rather than the default executor.
+    """
+
+    def __init__(
+        self,
+        store: TokenBucketStore,
+        global_policy: Optional[BucketPolicy],
+        domain_policy: Optional[BucketPolicy],
+        cooldown: float,
+        max_workers: int,
+    ):
+        self._store = store
+        self._global_policy = global_policy
+        self._domain_policy = domain_policy
+        self._cooldown = cooldown
+        self._max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def acquire(self, domain: str) -> None:
+        """
+        Wait until both the domain and the global bucket grant a token
+        """
+        if self._domain_policy is not None:
+            await self._acquire(domain, self._domain_policy)
+        if self._global_policy is not None:
+            await self._acquire(GLOBAL_KEY, self._global_policy)
+
+    async def penalize(self, domain: str) -> None:
+        if self._domain_policy is None:
+            return
+        policy = self._domain_policy
+        penalized = await self._store.update(
+            domain, policy, lambda bucket, now: policy.penalize(bucket, now, self._cooldown)
+        )
+        if penalized:
+            logger.warning(f"Throttled by {domain}, pausing requests for {self._cooldown}s")
+
+    async def run(self, url: Optional[str], call: Callable[[], T]) -> T:
+        """
+        Run a blocking extractor call for `url` in the thread pool once the buckets allow it.
+        Throttling responses slow down the domain and surface as ThrottledError.
+        """
+        domain = get_domain(url)
+        await self.acquire(domain)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), call)
+        except Exception as e:
+            if not is_throttling_error(e):
+                raise
+            await self.penalize(domain)
+            raise ThrottledError(f"Throttled by {domain}") from e
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix='extractor')
+        return self._executor
+
+    async def _acquire(self, key: str, policy: BucketPolicy) -> None:
+        while True:
+            wait = await self._store.update(key, policy, policy.take)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+def _build_policy(rate: float) -> Optional[BucketPolicy]:
+    if rate <= 0:
+        return None
+    return BucketPolicy(
+        capacity=max(1.0, config.RATE_LIMIT_BURST),
+        max_rate=rate,
+        min_rate=min(rate, config.RATE_LIMIT_MIN_RPS),
+        recovery=config.RATE_LIMIT_RECOVERY_RPS,
+    )
+
+
+# Global limiter instance used by the download service
+extractor_rate_limiter = ExtractorRateLimiter(
+    store=MongoTokenBucketStore() if config.RATE_LIMIT_BACKEND == "mongo" else LocalTokenBucketStore(),
+    global_policy=_build_policy(config.RATE_LIMIT_GLOBAL_RPS),
+    domain_policy=_build_policy(config.RATE_LIMIT_DOMAIN_RPS),
+    cooldown=config.RATE_LIMIT_COOLDOWN,
+    max_workers=config.EXTRACTOR_THREADS,
+)
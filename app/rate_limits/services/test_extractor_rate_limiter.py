@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from beanie import init_beanie
+from mongomock_motor import AsyncMongoMockClient
+from yt_dlp.utils import DownloadError
+
+from app.config.database import DOCUMENT_MODELS
+from app.rate_limits.services.extractor_rate_limiter import (
+    BucketPolicy,
+    ExtractorRateLimiter,
+    LocalTokenBucketStore,
+    MongoTokenBucketStore,
+    get_domain,
+    is_throttling_error,
+)
+
+POLICY = BucketPolicy(capacity=2, max_rate=1, min_rate=0.1, recovery=0.01)
+
+
+class FakeHTTPError(Exception):
+    status = 429
+
+
+def test_bucket_grants_burst_then_asks_to_wait():
+    bucket = POLICY.new_bucket(now=0)
+
+    assert POLICY.take(bucket, 0) == 0
+    assert POLICY.take(bucket, 0) == 0
+    assert POLICY.take(bucket, 0) == pytest.approx(1.0)
+    # One token refilled after a second at 1 token/s
+    assert POLICY.take(bucket, 1) == 0
+
+
+def test_penalize_halves_rate_pauses_and_recovers():
+    bucket = POLICY.new_bucket(now=0)
+
+    assert POLICY.penalize(bucket, 0, cooldown=30)
+    assert bucket.rate == 0.5
+    assert POLICY.take(bucket, 10) == pytest.approx(20)
+    # Throttling reported during the cooldown belongs to the same episode
+    assert not POLICY.penalize(bucket, 10, cooldown=30)
+    assert bucket.rate == pytest.approx(0.6)
+
+    POLICY.refill(bucket, 100)
+    assert bucket.rate == 1
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://www.youtube.com/watch?v=abc", "youtube.com"),
+    ("https://music.youtube.com/watch?v=abc", "youtube.com"),
+    ("https://youtu.be/abc", "youtube.com"),
+    ("https://vimeo.com/123", "vimeo.com"),
+    (None, "unknown"),
+])
+def test_get_domain(url, expected):
+    assert get_domain(url) == expected
+
+
+def test_is_throttling_error_inspects_wrapped_errors():
+    try:
+        raise FakeHTTPError("boom")
+    except FakeHTTPError as e:
+        wrapped = DownloadError("ERROR: unable to download video data", exc_info=(type(e), e, None))
+
+    assert is_throttling_error(wrapped)
+    assert is_throttling_error(DownloadError("ERROR: HTTP Error 429: Too Many Requests"))
+    assert not is_throttling_error(DownloadError("ERROR: Video unavailable"))
+
+
+@pytest.mark.asyncio
+async def test_limiter_waits_for_domain_token(mocker):
+    sleep = mocker.patch("asyncio.sleep", new_callable=mocker.AsyncMock)
+    limiter = ExtractorRateLimiter(
+        LocalTokenBucketStore(), global_policy=None,
+        domain_policy=BucketPolicy(capacity=1, max_rate=1000, min_rate=1, recovery=0), cooldown=30, max_workers=1,
+    )
+
+    await limiter.acquire("youtube.com")
+    sleep.assert_not_called()
+    await limiter.acquire("youtube.com")
+    sleep.assert_called()
+    # Other domains have their own bucket
+    sleep.reset_mock()
+    await limiter.acquire("vimeo.com")
+    sleep.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_limiter_runs_calls_on_its_own_bounded_pool():
+    limiter = ExtractorRateLimiter(
+        LocalTokenBucketStore(), global_policy=None, domain_policy=None, cooldown=30, max_workers=2,
+    )
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def call():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+        return threading.current_thread().name
+
+    names = await asyncio.gather(*[limiter.run("https://youtube.com/watch", call) for _ in range(6)])
+    limiter.shutdown()
+
+    assert peak == 2
+    assert all(name.startswith("extractor") for name in names)
+
+
+@pytest.mark.asyncio
+async def test_mongo_store_never_grants_more_than_capacity():
+    client = AsyncMongoMockClient()
+    await init_beanie(database=client["yt_downloads_test"], document_models=DOCUMENT_MODELS)
+    store = MongoTokenBucketStore()
+    policy = BucketPolicy(capacity=3, max_rate=0.001, min_rate=0.001, recovery=0)
+
+    waits = await asyncio.gather(*[store.update("youtube.com", policy, policy.take) for _ in range(6)])
+
+    assert sum(1 for wait in waits if wait == 0) == 3
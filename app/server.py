@@ -0,0 +1,47 @@
+"""
+Production entrypoint of the API, running API_WORKERS uvicorn processes on API_PORT.
+
+Each process opens its own MongoDB client and change stream in the app lifespan.
+With several processes, Prometheus metrics are shared through the files of
+PROMETHEUS_MULTIPROC_DIR, emptied at startup or created when not set.
+
+Usage:
+    python -m app.server
+"""
+import os
+import shutil
+import tempfile
+
+import uvicorn
+
+import app.config.config as config
+
+
+def prepare_metrics_dir() -> str:
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        # Files left by a previous run would be added to the new values
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+    else:
+        directory = tempfile.mkdtemp(prefix="prometheus-")
+    # Inherited by the server processes, before they import prometheus_client
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+    return directory
+
+
+def main() -> None:
+    if config.API_WORKERS > 1:
+        prepare_metrics_dir()
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=config.API_PORT,
+        workers=config.API_WORKERS,
+        proxy_headers=True,
+        timeout_graceful_shutdown=config.API_GRACEFUL_SHUTDOWN_TIMEOUT,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import os
+import time
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from pymongo import monitoring
+
+# API
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time until the response headers are sent, by route template",
+    ["method", "route", "status"],
+)
+
+# MongoDB
+MONGO_COMMAND_DURATION = Histogram(
+    "mongodb_command_duration_seconds",
+    "MongoDB command round-trip time",
+    ["command", "collection", "outcome"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+# Download worker
+DOWNLOAD_REQUESTS = Gauge(
+    "download_requests",
+    "Download requests by status, sampled periodically",
+    ["status"],
+)
+DOWNLOAD_STAGE_DURATION = Histogram(
+    "download_stage_duration_seconds",
+    "Duration of each stage of a video download",
+    ["stage"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600),
+)
+DOWNLOAD_BYTES = Counter(
+    "download_bytes_total",
+    "Bytes of media downloaded from extractors",
+)
+DOWNLOAD_RESUMED_BYTES = Counter(
+    "download_resumed_bytes_total",
+    "Bytes left on disk by interrupted downloads and reused when they resume",
+)
+DOWNLOAD_THROUGHPUT = Histogram(
+    "download_throughput_bytes_per_second",
+    "Average transfer rate of each downloaded video",
+    buckets=(64e3, 256e3, 1e6, 2.5e6, 5e6, 10e6, 25e6, 50e6, 100e6),
+)
+WORKER_SLOTS = Gauge("worker_slots", "Download jobs the worker can run at once")
+WORKER_ACTIVE_JOBS = Gauge("worker_active_jobs", "Download jobs currently running")
+WORKER_QUEUED_JOBS = Gauge("worker_queued_jobs", "Download jobs waiting in the worker queue")
+
+
+def generate_metrics() -> bytes:
+    """
+    Metrics of this process, or of every API process when they share a PROMETHEUS_MULTIPROC_DIR
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return generate_latest()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing requests by route template rather than raw path, so that
+    ids in the path do not create new series. Streaming responses (SSE, media) are
+    timed until their headers are sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        observed = False
+
+        def observe(status: int) -> None:
+            nonlocal observed
+            observed = True
+            # The router stores the matched route in the scope
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status)
+            ).observe(time.perf_counter() - started)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                observe(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not observed:
+                observe(500)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    pymongo command listener recording the duration of every command
+    """
+
+    def __init__(self):
+        self._collections: dict[tuple[int, int], str] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        target = event.command.get("collection" if event.command_name == "getMore" else event.command_name)
+        if isinstance(target, str):
+            self._collections[(event.request_id, event.operation_id)] = target
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._observe(event, "success")
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._observe(event, "failure")
+
+    def _observe(self, event, outcome: str) -> None:
+        collection = self._collections.pop((event.request_id, event.operation_id), "")
+        MONGO_COMMAND_DURATION.labels(event.command_name, collection, outcome).observe(event.duration_micros / 1e6)
@@ -1,14 +1,19 @@
+import asyncio
+import functools
 import os
 
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
-import boto3
 from botocore.exceptions import ClientError, NoCredentialsError
-from botocore.config import Config
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of keys accepted by a single DeleteObjects call
+DELETE_BATCH_SIZE = 1000
+
 class S3Client:
     def __init__(self):
         """Initialize S3 client with environment variables"""
@@ -19,15 +24,30 @@ class S3Client:
         self.region = os.getenv('S3_REGION', 'us-east-1')
         self.use_ssl = os.getenv('S3_USE_SSL', 'true').lower() == 'true'
         self.verify_ssl = os.getenv('S3_VERIFY_SSL', 'true').lower() == 'true'
+        self.multipart_chunksize = int(os.getenv('S3_MULTIPART_CHUNKSIZE_MB', '16')) * 1024 * 1024
+        self.max_concurrency = int(os.getenv('S3_MAX_CONCURRENCY', '8'))
+        # HTTP connections kept open and shared by every thread using the client
+        self.max_pool_connections = int(os.getenv('S3_MAX_POOL_CONNECTIONS', '32'))
+        self.connect_timeout = float(os.getenv('S3_CONNECT_TIMEOUT', '5'))
+        self.read_timeout = float(os.getenv('S3_READ_TIMEOUT', '60'))
 
         if not all([self.access_key, self.secret_key, self.bucket_name]):
             raise ValueError("Missing required S3 configuration: S3_ACCESS_KEY_ID, S3_SECRET_ACCESS_KEY, or S3_BUCKET_NAME")
 
+        # boto3 is imported with the first client, so that processes never using S3 do not load it
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+        from botocore.config import Config
+
         # Configure boto3 client
         config = Config(
             region_name=self.region,
             retries={'max_attempts': 3, 'mode': 'adaptive'},
-            s3={'addressing_style': 'path'}
+            s3={'addressing_style': 'path'},
+            max_pool_connections=self.max_pool_connections,
+            connect_timeout=self.connect_timeout,
+            read_timeout=self.read_timeout,
+            tcp_keepalive=True
         )
 
         self.client = boto3.client(
@@ -40,11 +60,31 @@ class S3Client:
             verify=self.verify_ssl
         )
 
-        # Create bucket if it doesn't exist
-        self._ensure_bucket_exists()
+        # Multipart settings used for uploads and downloads of large media files
+        self.transfer_config = TransferConfig(
+            multipart_threshold=self.multipart_chunksize,
+            multipart_chunksize=self.multipart_chunksize,
+            max_concurrency=self.max_concurrency,
+            use_threads=True
+        )
+
+        # The bucket is checked before the first upload rather than here, so that
+        # creating the client never blocks on the network
+        self._bucket_checked = False
+        self._bucket_lock = threading.Lock()
+
+    def close(self):
+        """Close the pooled HTTP connections"""
+        self.client.close()
 
     def _ensure_bucket_exists(self):
-        """Create bucket if it doesn't exist"""
+        """Create bucket if it doesn't exist, once per client"""
+        with self._bucket_lock:
+            if not self._bucket_checked:
+                self._check_bucket()
+                self._bucket_checked = True
+
+    def _check_bucket(self):
         try:
             self.client.head_bucket(Bucket=self.bucket_name)
             logger.info(f"Bucket '{self.bucket_name}' already exists")
@@ -64,7 +104,8 @@ class S3Client:
     def upload_file(self, file_path: str, object_key: str) -> bool:
         """Upload a file to S3-compatible storage"""
         try:
-            self.client.upload_file(file_path, self.bucket_name, object_key)
+            self._ensure_bucket_exists()
+            self.client.upload_file(file_path, self.bucket_name, object_key, Config=self.transfer_config)
             logger.info(f"Successfully uploaded {file_path} as {object_key}")
             return True
         except FileNotFoundError:
@@ -80,7 +121,7 @@ class S3Client:
     def download_file(self, object_key: str, file_path: str) -> bool:
         """Download a file from S3-compatible storage"""
         try:
-            self.client.download_file(self.bucket_name, object_key, file_path)
+            self.client.download_file(self.bucket_name, object_key, file_path, Config=self.transfer_config)
             logger.info(f"Successfully downloaded {object_key} to {file_path}")
             return True
         except ClientError as e:
@@ -97,6 +138,30 @@ class S3Client:
             logger.error(f"Failed to delete file: {e}")
             return False
 
+    def delete_files(self, object_keys: list[str]) -> list[str]:
+        """
+        Delete files with one DeleteObjects call per DELETE_BATCH_SIZE keys.
+        Returns the keys that could not be deleted.
+        """
+        failed = []
+        for start in range(0, len(object_keys), DELETE_BATCH_SIZE):
+            batch = object_keys[start:start + DELETE_BATCH_SIZE]
+            try:
+                response = self.client.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+                )
+            except ClientError as e:
+                logger.error(f"Failed to delete {len(batch)} files: {e}")
+                failed.extend(batch)
+                continue
+            errors = response.get('Errors', [])
+            for error in errors:
+                logger.error(f"Failed to delete {error['Key']}: {error.get('Message')}")
+            failed.extend(error['Key'] for error in errors)
+            logger.info(f"Deleted {len(batch) - len(errors)} files")
+        return failed
+
     def get_file_url(self, object_key: str, expiration: int = 3600) -> Optional[str]:
         """Generate a presigned URL for file access"""
         try:
@@ -132,12 +197,84 @@ class S3Client:
         except ClientError:
             return False
 
-# Global S3 client instance
+    def get_file_size(self, object_key: str) -> Optional[int]:
+        """Return the size in bytes of a stored file, or None if it does not exist"""
+        try:
+            response = self.client.head_object(Bucket=self.bucket_name, Key=object_key)
+            return response['ContentLength']
+        except ClientError:
+            return None
+
+class AsyncS3Client:
+    """
+    Awaitable facade of S3Client. Calls run on a dedicated thread pool sized to the
+    HTTP connection pool, so that they neither wait for a connection nor compete
+    with the default executor.
+    """
+
+    def __init__(self, client: S3Client):
+        self.sync_client = client
+        self._executor = ThreadPoolExecutor(max_workers=client.max_pool_connections, thread_name_prefix='s3')
+
+    async def _run(self, method, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(method, *args))
+
+    async def upload_file(self, file_path: str, object_key: str) -> bool:
+        return await self._run(self.sync_client.upload_file, file_path, object_key)
+
+    async def download_file(self, object_key: str, file_path: str) -> bool:
+        return await self._run(self.sync_client.download_file, object_key, file_path)
+
+    async def delete_file(self, object_key: str) -> bool:
+        return await self._run(self.sync_client.delete_file, object_key)
+
+    async def delete_files(self, object_keys: list[str]) -> list[str]:
+        return await self._run(self.sync_client.delete_files, object_keys)
+
+    async def get_file_url(self, object_key: str, expiration: int = 3600) -> Optional[str]:
+        return await self._run(self.sync_client.get_file_url, object_key, expiration)
+
+    async def file_exists(self, object_key: str) -> bool:
+        return await self._run(self.sync_client.file_exists, object_key)
+
+    async def get_file_size(self, object_key: str) -> Optional[int]:
+        return await self._run(self.sync_client.get_file_size, object_key)
+
+    async def close(self) -> None:
+        """Wait for the running calls, then close the connections"""
+        await asyncio.to_thread(self._executor.shutdown)
+        self.sync_client.close()
+
+
+# Global S3 client instances, shared by every thread of the process
 s3_client = None
+async_s3_client = None
+_clients_lock = threading.Lock()
 
 def get_s3_client() -> S3Client:
     """Get or create S3 client instance"""
     global s3_client
-    if s3_client is None:
-        s3_client = S3Client()
-    return s3_client
+    with _clients_lock:
+        if s3_client is None:
+            s3_client = S3Client()
+        return s3_client
+
+def get_async_s3_client() -> AsyncS3Client:
+    """Get or create the awaitable facade of the S3 client instance"""
+    global async_s3_client
+    client = get_s3_client()
+    with _clients_lock:
+        if async_s3_client is None:
+            async_s3_client = AsyncS3Client(client)
+        return async_s3_client
+
+async def close_s3_clients() -> None:
+    """Close the global S3 clients, the next get_s3_client call creates new ones"""
+    global s3_client, async_s3_client
+    with _clients_lock:
+        client, async_client = s3_client, async_s3_client
+        s3_client = async_s3_client = None
+    if async_client is not None:
+        await async_client.close()
+    elif client is not None:
+        client.close()
@@ -0,0 +1,10 @@
+from app.services.etag import etag_matches
+
+
+def test_etag_matches_lists_wildcards_and_weak_tags():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('"abc"', '"other", W/"abc"')
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"abc"', "*")
+    assert not etag_matches('"abc"', '"other"')
+    assert not etag_matches('"abc"', None)
@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from prometheus_client import REGISTRY
+
+from app.download_requests.repositories.download_request_repository import DownloadRequestRepository
+from app.download_worker.services.download_stage_recorder import DownloadStageRecorder
+from app.main import app
+from app.services.metrics import MongoCommandMetrics
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.asyncio
+async def test_requests_are_timed_by_route_template(mocker):
+    mocker.patch.object(DownloadRequestRepository, "find_by_id", new_callable=AsyncMock, return_value=None)
+    labels = {"method": "GET", "route": "/api/v1/download-requests/{request_id}", "status": "404"}
+    before = sample("http_request_duration_seconds_count", **labels)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        await ac.get("/api/v1/download-requests/abc")
+        await ac.get("/api/v1/download-requests/def")
+        metrics = await ac.get("/metrics")
+
+    assert sample("http_request_duration_seconds_count", **labels) == before + 2
+    assert metrics.status_code == 200
+    assert b"http_request_duration_seconds_bucket" in metrics.content
+
+
+def test_mongo_commands_are_timed_by_collection():
+    listener = MongoCommandMetrics()
+    labels = {"command": "find", "collection": "download_requests", "outcome": "success"}
+    before = sample("mongodb_command_duration_seconds_count", **labels)
+
+    listener.started(SimpleNamespace(
+        command_name="find", command={"find": "download_requests"}, request_id=1, operation_id=1
+    ))
+    listener.succeeded(SimpleNamespace(command_name="find", request_id=1, operation_id=1, duration_micros=1500))
+
+    assert sample("mongodb_command_duration_seconds_count", **labels) == before + 1
+
+
+def test_stage_recorder_separates_merge_from_transfer(mocker, tmp_path):
+    clock = mocker.patch("app.download_worker.services.download_stage_recorder.time.monotonic")
+    clock.side_effect = [0.0, 8.0, 10.0, 12.0]
+    file_path = tmp_path / "video.mp4"
+    file_path.write_bytes(b"x" * 1000)
+    merges_before = sample("download_stage_duration_seconds_sum", stage="merge")
+    bytes_before = sample("download_bytes_total")
+
+    recorder = DownloadStageRecorder()
+    recorder.postprocessor_hook({"postprocessor": "Merger", "status": "started"})
+    recorder.postprocessor_hook({"postprocessor": "Merger", "status": "finished"})
+    recorder.record(str(file_path))
+
+    assert sample("download_stage_duration_seconds_sum", stage="merge") == merges_before + 2
+    assert sample("download_bytes_total") == bytes_before + 1000
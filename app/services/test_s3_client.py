@@ -0,0 +1,63 @@
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
+from app.services import s3_client as s3_client_module
+from app.services.s3_client import AsyncS3Client, S3Client
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    monkeypatch.delenv("S3_ENDPOINT_URL", raising=False)
+    monkeypatch.setenv("S3_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("S3_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("S3_BUCKET_NAME", "yt-downloads-test")
+    with mock_aws():
+        yield S3Client()
+
+
+def test_bucket_is_created_on_first_upload(s3_client, tmp_path):
+    assert s3_client.client.list_buckets()["Buckets"] == []
+
+    file_path = tmp_path / "video.mp4"
+    file_path.write_bytes(b"data")
+    assert s3_client.upload_file(str(file_path), "request/video.mp4")
+
+    assert s3_client.file_exists("request/video.mp4")
+
+
+@pytest.mark.asyncio
+async def test_async_client_runs_calls_on_its_pool(s3_client, tmp_path):
+    async_client = AsyncS3Client(s3_client)
+    file_path = tmp_path / "video.mp4"
+    file_path.write_bytes(b"data")
+
+    assert await async_client.upload_file(str(file_path), "request/video.mp4")
+    assert await async_client.get_file_size("request/video.mp4") == 4
+    assert await async_client.delete_files(["request/video.mp4"]) == []
+    assert not await async_client.file_exists("request/video.mp4")
+
+    await async_client.close()
+
+
+def test_delete_files_batches_delete_objects_calls(s3_client, monkeypatch, mocker):
+    monkeypatch.setattr(s3_client_module, "DELETE_BATCH_SIZE", 2)
+    keys = [f"request/video_{index}.mp4" for index in range(5)]
+    s3_client.client.create_bucket(Bucket=s3_client.bucket_name)
+    for key in keys:
+        s3_client.client.put_object(Bucket=s3_client.bucket_name, Key=key, Body=b"data")
+    delete_objects = mocker.spy(s3_client.client, "delete_objects")
+
+    assert s3_client.delete_files(keys) == []
+
+    assert delete_objects.call_count == 3
+    assert s3_client.list_files("request/") == []
+
+
+def test_delete_files_returns_keys_of_failed_batches(s3_client, mocker):
+    mocker.patch.object(
+        s3_client.client, "delete_objects",
+        side_effect=ClientError({"Error": {"Code": "InternalError", "Message": "boom"}}, "DeleteObjects"),
+    )
+
+    assert s3_client.delete_files(["a", "b"]) == ["a", "b"]
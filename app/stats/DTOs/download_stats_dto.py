@@ -0,0 +1,41 @@
+from datetime import date, datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from app.download_requests.enums.download_status import DownloadStatus
+from app.stats.models.download_stats_entity import DownloadStatsEntity
+
+
+class DailyDownloadStatsDTO(BaseModel):
+    date: date
+    created: int = 0
+    completed: int = 0
+    failed: int = 0
+    videos: int = 0
+    bytes: int = 0
+
+    @classmethod
+    def from_entity(cls, day: date, entity: Optional[DownloadStatsEntity]) -> "DailyDownloadStatsDTO":
+        if entity is None:
+            return cls(date=day)
+        return cls(
+            date=day,
+            created=entity.created,
+            completed=entity.completed,
+            failed=entity.failed,
+            videos=entity.videos,
+            bytes=entity.bytes,
+        )
+
+
+class DownloadStatsDTO(BaseModel):
+    byStatus: dict[DownloadStatus, int]
+    created: int = 0
+    completed: int = 0
+    failed: int = 0
+    deleted: int = 0
+    videos: int = 0
+    bytes: int = 0
+    daily: list[DailyDownloadStatsDTO] = Field(default_factory=list)
+    reconciledAt: Optional[datetime] = None
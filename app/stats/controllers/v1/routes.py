@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Query
+
+import app.config.config as config
+from app.stats.DTOs.download_stats_dto import DownloadStatsDTO
+from app.stats.services.download_stats_service import DownloadStatsService
+
+router = APIRouter(prefix=f"{config.API_BASE_PATH}/v1/stats", tags=["Stats V1"])
+
+
+@router.get("/")
+async def get_stats(days: int = Query(default=30, ge=1, le=366)) -> DownloadStatsDTO:
+    """
+    Request counts by status, totals, and per-day throughput for the last `days` UTC days
+    """
+    return await DownloadStatsService.get_stats(days)
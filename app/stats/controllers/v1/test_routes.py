@@ -0,0 +1,26 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from unittest.mock import AsyncMock
+
+from app.download_requests.enums.download_status import DownloadStatus
+from app.main import app
+from app.stats.DTOs.download_stats_dto import DownloadStatsDTO
+from app.stats.services.download_stats_service import DownloadStatsService
+
+
+@pytest.mark.asyncio
+async def test_get_stats(mocker):
+    get_stats = mocker.patch.object(
+        DownloadStatsService, "get_stats", new_callable=AsyncMock,
+        return_value=DownloadStatsDTO(byStatus={status: 1 for status in DownloadStatus}, created=4),
+    )
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.get("/api/v1/stats/", params={"days": 7})
+        invalid = await ac.get("/api/v1/stats/", params={"days": 0})
+
+    assert response.status_code == 200
+    assert response.json()["byStatus"]["Completed"] == 1
+    assert response.json()["created"] == 4
+    get_stats.assert_called_once_with(7)
+    assert invalid.status_code == 422
@@ -0,0 +1,30 @@
+from datetime import datetime
+from typing import Optional
+
+from beanie import Document
+from pydantic import Field
+
+from app.download_requests.models.base_entity import get_current_utc_time
+
+
+class DownloadStatsEntity(Document):
+    """
+    Download request counters maintained incrementally with $inc.
+    The "total" document also holds the current number of requests per status,
+    one "day:YYYY-MM-DD" document per UTC day holds that day's flows.
+    """
+
+    id: str
+    # Current number of non-deleted requests, keyed by DownloadStatus value (total document only)
+    byStatus: dict[str, int] = Field(default_factory=dict)
+    created: int = 0
+    completed: int = 0
+    failed: int = 0
+    deleted: int = 0
+    videos: int = 0
+    bytes: int = 0
+    reconciledAt: Optional[datetime] = None
+    updatedAt: datetime = Field(default_factory=get_current_utc_time)
+
+    class Settings:
+        name = "download_stats"
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Optional
+
+from app.download_requests.enums.download_status import DownloadStatus
+from app.download_requests.models.base_entity import get_current_utc_time
+from app.stats.models.download_stats_entity import DownloadStatsEntity
+
+TOTAL_KEY = "total"
+
+
+def day_key(day: date) -> str:
+    return f"day:{day.isoformat()}"
+
+
+class DownloadStatsRepository:
+    @staticmethod
+    async def increment(status_changes: Optional[dict[DownloadStatus, int]] = None, **flows: int) -> None:
+        """
+        Apply counter deltas: `status_changes` to the per-status counts of the total document,
+        `flows` (created, completed, failed, deleted, videos, bytes) to the total and today's document
+        """
+        now = get_current_utc_time()
+        flows = {field: value for field, value in flows.items() if value}
+        total = {f"byStatus.{status.value}": value for status, value in (status_changes or {}).items() if value}
+        total.update(flows)
+        if not total:
+            return
+
+        await DownloadStatsEntity.find_one({"_id": TOTAL_KEY}).update(
+            {"$inc": total, "$set": {"updatedAt": now}}, upsert=True
+        )
+        if flows:
+            await DownloadStatsEntity.find_one({"_id": day_key(now.date())}).update(
+                {"$inc": flows, "$set": {"updatedAt": now}}, upsert=True
+            )
+
+    @staticmethod
+    async def record_transition(previous: DownloadStatus, current: DownloadStatus, count: int = 1, **flows: int) -> None:
+        if previous == current:
+            return
+        await DownloadStatsRepository.increment({previous: -count, current: count}, **flows)
+
+    @staticmethod
+    async def find_total() -> Optional[DownloadStatsEntity]:
+        return await DownloadStatsEntity.get(TOTAL_KEY)
+
+    @staticmethod
+    async def find_days(days: list[date]) -> list[DownloadStatsEntity]:
+        return await DownloadStatsEntity.find({"_id": {"$in": [day_key(day) for day in days]}}).to_list()
+
+    @staticmethod
+    async def set_status_counts(
+        counts: dict[DownloadStatus, int],
+        expected: Optional[dict[DownloadStatus, int]] = None,
+    ) -> bool:
+        """
+        Overwrite the per-status counts
+        :param expected: Counts read before computing `counts`, the overwrite only applies while they are unchanged
+        :return: False when a write or another reconciliation changed the counts since they were read
+        """
+        now = get_current_utc_time()
+        query = {"_id": TOTAL_KEY}
+        for status, count in (expected or {}).items():
+            # Statuses never counted have no field yet
+            query[f"byStatus.{status.value}"] = count if count else {"$in": [0, None]}
+        result = await DownloadStatsEntity.find_one(query).update(
+            {"$set": {
+                "byStatus": {status.value: count for status, count in counts.items()},
+                "reconciledAt": now,
+                "updatedAt": now,
+            }},
+            upsert=expected is None,
+        )
+        return result.matched_count == 1 or result.upserted_id is not None
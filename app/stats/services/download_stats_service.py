@@ -0,0 +1,75 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+from app.download_requests.enums.download_status import DownloadStatus
+from app.download_requests.models.base_entity import get_current_utc_time
+from app.download_requests.repositories.download_request_repository import DownloadRequestRepository
+from app.stats.DTOs.download_stats_dto import DailyDownloadStatsDTO, DownloadStatsDTO
+from app.stats.repositories.download_stats_repository import DownloadStatsRepository, day_key
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadStatsService:
+    """
+    Serves download statistics from counters maintained on every write, so that reading
+    them costs a fixed number of small lookups whatever the size of the collection
+    """
+
+    @staticmethod
+    async def get_stats(days: int) -> DownloadStatsDTO:
+        """
+        :param days: Number of UTC days of daily stats to return, today included, oldest first
+        """
+        total = await DownloadStatsRepository.find_total()
+        today = get_current_utc_time().date()
+        day_range = [today - timedelta(days=offset) for offset in reversed(range(days))]
+        by_key = {entity.id: entity for entity in await DownloadStatsRepository.find_days(day_range)}
+
+        by_status = {status: 0 for status in DownloadStatus}
+        if total is not None:
+            for status, count in total.byStatus.items():
+                by_status[DownloadStatus(status)] = count
+
+        return DownloadStatsDTO(
+            byStatus=by_status,
+            created=total.created if total else 0,
+            completed=total.completed if total else 0,
+            failed=total.failed if total else 0,
+            deleted=total.deleted if total else 0,
+            videos=total.videos if total else 0,
+            bytes=total.bytes if total else 0,
+            daily=[DailyDownloadStatsDTO.from_entity(day, by_key.get(day_key(day))) for day in day_range],
+            reconciledAt=total.reconciledAt if total else None,
+        )
+
+    @staticmethod
+    async def reconcile() -> bool:
+        """
+        Compare the per-status counters with an aggregation over the requests and overwrite them on drift.
+        Every worker replica reconciles: the counters are read before the aggregation and only overwritten
+        while unchanged, so a write or another replica's reconciliation landing meanwhile is never lost.
+        Returns True when the counters were correct.
+        """
+        total = await DownloadStatsRepository.find_total()
+        counted = {status: (total.byStatus.get(status.value, 0) if total else 0) for status in DownloadStatus}
+        actual = await DownloadRequestRepository.count_by_status()
+
+        if counted != actual:
+            logger.warning(
+                "Download stats drifted, resetting status counters",
+                extra={"counted": {s.value: n for s, n in counted.items()}, "actual": {s.value: n for s, n in actual.items()}},
+            )
+        if not await DownloadStatsRepository.set_status_counts(actual, counted if total else None):
+            logger.info("Download stats changed during reconciliation, leaving them to the next run")
+        return counted == actual
+
+    @staticmethod
+    async def run_reconciliation(interval: float) -> None:
+        while True:
+            try:
+                await DownloadStatsService.reconcile()
+            except Exception:
+                logger.exception("Download stats reconciliation failed")
+            await asyncio.sleep(interval)
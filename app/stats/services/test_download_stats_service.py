@@ -0,0 +1,84 @@
+import pytest
+from beanie import init_beanie
+from mongomock_motor import AsyncMongoMockClient
+
+from app.config.database import DOCUMENT_MODELS
+from app.download_requests.enums.download_status import DownloadStatus
+from app.download_requests.models.download_request_video import DownloadRequestVideo
+from app.download_requests.repositories.download_request_repository import DownloadRequestRepository
+from app.download_requests.schemas.download_request_create_schema import DownloadRequestCreateSchema
+from app.stats.repositories.download_stats_repository import DownloadStatsRepository
+from app.stats.services.download_stats_service import DownloadStatsService
+
+
+@pytest.fixture(autouse=True)
+async def database():
+    client = AsyncMongoMockClient()
+    await init_beanie(database=client["yt_downloads_test"], document_models=DOCUMENT_MODELS)
+    yield
+
+
+@pytest.mark.asyncio
+async def test_counters_follow_the_request_lifecycle():
+    first = await DownloadRequestRepository.create(DownloadRequestCreateSchema(url="http://example.com/a"))
+    others = await DownloadRequestRepository.create_many([
+        DownloadRequestCreateSchema(url="http://example.com/b"),
+        DownloadRequestCreateSchema(url="http://example.com/c"),
+    ])
+
+    await DownloadRequestRepository.claim(str(first.id), "worker-a", 60)
+    await DownloadRequestRepository.append_video(
+        str(first.id), DownloadRequestVideo(id="a", title="a", path="/a.mp4", size=1000)
+    )
+    await DownloadRequestRepository.update(str(first.id), {"status": DownloadStatus.COMPLETED})
+    await DownloadRequestRepository.claim(str(others[0].id), "worker-a", 60)
+    await DownloadRequestRepository.update(str(others[0].id), {"status": DownloadStatus.FAILED})
+    await DownloadRequestRepository.delete(str(others[1].id))
+
+    stats = await DownloadStatsService.get_stats(days=7)
+
+    assert stats.byStatus == {
+        DownloadStatus.REGISTERED: 0,
+        DownloadStatus.IN_PROGRESS: 0,
+        DownloadStatus.COMPLETED: 1,
+        DownloadStatus.FAILED: 1,
+    }
+    assert (stats.created, stats.completed, stats.failed, stats.deleted) == (3, 1, 1, 1)
+    assert (stats.videos, stats.bytes) == (1, 1000)
+    assert len(stats.daily) == 7
+    assert stats.daily[-1].created == 3
+    assert stats.daily[0].created == 0
+
+
+@pytest.mark.asyncio
+async def test_reconcile_resets_drifted_counters(mocker):
+    await DownloadStatsRepository.increment({DownloadStatus.REGISTERED: 5})
+    actual = {status: 0 for status in DownloadStatus} | {DownloadStatus.REGISTERED: 2}
+    # mongomock cannot run Beanie aggregations
+    mocker.patch.object(DownloadRequestRepository, "count_by_status", return_value=actual)
+
+    assert await DownloadStatsService.reconcile() is False
+    assert await DownloadStatsService.reconcile() is True
+
+    stats = await DownloadStatsService.get_stats(days=1)
+    assert stats.byStatus[DownloadStatus.REGISTERED] == 2
+    assert stats.reconciledAt is not None
+
+
+@pytest.mark.asyncio
+async def test_reconcile_keeps_counters_changed_during_the_aggregation(mocker):
+    await DownloadStatsRepository.increment({DownloadStatus.REGISTERED: 5})
+    actual = {status: 0 for status in DownloadStatus} | {DownloadStatus.REGISTERED: 2}
+
+    async def count_by_status():
+        # A request created while the aggregation runs
+        await DownloadStatsRepository.increment({DownloadStatus.REGISTERED: 1})
+        return actual
+
+    mocker.patch.object(DownloadRequestRepository, "count_by_status", side_effect=count_by_status)
+
+    assert await DownloadStatsService.reconcile() is False
+
+    stats = await DownloadStatsService.get_stats(days=1)
+    assert stats.byStatus[DownloadStatus.REGISTERED] == 6
+    assert stats.reconciledAt is None
@@ -0,0 +1,26 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.main import app
+
+
+@pytest.mark.asyncio
+async def test_liveness_does_not_need_the_database(mocker):
+    ping_db = mocker.patch("app.main.ping_db")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/health/live")
+
+    assert response.status_code == 200
+    ping_db.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_readiness_reflects_the_database(mocker):
+    ping_db = mocker.patch("app.main.ping_db", return_value=True)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        ready = await client.get("/health/ready")
+        ping_db.return_value = False
+        unavailable = await client.get("/health/ready")
+
+    assert ready.status_code == 200
+    assert unavailable.status_code == 503
@@ -0,0 +1,356 @@
+"""
+End-to-end load and throughput benchmark.
+
+Runs the FastAPI app in-process (ASGI transport, no network) and the download worker
+scheduler against MongoDB, or an in-memory mongomock stand-in, with a fake extractor
+serving synthetic media of configurable size and latency. The fake replaces the two
+yt-dlp call sites (metadata extraction and media download) and ffmpeg post-processing
+is skipped, so scheduling, claiming, progress reporting, the media cache and every
+repository write run for real.
+
+Reports, for each concurrency level:
+    - API req/s and p50/p99 latency of create, list and get
+    - worker jobs/min and p50/p99 time from creation to completion
+
+Usage (from the repository root):
+    python -m scripts.benchmark --concurrency 1,8,32 --output benchmark.json
+    python -m scripts.benchmark --mongo-uri mongodb://localhost:27017/?replicaSet=rs0 --change-streams
+    python -m scripts.benchmark --baseline benchmark.json --tolerance 0.2
+
+With --baseline the run exits with status 1 when a throughput drops, or a p99
+latency grows, by more than the tolerance.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+
+from beanie import init_beanie
+from httpx import ASGITransport, AsyncClient
+
+from app.config.database import DOCUMENT_MODELS
+from app.download_requests.enums.download_status import DownloadStatus
+from app.download_requests.enums.transcode_profile import TranscodeProfile
+from app.download_requests.models.download_request_entity import DownloadRequestEntity
+from app.download_requests.models.download_request_video import DownloadRequestVideo
+from app.download_requests.repositories.download_request_repository import DownloadRequestRepository
+from app.download_worker.job_runner import DownloadJobRunner
+from app.download_worker.main import listen_for_download_request_insert
+from app.download_worker.scheduler import DownloadScheduler
+from app.download_worker.services.download_progress_reporter import DownloadProgressReporter
+from app.download_worker.services.media_postprocessor import media_postprocessor
+from app.download_worker.services.youtube_download_service import YouTubeDownloadService
+from app.main import app
+from app.media_info.services.media_info_service import MediaInfoService
+import app.config.config as config
+
+API_PREFIX = f"{config.API_BASE_PATH}/v1/download-requests"
+FAKE_HOST = "https://fake-extractor.test"
+
+
+class FakeExtractor:
+    """
+    Stands in for yt-dlp. Playlist URLs expand to `playlist_size` entries, video ids are
+    drawn from a pool of `distinct_videos` so that repeated ids exercise the media cache.
+    """
+
+    def __init__(self, media_size: int, extract_latency: float, download_latency: float,
+                 playlist_size: int, distinct_videos: int, media_dir: str):
+        self.media_size = media_size
+        self.extract_latency = extract_latency
+        self.download_latency = download_latency
+        self.playlist_size = playlist_size
+        self.distinct_videos = distinct_videos
+        self.media_dir = media_dir
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def next_url(self) -> str:
+        with self._lock:
+            self._counter += 1
+            index = self._counter
+        if self.playlist_size:
+            return f"{FAKE_HOST}/playlist?list=PL{index}"
+        return f"{FAKE_HOST}/watch?v={self._video_id(index)}"
+
+    def _video_id(self, index: int) -> str:
+        return f"v{index % self.distinct_videos if self.distinct_videos else index}"
+
+    async def extract(self, url: str) -> Dict[str, Any]:
+        await asyncio.sleep(self.extract_latency)
+        if "list=" in url:
+            playlist_id = url.rsplit("=", 1)[-1]
+            base = int(playlist_id.removeprefix("PL")) * self.playlist_size
+            entries = [
+                {"id": video_id, "url": f"{FAKE_HOST}/watch?v={video_id}", "ie_key": "Fake", "title": video_id}
+                for video_id in (self._video_id(base + offset) for offset in range(self.playlist_size))
+            ]
+            return {"id": playlist_id, "title": playlist_id, "extractor_key": "FakeTab", "entries": entries}
+
+        video_id = url.rsplit("=", 1)[-1]
+        return {"id": video_id, "title": video_id, "extractor_key": "Fake", "duration": 60,
+                "webpage_url": url, "thumbnail": f"{FAKE_HOST}/{video_id}.jpg"}
+
+    async def download_video(self, source: Union[str, Dict[str, Any]], request_id: str,
+                             position: Optional[int] = None,
+                             format_options: Optional[Dict[str, Any]] = None) -> DownloadRequestVideo:
+        video_id = source["id"] if isinstance(source, dict) else source.rsplit("=", 1)[-1]
+        loop = asyncio.get_running_loop()
+        reporter = DownloadProgressReporter(request_id, loop, config.PROGRESS_REPORT_INTERVAL)
+        file_path = os.path.join(self.media_dir, f"{request_id}_{video_id}.mp4")
+
+        def _download():
+            # Write the media in chunks spread over the latency, reporting progress like yt-dlp
+            chunks = 10
+            chunk = b"\0" * (self.media_size // chunks)
+            with open(file_path, "wb") as file:
+                for index in range(chunks):
+                    time.sleep(self.download_latency / chunks)
+                    file.write(chunk)
+                    reporter.hook({
+                        "status": "downloading" if index < chunks - 1 else "finished",
+                        "info_dict": {"id": video_id},
+                        "downloaded_bytes": len(chunk) * (index + 1),
+                        "total_bytes": len(chunk) * chunks,
+                    })
+
+        await loop.run_in_executor(None, _download)
+        return DownloadRequestVideo(id=video_id, title=video_id, path=file_path, duration=60, position=position)
+
+
+async def passthrough_postprocess(video: DownloadRequestVideo, profile: TranscodeProfile) -> DownloadRequestVideo:
+    return video
+
+
+def summarize(latencies: list[float], elapsed: float) -> Dict[str, float]:
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    return {
+        "count": len(latencies),
+        "per_second": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(quantiles[49] * 1000, 2),
+        "p99_ms": round(quantiles[98] * 1000, 2),
+    }
+
+
+async def run_load(concurrency: int, total: int, call: Callable[[int], Awaitable[None]]) -> Dict[str, float]:
+    """
+    Run `total` calls with `concurrency` concurrent clients and summarize their latency
+    """
+    latencies: list[float] = []
+    next_index = iter(range(total))
+
+    async def client():
+        for index in next_index:
+            started = time.perf_counter()
+            await call(index)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def init_database(args: argparse.Namespace):
+    """
+    Fresh database for a benchmark phase
+    """
+    if args.mongo_uri:
+        from pymongo import AsyncMongoClient
+        client = AsyncMongoClient(args.mongo_uri)
+        await client.drop_database(args.database)
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        client = AsyncMongoMockClient()
+    db = client[args.database]
+    await init_beanie(database=db, document_models=DOCUMENT_MODELS)
+    return db
+
+
+async def benchmark_api(args: argparse.Namespace, extractor: FakeExtractor, concurrency: int) -> Dict[str, Any]:
+    await init_database(args)
+    ids: list[str] = []
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://benchmark") as client:
+        async def create(_):
+            response = await client.post(f"{API_PREFIX}/", json={"url": extractor.next_url()})
+            response.raise_for_status()
+            ids.append(response.json()["id"])
+
+        async def list_page(_):
+            (await client.get(f"{API_PREFIX}/", params={"limit": 50})).raise_for_status()
+
+        async def get(index):
+            (await client.get(f"{API_PREFIX}/{ids[index % len(ids)]}")).raise_for_status()
+
+        return {
+            "create": await run_load(concurrency, args.requests, create),
+            "list": await run_load(concurrency, args.requests, list_page),
+            "get": await run_load(concurrency, args.requests, get),
+        }
+
+
+async def benchmark_worker(args: argparse.Namespace, extractor: FakeExtractor, concurrency: int) -> Dict[str, Any]:
+    db = await init_database(args)
+    created_at: Dict[str, float] = {}
+    completed_at: Dict[str, float] = {}
+    all_done = asyncio.Event()
+
+    runner = DownloadJobRunner(worker_id=f"benchmark-{uuid.uuid4().hex[:8]}", lease_seconds=60, heartbeat_interval=20)
+
+    async def handler(download_request: DownloadRequestEntity) -> None:
+        await runner.run(download_request)
+        request_id = str(download_request.id)
+        entity = await DownloadRequestRepository.find_by_id(request_id)
+        if entity is not None and entity.status.is_terminal and request_id not in completed_at:
+            completed_at[request_id] = time.perf_counter()
+            if len(completed_at) == args.jobs:
+                all_done.set()
+
+    scheduler = DownloadScheduler(handler, concurrency=concurrency, queue_size=max(16, concurrency * 4))
+    scheduler.start()
+    dispatcher = asyncio.create_task(
+        listen_for_download_request_insert(db, scheduler) if args.change_streams else poll_registered(scheduler)
+    )
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://benchmark") as client:
+        started = time.perf_counter()
+
+        async def create(_):
+            response = await client.post(f"{API_PREFIX}/", json={"url": extractor.next_url()})
+            response.raise_for_status()
+            created_at[response.json()["id"]] = time.perf_counter()
+
+        await run_load(concurrency, args.jobs, create)
+        await asyncio.wait_for(all_done.wait(), timeout=args.timeout)
+        elapsed = time.perf_counter() - started
+
+    dispatcher.cancel()
+    await asyncio.gather(dispatcher, return_exceptions=True)
+    await scheduler.shutdown()
+
+    failed = await DownloadRequestEntity.find_active(status=DownloadStatus.FAILED).count()
+    time_to_complete = summarize([completed_at[request_id] - created_at[request_id] for request_id in completed_at], 0)
+    return {
+        "jobs": args.jobs,
+        "failed": failed,
+        "jobs_per_minute": round(args.jobs / elapsed * 60, 2),
+        "time_to_complete_p50_ms": time_to_complete["p50_ms"],
+        "time_to_complete_p99_ms": time_to_complete["p99_ms"],
+    }
+
+
+async def poll_registered(scheduler: DownloadScheduler, interval: float = 0.02) -> None:
+    """
+    Change stream stand-in for mongomock: dispatch each newly registered request once
+    """
+    dispatched: set = set()
+    while True:
+        for download_request in await DownloadRequestRepository.find_registered(limit=1000):
+            if download_request.id not in dispatched:
+                dispatched.add(download_request.id)
+                await scheduler.submit(download_request)
+        await asyncio.sleep(interval)
+
+
+def find_regressions(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> list[str]:
+    regressions = []
+    for level, current in results.items():
+        previous = baseline.get("results", {}).get(level)
+        if previous is None:
+            continue
+        pairs = [(f"api.{operation}", current["api"][operation], previous["api"][operation])
+                 for operation in current["api"]]
+        pairs.append(("worker", current["worker"], previous["worker"]))
+        for name, now, before in pairs:
+            for metric in ("per_second", "jobs_per_minute"):
+                if metric in now and now[metric] < before[metric] * (1 - tolerance):
+                    regressions.append(f"c={level} {name}.{metric}: {before[metric]} -> {now[metric]}")
+            for metric in ("p99_ms", "time_to_complete_p99_ms"):
+                if metric in now and now[metric] > before[metric] * (1 + tolerance):
+                    regressions.append(f"c={level} {name}.{metric}: {before[metric]} -> {now[metric]}")
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> int:
+    with tempfile.TemporaryDirectory(prefix="yt-benchmark-") as media_dir:
+        extractor = FakeExtractor(
+            media_size=args.media_size,
+            extract_latency=args.extract_latency,
+            download_latency=args.download_latency,
+            playlist_size=args.playlist_size,
+            distinct_videos=args.distinct_videos,
+            media_dir=media_dir,
+        )
+        MediaInfoService._extract = staticmethod(extractor.extract)
+        YouTubeDownloadService._download_video = staticmethod(extractor.download_video)
+        # The synthetic media is not a real container, ffmpeg cannot remux it
+        media_postprocessor.process = passthrough_postprocess
+
+        results = {}
+        for concurrency in args.concurrency:
+            MediaInfoService._lru.clear()
+            results[str(concurrency)] = {
+                "api": await benchmark_api(args, extractor, concurrency),
+                "worker": await benchmark_worker(args, extractor, concurrency),
+            }
+            print(f"concurrency={concurrency}: {json.dumps(results[str(concurrency)])}", file=sys.stderr)
+
+    report = {
+        "createdAt": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": "mongodb" if args.mongo_uri else "mongomock",
+        },
+        "config": {key: value for key, value in vars(args).items() if key not in ("mongo_uri", "baseline", "output")},
+        "results": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = find_regressions(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=lambda value: [int(level) for level in value.split(",")],
+                        default=[1, 8, 32], help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=500, help="API calls per operation and level")
+    parser.add_argument("--jobs", type=int, default=100, help="Download requests per level for the worker phase")
+    parser.add_argument("--media-size", type=int, default=1024 * 1024, help="Synthetic media size in bytes")
+    parser.add_argument("--extract-latency", type=float, default=0.05, help="Fake metadata extraction latency (s)")
+    parser.add_argument("--download-latency", type=float, default=0.2, help="Fake media download latency (s)")
+    parser.add_argument("--playlist-size", type=int, default=0, help="Entries per request, 0 for single videos")
+    parser.add_argument("--distinct-videos", type=int, default=0,
+                        help="Size of the video id pool, 0 for all distinct (no media cache hits)")
+    parser.add_argument("--mongo-uri", help="MongoDB to benchmark against, mongomock when omitted")
+    parser.add_argument("--database", default="yt_downloads_benchmark", help="Database dropped and used per phase")
+    parser.add_argument("--change-streams", action="store_true",
+                        help="Dispatch through the worker change stream listener (needs a replica set)")
+    parser.add_argument("--timeout", type=float, default=600, help="Max seconds to wait for the worker phase")
+    parser.add_argument("--output", default="benchmark-results.json", help="JSON results file")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(asyncio.run(run(parse_args())))
@@ -0,0 +1,45 @@
+"""
+Drop the download request listing indexes replaced by partial indexes on `deleted: false`.
+
+Beanie creates the new indexes at startup but never drops existing ones, so the full
+indexes prefixed with `deleted` keep being maintained on every write until removed.
+Run once after deploying; indexes already dropped are skipped.
+
+Usage (from the repository root, with the MongoDB variables of .env exported):
+    python -m scripts.drop_superseded_indexes
+"""
+import asyncio
+import logging
+
+from app.config.resources import managed_resources
+from app.download_requests.models.download_request_entity import DownloadRequestEntity
+
+logger = logging.getLogger(__name__)
+
+SUPERSEDED_INDEXES = [
+    "deleted_1_createdAt_-1__id_-1",
+    "deleted_1_status_1_createdAt_-1__id_-1",
+    "deleted_1_isPlaylist_1_createdAt_-1__id_-1",
+]
+
+
+async def drop_superseded_indexes() -> list[str]:
+    collection = DownloadRequestEntity.get_pymongo_collection()
+    existing = await collection.index_information()
+    dropped = []
+    for name in SUPERSEDED_INDEXES:
+        if name in existing:
+            await collection.drop_index(name)
+            dropped.append(name)
+    return dropped
+
+
+async def main() -> None:
+    async with managed_resources():
+        dropped = await drop_superseded_indexes()
+    logger.info(f"Dropped {len(dropped)} superseded indexes: {', '.join(dropped) or 'none'}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
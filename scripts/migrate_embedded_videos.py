@@ -0,0 +1,52 @@
+"""
+Move the videos embedded in download request documents to the download_request_videos collection.
+
+Requests created before videos got their own collection keep them in a `videos` array.
+Each request is migrated independently and idempotently: its videos are stored at their
+position, the downloadedCount/downloadedBytes aggregates are set and the array is removed.
+
+Usage (from the repository root, with the MongoDB variables of .env exported):
+    python -m scripts.migrate_embedded_videos
+"""
+import asyncio
+import logging
+
+from app.config.resources import managed_resources
+from app.download_requests.models.download_request_entity import DownloadRequestEntity
+from app.download_requests.models.download_request_video import DownloadRequestVideo
+from app.download_requests.repositories.download_request_video_repository import DownloadRequestVideoRepository
+
+logger = logging.getLogger(__name__)
+
+
+async def migrate() -> int:
+    collection = DownloadRequestEntity.get_pymongo_collection()
+    migrated = 0
+    async for document in collection.find({"videos": {"$exists": True}}, projection={"videos": 1}):
+        request_id = str(document["_id"])
+        videos = [DownloadRequestVideo.model_validate(video) for video in document["videos"] or []]
+        for index, video in enumerate(videos):
+            if video.position is None:
+                video.position = index
+            await DownloadRequestVideoRepository.save(request_id, video)
+
+        await collection.update_one({"_id": document["_id"]}, {
+            "$set": {
+                "downloadedCount": len(videos),
+                "downloadedBytes": sum(video.size or 0 for video in videos),
+            },
+            "$unset": {"videos": ""},
+        })
+        migrated += 1
+    return migrated
+
+
+async def main() -> None:
+    async with managed_resources():
+        migrated = await migrate()
+    logger.info(f"Migrated the videos of {migrated} download requests")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())